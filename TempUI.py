@@ -1,15 +1,23 @@
 import os
 import sys
 import time
-import keyboard
 from datetime import datetime
 from PyQt5 import QtCore, QtGui, QtWidgets
 import backend  # your backend.py with process_room()
-
-# Constants
-ROOMS    = backend.ROOMS
-DEBOUNCE = 0.5
-BASE_DIR = os.path.join(os.path.dirname(__file__), "LogCabin")
+import feeds
+import imagecache
+import overlayviews
+import profiling
+import config
+import service
+import hotkeys
+import sweep
+import threading
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+POLL_MS  = 50     # result/status polling period (hotkeys are events, see hotkeys.py)
+# ────────────────────────────────────────────────────────────────────
+config.load_into("overlay", globals())
 
 class Overlay(QtWidgets.QWidget):
     def __init__(self):
@@ -46,28 +54,30 @@ class Overlay(QtWidgets.QWidget):
         # Rooms box
         rooms_box = QtWidgets.QFrame()
         rooms_box.setStyleSheet("background:white; border:1px solid #AAA; border-radius:3px;")
-        rooms_layout = QtWidgets.QVBoxLayout(rooms_box)
-        rooms_layout.setContentsMargins(5,5,5,5)
-        rooms_layout.setSpacing(5)
+        self.rooms_layout = QtWidgets.QVBoxLayout(rooms_box)
+        self.rooms_layout.setContentsMargins(5,5,5,5)
+        self.rooms_layout.setSpacing(5)
 
         self.left_labels  = {}
         self.left_buttons = {}
-        self.anomalies    = {r: [] for r in ROOMS}
-
-        for room in ROOMS:
-            row = QtWidgets.QWidget()
-            row_l = QtWidgets.QHBoxLayout(row)
-            row_l.setContentsMargins(0,0,0,0)
-            lbl = QtWidgets.QLabel(f"{room}: No data"); lbl.setFixedWidth(180)
-            btn = QtWidgets.QPushButton("View"); btn.setEnabled(False)
-            row_l.addWidget(lbl); row_l.addWidget(btn)
-            rooms_layout.addWidget(row)
-            self.left_labels[room]  = lbl
-            self.left_buttons[room] = btn
-            btn.clicked.connect(lambda _, r=room: self.openAnomalies(r))
+        self.anomalies    = {}
+        self.lastClasses  = {}
+
+        for room in backend.ROOMS:
+            self.addRoomRow(room)
 
         left_layout.addWidget(rooms_box, 0)
 
+        # Monitor status: "6" scans once, "7" toggles continuous monitoring
+        self.status_label = QtWidgets.QLabel("Monitor: off")
+        left_layout.addWidget(self.status_label, 0)
+
+        # Stage latencies in ms (p50/p95/p99 over recent scans)
+        self.stages_label = QtWidgets.QLabel("")
+        self.stages_label.setStyleSheet("font-family: monospace; font-size: 8pt;")
+        left_layout.addWidget(self.stages_label, 0)
+        self.lastStages = 0
+
         # Log box
         log_box = QtWidgets.QFrame()
         log_box.setStyleSheet("background:white; border:1px solid #AAA; border-radius:3px;")
@@ -79,50 +89,106 @@ class Overlay(QtWidgets.QWidget):
 
         main_layout.addWidget(left_panel, 0)
 
-        # Right panel
+        # Viewer thumbnails are decoded and scaled off the GUI thread, as
+        # soon as each heatmap is written; attached to a service, heatmaps
+        # arrive as PNG bytes and the retention archive stays the service's
+        archive = None if service.SERVICE_URL else backend.get_retention().read_heatmap
+        self.thumbs = imagecache.ImageCache(box=(400, 400), upscale=True, read_archive=archive)
+        backend.heatmap_writer.add_listener(self.thumbs.prefetch_heatmap)
+
+        # Right panel: the anomaly viewer, its rows reused between openings
         self.right_panel = QtWidgets.QFrame()
         self.right_panel.setStyleSheet("background:transparent;")
         self.right_layout = QtWidgets.QVBoxLayout(self.right_panel)
         self.right_layout.setContentsMargins(2,2,2,2)
         self.right_layout.setSpacing(5)
+        self.viewer = overlayviews.AnomalyPanel(self.thumbs, self.templatePath)
+        self.right_layout.addWidget(self.viewer)
         main_layout.addWidget(self.right_panel, 1)
 
-        # Debounce state
-        self.last6 = 0
-        self.lastF12 = 0
-        self.last8 = 0
-
-        # Timer to poll keys on the main thread
+        # The last scanned room's anomaly boxes, drawn where they are on
+        # screen, under the panels; only what changed is repainted
+        self.boxes = overlayviews.BoxLayer(self, self.thumbs)
+        self.boxes.setGeometry(self.rect())
+        self.boxes.lower()
+
+        # Scans run on a worker thread; results are picked up in pollResults
+        self.worker = feeds.make_worker()
+        self.worker.start()
+
+        # F12 shows/hides the overlay, "6" scans once, "7" toggles continuous
+        # monitoring, "8" quits, "9" sweeps every room; system-wide when the
+        # keyboard hook is available, and always while the overlay has focus
+        # (keyPressEvent)
+        self.keys = hotkeys.Hotkeys(hotkeys.qt_poster())
+        self.keys.bind("f12", self.toggle).bind("6", self.worker.trigger)
+        self.keys.bind("7", self.toggleMonitor).bind("8", self.quit)
+        self.keys.bind("9", self.sweepCabin)
+        self.sweepThread = None
+        self.keys.start()
+
+        # Timer to pick up results on the main thread
         self.timer = QtCore.QTimer(self)
-        self.timer.timeout.connect(self.pollKeys)
-        self.timer.start(50)
+        self.timer.timeout.connect(self.pollResults)
+        self.timer.start(POLL_MS)
+
+    def addRoomRow(self, room):
+        row = QtWidgets.QWidget()
+        row_l = QtWidgets.QHBoxLayout(row)
+        row_l.setContentsMargins(0,0,0,0)
+        lbl = QtWidgets.QLabel(f"{room}: No data"); lbl.setFixedWidth(180)
+        btn = QtWidgets.QPushButton("View"); btn.setEnabled(False)
+        hist = QtWidgets.QPushButton("History")
+        hist.clicked.connect(lambda _, r=room: self.showHistory(r))
+        row_l.addWidget(lbl); row_l.addWidget(btn); row_l.addWidget(hist)
+        self.rooms_layout.addWidget(row)
+        self.left_labels[room]  = lbl
+        self.left_buttons[room] = btn
+        self.anomalies[room]    = []
+        btn.clicked.connect(lambda _, r=room: self.openAnomalies(r))
 
     def paintEvent(self, ev):
+        # only the invalidated part, not the whole screen, on every repaint
         p = QtGui.QPainter(self)
-        p.fillRect(self.rect(), QtGui.QColor(0,0,0,160))
+        for r in ev.region().rects():
+            p.fillRect(r, QtGui.QColor(0,0,0,160))
+        p.end()
         super().paintEvent(ev)
 
+    def resizeEvent(self, ev):
+        self.boxes.setGeometry(self.rect())
+        super().resizeEvent(ev)
+
     def toggle(self):
         self.setVisible(not self.isVisible())
 
     def appendLog(self, msg):
         self.log_text.append(f"{datetime.now().strftime('%H:%M:%S')} – {msg}")
 
-    def clearRightPanel(self):
-        """Recursively remove every widget and layout from the right panel."""
-        def clear_layout(layout):
-            while layout.count():
-                item = layout.takeAt(0)
-                # if it's a widget, delete it
-                w = item.widget()
-                if w:
-                    w.deleteLater()
-                # if it's a nested layout, clear that too
-                child = item.layout()
-                if child:
-                    clear_layout(child)
-
-        clear_layout(self.right_layout)
+    def showHistory(self, room, limit=10):
+        """Append the room's most recent recorded anomalies to the log."""
+        rows = backend.get_history().query(room=room, limit=limit)
+        if not rows:
+            self.appendLog(f"{room}: no recorded anomalies")
+            return
+        self.appendLog(f"{room}: last {len(rows)} recorded anomalies")
+        for r in rows:
+            when = datetime.fromtimestamp(r["ts"]).strftime("%H:%M:%S")
+            self.appendLog(f"    {when} {r['class_name']}({r['pixel_count']})")
+
+    def templatePath(self, room, cls):
+        return os.path.join(backend.BASE_DIR, room, "group_templates", f"{cls}.png")
+
+    def screenScale(self, room):
+        """Overlay pixels per template pixel (the overlay covers the captured screen)."""
+        if service.SERVICE_URL:
+            # the service sends the template size with each result, so the
+            # viewer never loads templates of its own on the GUI thread
+            w = self.worker.template_sizes.get(room, (0, 0))[0]
+        else:
+            tpl = backend.get_template(room)    # already loaded for the scans
+            w = tpl.shape[1] if tpl is not None else 0
+        return self.width() / w if w else 0.0
 
     def openAnomalies(self, room: str):
         anomalies = self.anomalies.get(room, [])
@@ -134,90 +200,109 @@ class Overlay(QtWidgets.QWidget):
         lbl.setStyleSheet("color: black;")
         btn.setEnabled(False)
 
-        # 1) Clear out anything left in right panel
-        self.clearRightPanel()
-
-        # 2) Add a close ("✕") button at the top
-        close_btn = QtWidgets.QPushButton("✕")
-        close_btn.setFixedSize(24,24)
-        close_btn.setStyleSheet("background-color: rgba(255,255,255,200);")
-        close_btn.clicked.connect(self.clearRightPanel)
-        self.right_layout.addWidget(close_btn, alignment=QtCore.Qt.AlignRight)
-
-        # 3) Repopulate with the new anomaly images
-        for a in anomalies:
-            cls = a["class_name"]
-            pix = a["pixel_count"]
-            heat_path = a["heatmap_path"]
-
-            hdr = QtWidgets.QLabel(f"{cls}: {pix} px changed")
-            hdr.setStyleSheet("color: white; font-weight: bold;")
-            self.right_layout.addWidget(hdr)
-
-            row = QtWidgets.QHBoxLayout()
-            self.right_layout.addLayout(row)
-
-            # Heatmap
-            if heat_path and os.path.exists(heat_path):
-                pixmap = QtGui.QPixmap(heat_path).scaled(
-                    400, 400, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation
-                )
-                lbl_h = QtWidgets.QLabel()
-                lbl_h.setPixmap(pixmap)
-                row.addWidget(lbl_h)
-            else:
-                row.addWidget(QtWidgets.QLabel("(no heatmap)"))
-
-            # Template crop
-            tpl_path = os.path.join(BASE_DIR, room, "group_templates", f"{cls}.png")
-            if os.path.exists(tpl_path):
-                pixmap = QtGui.QPixmap(tpl_path).scaled(
-                    400, 400, QtCore.Qt.KeepAspectRatio, QtCore.Qt.SmoothTransformation
-                )
-                lbl_t = QtWidgets.QLabel()
-                lbl_t.setPixmap(pixmap)
-                row.addWidget(lbl_t)
-            else:
-                row.addWidget(QtWidgets.QLabel("(no template)"))
-
-    def pollKeys(self):
+        self.viewer.show_anomalies(room, anomalies)
+
+    def keyPressEvent(self, ev):
+        name = QtGui.QKeySequence(ev.key()).toString()
+        if not self.keys.inject(name):
+            super().keyPressEvent(ev)
+
+    def toggleMonitor(self):
+        on = self.worker.toggle_continuous()
+        self.appendLog(f"Continuous monitoring {'on' if on else 'off'}")
+
+    def sweepCabin(self):
+        """Scan every room, switching cameras with sweep.SWITCH_KEYS; results arrive per room."""
+        if service.SERVICE_URL:
+            self.appendLog("Sweep: scans run in the scan service")
+            return
+        if self.sweepThread is not None and self.sweepThread.is_alive():
+            return
+        if not sweep.SWITCH_KEYS:
+            self.appendLog('Sweep: set SWITCH_KEYS in the "sweep" config first')
+            return
+        self.worker.set_continuous(False)    # its captures would race the camera switches
+        self.appendLog("Sweeping all rooms…")
+        post = self.keys.post
+
+        def run():
+            rep = sweep.Sweep(on_room=lambda r, a: post(lambda: self.showResult(r, a))).run()
+            post(lambda: self.appendLog(sweep.format_report(rep).splitlines()[-1]))
+        self.sweepThread = threading.Thread(target=run, name="sweep", daemon=True)
+        self.sweepThread.start()
+
+    def quit(self):
+        self.keys.stop()
+        self.worker.stop()
+        QtWidgets.QApplication.instance().quit()
+
+    def pollResults(self):
         now = time.time()
-        # F12 toggle
-        if keyboard.is_pressed("f12") and now - self.lastF12 > DEBOUNCE:
-            self.lastF12 = now
-            self.toggle()
-        # check anomalies
-        if keyboard.is_pressed("6") and now - self.last6 > DEBOUNCE:
-            self.last6 = now
-            try:
-                room, anom, _ = backend.process_room()
-            except Exception as e:
-                print("process_room error:", e)
-                return
-            if not room:
+        if self.timer.interval() != POLL_MS:
+            self.timer.setInterval(POLL_MS)    # changed in the config file
+        for room, anom in self.worker.get_results():
+            self.showResult(room, anom)
+        self.boxes.refresh()
+        st = self.worker.stats()
+        self.status_label.setText(
+            f"Monitor: {'on' if st['continuous'] else 'off'} – "
+            f"{st['frames_analyzed']} analyzed, {st['frames_dropped']} dropped, "
+            f"align {st['align_ms']:.1f} ms"
+            + (f" – {st['error']}" if st.get("error") else "")
+        )
+        # stage latencies change slowly; refresh the panel about once a second
+        if now - self.lastStages > 1.0:
+            self.lastStages = now
+            self.stages_label.setText(profiling.format_table(self.worker.stage_stats()))
+
+    def showResult(self, room, anom):
+        if not room:
+            if not self.worker.continuous:
                 print("[No room detected]")
-            else:
-                self.anomalies[room] = anom
-                lbl = self.left_labels[room]; btn = self.left_buttons[room]
-                if anom:
-                    lbl.setText(f"{room}: {len(anom)} anomaly(s)")
-                    lbl.setStyleSheet("color:red;"); btn.setEnabled(True)
-                    self.appendLog(
-                        f"{room}: {len(anom)} anomalies – " +
-                        ", ".join(f"{a['class_name']}({a['pixel_count']})" for a in anom)
-                    )
-                else:
-                    lbl.setText(f"{room}: No anomalies")
-                    lbl.setStyleSheet("color:lightgreen;"); btn.setEnabled(False)
-                    self.appendLog(f"{room}: No anomalies detected")
-        # Exit
-        if keyboard.is_pressed("8") and now - self.last8 > DEBOUNCE:
-            self.last8 = now
-            QtWidgets.QApplication.instance().quit()
+            return
+        if room not in self.left_labels:
+            self.addRoomRow(room)    # ROOMS was extended in the config file
+        self.anomalies[room] = anom
+        scale = self.screenScale(room)
+        self.boxes.set_result(room, anom if scale else [], scale)
+        lbl = self.left_labels[room]; btn = self.left_buttons[room]
+        if anom:
+            for a in anom:
+                self.thumbs.prefetch_template(self.templatePath(room, a["class_name"]))
+            lbl.setText(f"{room}: {len(anom)} anomaly(s)")
+            lbl.setStyleSheet("color:red;"); btn.setEnabled(True)
+            msg = (f"{room}: {len(anom)} anomalies – " +
+                   ", ".join(f"{a['class_name']}({a['pixel_count']})" for a in anom))
+        else:
+            lbl.setText(f"{room}: No anomalies")
+            lbl.setStyleSheet("color:lightgreen;"); btn.setEnabled(False)
+            msg = f"{room}: No anomalies detected"
+        # in continuous mode only log when a room's result changes
+        classes = sorted(a["class_name"] for a in anom)
+        if not self.worker.continuous or self.lastClasses.get(room) != classes:
+            self.appendLog(msg)
+        self.lastClasses[room] = classes
 
 
 if __name__ == "__main__":
     app = QtWidgets.QApplication(sys.argv)
+    # --profile [DIR]: also dump a cProfile of every scan into DIR
+    profiling.from_argv(sys.argv[1:])
+    # apply edits to the config file while running
+    config.watch()
+    # attached to a scan service (service.py), scans and their models live there
+    if not service.SERVICE_URL:
+        # Load OCR model and regions in the background so the overlay appears immediately
+        backend.warmup()
+        backend.start_retention()
+        # pick up crops added with train.py while running
+        backend.watch_regions()
     overlay = Overlay()
     overlay.show()
+    if os.environ.get("ODAI_STARTUP_BENCH"):
+        # bench/startup.py: report when the first window is drawn, then exit
+        def first_window():
+            print(f"FIRST_WINDOW {time.time()}", flush=True)
+            app.quit()
+        QtCore.QTimer.singleShot(0, first_window)
     sys.exit(app.exec_())
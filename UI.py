@@ -1,48 +1,24 @@
 import os
+import sys
 import time
-import keyboard
 import tkinter as tk
 from tkinter import Toplevel, Label, Scrollbar, Canvas, Frame
 from PIL import Image, ImageTk
 from datetime import datetime
 import backend  # ensure this points to your updated backend.py
+import feeds
+import imagecache
+import profiling
+import config
+import service
+import hotkeys
+import sweep
+import threading
 
-ROOMS = backend.ROOMS
-DEBOUNCE = 0.5
-BASE_DIR = os.path.join(os.path.dirname(__file__), "LogCabin")
-
-root = tk.Tk()
-root.title("Observation Duty")
-
-# ─── Left column ────────────────────────────────────────────────────────────
-
-left_frame = tk.Frame(root)
-left_frame.pack(side="left", fill="y", padx=10, pady=10)
-
-left_vars = {}    # room -> (StringVar, Label)
-left_buttons = {} # room -> Button
-
-for room in ROOMS:
-    row = tk.Frame(left_frame)
-    row.pack(fill="x", pady=2)
-    var = tk.StringVar(value=f"{room}: No data")
-    lbl = tk.Label(row, textvariable=var, width=25, anchor="w", font=("Arial", 10))
-    lbl.pack(side="left")
-    btn = tk.Button(row, text="View", state="disabled", width=8)
-    btn.pack(side="left", padx=5)
-    left_vars[room] = (var, lbl)
-    left_buttons[room] = btn
-
-# ─── Right column (log) ─────────────────────────────────────────────────────
-
-right_frame = tk.Frame(root)
-right_frame.pack(side="right", fill="both", expand=True, padx=10, pady=10)
-
-log_text = tk.Text(right_frame, state="disabled", width=50, height=20, wrap="none")
-log_text.pack(side="left", fill="both", expand=True)
-scrollbar = Scrollbar(right_frame, command=log_text.yview)
-scrollbar.pack(side="right", fill="y")
-log_text.configure(yscrollcommand=scrollbar.set)
+# ───── CONFIG ──────────────────────────────────────────────────────
+POLL_MS  = 100    # result/status polling period (hotkeys are events, see hotkeys.py)
+# ────────────────────────────────────────────────────────────────────
+config.load_into("ui", globals())
 
 def append_log(msg: str):
     log_text.config(state="normal")
@@ -50,6 +26,24 @@ def append_log(msg: str):
     log_text.see("end")
     log_text.config(state="disabled")
 
+def show_history(room: str, limit: int = 10):
+    """Append the room's most recent recorded anomalies to the log."""
+    rows = backend.get_history().query(room=room, limit=limit)
+    if not rows:
+        append_log(f"{room}: no recorded anomalies")
+        return
+    append_log(f"{room}: last {len(rows)} recorded anomalies")
+    for r in rows:
+        when = datetime.fromtimestamp(r["ts"]).strftime("%H:%M:%S")
+        append_log(f"    {when} {r['class_name']}({r['pixel_count']})")
+
+def photo(thumb):
+    """PhotoImage for a cached RGB thumbnail (no decode or resize here)."""
+    return ImageTk.PhotoImage(Image.fromarray(thumb))
+
+def template_path(room, cls):
+    return os.path.join(backend.BASE_DIR, room, "group_templates", f"{cls}.png")
+
 def open_anomalies(room: str, anomalies: list):
     # reset UI state
     var, lbl = left_vars[room]
@@ -79,7 +73,6 @@ def open_anomalies(room: str, anomalies: list):
     for a in anomalies:
         cls = a.get("class_name", "unknown")
         pix = a.get("pixel_count", 0)
-        heat_path = a.get("heatmap_path")
 
         # Header
         Label(scroll_frame,
@@ -92,10 +85,9 @@ def open_anomalies(room: str, anomalies: list):
         container.pack(fill="x", pady=(0,15))
 
         # Left: heatmap
-        if heat_path and os.path.exists(heat_path):
-            img_h = Image.open(heat_path)
-            img_h.thumbnail((550,550))
-            photo_h = ImageTk.PhotoImage(img_h)
+        thumb_h = thumbs.heatmap(a)
+        if thumb_h is not None:
+            photo_h = photo(thumb_h)
             lbl_h = Label(container, image=photo_h)
             lbl_h.image = photo_h
             lbl_h.pack(side="left", padx=5)
@@ -103,46 +95,183 @@ def open_anomalies(room: str, anomalies: list):
             Label(container, text="(no heatmap)", font=("Arial", 10)).pack(side="left", padx=5)
 
         # Right: original template crop
-        tpl_path = os.path.join(BASE_DIR, room, "group_templates", f"{cls}.png")
-        if os.path.exists(tpl_path):
-            img_t = Image.open(tpl_path)
-            img_t.thumbnail((550,550))
-            photo_t = ImageTk.PhotoImage(img_t)
+        thumb_t = thumbs.template(template_path(room, cls))
+        if thumb_t is not None:
+            photo_t = photo(thumb_t)
             lbl_t = Label(container, image=photo_t)
             lbl_t.image = photo_t
             lbl_t.pack(side="right", padx=5)
         else:
             Label(container, text="(no template)", font=("Arial", 10)).pack(side="right", padx=5)
 
-def poll_keys():
-    if keyboard.is_pressed("6"):
-        room, anomalies, _ = backend.process_room()
-        if room:
-            var, lbl = left_vars[room]
-            btn = left_buttons[room]
-            if anomalies:
-                count = len(anomalies)
-                var.set(f"{room}: {count} anomaly(s)")
-                lbl.config(fg="red")
-                btn.config(
-                    state="normal",
-                    command=lambda r=room, a=anomalies: open_anomalies(r, a)
-                )
-                append_log(
-                    f"{room}: {count} anomalies – " +
-                    ", ".join(f"{a.get('class_name')}({a.get('pixel_count')})" for a in anomalies)
-                )
-            else:
-                var.set(f"{room}: No anomalies")
-                lbl.config(fg="green")
-                append_log(f"{room}: No anomalies detected")
-        time.sleep(DEBOUNCE)
-
-    elif keyboard.is_pressed("8"):
-        root.destroy()
+last_classes = {}  # room -> classes flagged by the previous result
+
+def add_room_row(room):
+    row = tk.Frame(rooms_frame)
+    row.pack(fill="x", pady=2)
+    var = tk.StringVar(value=f"{room}: No data")
+    lbl = tk.Label(row, textvariable=var, width=25, anchor="w", font=("Arial", 10))
+    lbl.pack(side="left")
+    btn = tk.Button(row, text="View", state="disabled", width=8)
+    btn.pack(side="left", padx=5)
+    tk.Button(row, text="History", width=8,
+              command=lambda r=room: show_history(r)).pack(side="left")
+    left_vars[room] = (var, lbl)
+    left_buttons[room] = btn
+
+def show_result(room, anomalies):
+    if not room:
         return
+    if room not in left_vars:
+        add_room_row(room)    # ROOMS was extended in the config file
+    var, lbl = left_vars[room]
+    btn = left_buttons[room]
+    if anomalies:
+        for a in anomalies:
+            thumbs.prefetch_template(template_path(room, a.get("class_name", "unknown")))
+        count = len(anomalies)
+        var.set(f"{room}: {count} anomaly(s)")
+        lbl.config(fg="red")
+        btn.config(
+            state="normal",
+            command=lambda r=room, a=anomalies: open_anomalies(r, a)
+        )
+        msg = (f"{room}: {count} anomalies – " +
+               ", ".join(f"{a.get('class_name')}({a.get('pixel_count')})" for a in anomalies))
+    else:
+        var.set(f"{room}: No anomalies")
+        lbl.config(fg="green")
+        msg = f"{room}: No anomalies detected"
+    # in continuous mode only log when a room's result changes
+    classes = sorted(a.get("class_name") for a in anomalies)
+    if not worker.continuous or last_classes.get(room) != classes:
+        append_log(msg)
+    last_classes[room] = classes
+
+def scan_once():
+    worker.trigger()
+
+sweeping = {"thread": None}
+
+def sweep_cabin():
+    """Scan every room, switching cameras with sweep.SWITCH_KEYS; results arrive per room."""
+    if service.SERVICE_URL:
+        append_log("Sweep: scans run in the scan service")
+        return
+    if sweeping["thread"] is not None and sweeping["thread"].is_alive():
+        return
+    if not sweep.SWITCH_KEYS:
+        append_log('Sweep: set SWITCH_KEYS in the "sweep" config first')
+        return
+    worker.set_continuous(False)    # its captures would race the camera switches
+    append_log("Sweeping all rooms…")
+
+    def run():
+        rep = sweep.Sweep(on_room=lambda r, a: keys.post(lambda: show_result(r, a))).run()
+        keys.post(lambda: append_log(sweep.format_report(rep).splitlines()[-1]))
+    sweeping["thread"] = threading.Thread(target=run, name="sweep", daemon=True)
+    sweeping["thread"].start()
+
+def toggle_monitor():
+    append_log(f"Continuous monitoring {'on' if worker.toggle_continuous() else 'off'}")
+
+def quit_app():
+    keys.stop()
+    worker.stop()
+    root.destroy()
+
+last_refresh = {"stages": 0}
+
+def poll_results():
+    for room, anomalies in worker.get_results():
+        show_result(room, anomalies)
+    st = worker.stats()
+    status_var.set(
+        f"Monitor: {'on' if st['continuous'] else 'off'} – "
+        f"{st['frames_analyzed']} analyzed, {st['frames_dropped']} dropped, "
+        f"align {st['align_ms']:.1f} ms"
+        + (f" – {st['error']}" if st.get("error") else "")
+    )
+    # stage latencies change slowly; refresh the panel about once a second
+    now = time.time()
+    if now - last_refresh["stages"] > 1.0:
+        last_refresh["stages"] = now
+        stages_var.set(profiling.format_table(worker.stage_stats()))
+
+    root.after(POLL_MS, poll_results)
+
+# Spawned feed processes (feeds.ScanScheduler) re-import this module, so
+# the window is only built when it is run as the program
+if __name__ == "__main__":
+    # --profile [DIR]: also dump a cProfile of every scan into DIR
+    profiling.from_argv(sys.argv[1:])
+    # apply edits to the config file while running
+    config.watch()
+
+    # attached to a scan service (service.py), scans and their models live there
+    if not service.SERVICE_URL:
+        # Load OCR model and regions in the background so the window appears immediately
+        backend.warmup()
+        backend.start_retention()
+        # pick up crops added with train.py while running
+        backend.watch_regions()
+
+    # Viewer thumbnails are decoded and scaled off the GUI thread, as soon as
+    # each heatmap is written; attached to a service, heatmaps arrive as PNG
+    # bytes and the retention archive stays the service's
+    archive = None if service.SERVICE_URL else backend.get_retention().read_heatmap
+    thumbs = imagecache.ImageCache(box=(550, 550), read_archive=archive)
+    backend.heatmap_writer.add_listener(thumbs.prefetch_heatmap)
+
+    root = tk.Tk()
+    root.title("Observation Duty")
+
+    # ─── Left column ────────────────────────────────────────────────────────────
+
+    left_frame = tk.Frame(root)
+    left_frame.pack(side="left", fill="y", padx=10, pady=10)
+
+    left_vars = {}    # room -> (StringVar, Label)
+    left_buttons = {} # room -> Button
+
+    rooms_frame = tk.Frame(left_frame)
+    rooms_frame.pack(fill="x")
+    for room in backend.ROOMS:
+        add_room_row(room)
+
+    # Monitor status: "6" scans once, "7" toggles continuous monitoring
+    status_var = tk.StringVar(value="Monitor: off")
+    tk.Label(left_frame, textvariable=status_var, anchor="w", font=("Arial", 9)).pack(fill="x", pady=(10,0))
+
+    # Stage latencies in ms (p50/p95/p99 over recent scans)
+    stages_var = tk.StringVar(value="")
+    tk.Label(left_frame, textvariable=stages_var, anchor="w", justify="left",
+             font=("Courier", 8)).pack(fill="x", pady=(5,0))
+
+    # ─── Right column (log) ─────────────────────────────────────────────────────
+
+    right_frame = tk.Frame(root)
+    right_frame.pack(side="right", fill="both", expand=True, padx=10, pady=10)
+
+    log_text = tk.Text(right_frame, state="disabled", width=50, height=20, wrap="none")
+    log_text.pack(side="left", fill="both", expand=True)
+    scrollbar = Scrollbar(right_frame, command=log_text.yview)
+    scrollbar.pack(side="right", fill="y")
+    log_text.configure(yscrollcommand=scrollbar.set)
+
+    worker = feeds.make_worker()
+    worker.start()
 
-    root.after(100, poll_keys)
+    # "6" scans once, "7" toggles continuous monitoring, "8" quits, "9" sweeps
+    # every room; system-wide when the keyboard hook is available, and always
+    # while the window has focus
+    keys = hotkeys.Hotkeys(hotkeys.tk_poster(root))
+    keys.bind("6", scan_once).bind("7", toggle_monitor).bind("8", quit_app).bind("9", sweep_cabin)
+    keys.start()
+    root.bind("<KeyPress>", lambda e: keys.inject(e.keysym))
 
-root.after(100, poll_keys)
-root.mainloop()
+    root.after(POLL_MS, poll_results)
+    if os.environ.get("ODAI_STARTUP_BENCH"):
+        # bench/startup.py: report when the first window is drawn, then exit
+        root.after_idle(lambda: (print(f"FIRST_WINDOW {time.time()}", flush=True), root.destroy()))
+    root.mainloop()
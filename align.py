@@ -0,0 +1,189 @@
+import time
+import cv2
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+ALIGN_ENABLED   = True
+ALIGN_MARGIN    = 32                    # max |shift| in template px; also the grab margin
+ALIGN_SCALE     = 0.25                  # downscale used for phase correlation
+ALIGN_MIN_RESP  = 0.2                   # weaker phase-correlation peaks are ignored
+RESIDUAL_STEP   = 4                     # every n-th pixel, each way, compared to confirm a shift
+PYRAMID_LEVELS  = 2                     # coarse level for region localization (1/4 size)
+LOCATE_SCALES   = (0.9, 0.95, 1.0, 1.05, 1.1)
+REFINE_CANDIDATES = 3                   # coarse matches refined at full resolution
+EXACT_FALLBACK  = 0.95                  # below this, also try a full-resolution 1:1 match
+# ────────────────────────────────────────────────────────────────────
+
+class AlignStats:
+    """Running cost of alignment, so its overhead per scan can be reported."""
+
+    def __init__(self):
+        self.scans = 0
+        self.total_ms = 0.0
+        self.last_ms = 0.0
+        self.last_shift = (0, 0)
+        self.rejected = 0          # shifts that didn't fit the template better than none
+
+    def record(self, ms, shift):
+        self.scans += 1
+        self.total_ms += ms
+        self.last_ms = ms
+        self.last_shift = shift
+
+    def as_dict(self):
+        return {
+            "scans": self.scans,
+            "mean_ms": self.total_ms / self.scans if self.scans else 0.0,
+            "last_ms": self.last_ms,
+            "last_shift": self.last_shift,
+            "rejected": self.rejected,
+        }
+
+stats = AlignStats()
+
+# ── live frame registration ─────────────────────────────────────────
+def crop_padded(img, rect):
+    """img[y1:y2, x1:x2], edge-replicated where the rectangle leaves the image."""
+    x1, y1, x2, y2 = rect
+    h, w = img.shape[:2]
+    cx1, cy1, cx2, cy2 = max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)
+    if cx2 <= cx1 or cy2 <= cy1:
+        return None
+    out = img[cy1:cy2, cx1:cx2]
+    if (cx1, cy1, cx2, cy2) != (x1, y1, x2, y2):
+        out = cv2.copyMakeBorder(out, cy1 - y1, y2 - cy2, cx1 - x1, x2 - cx2, cv2.BORDER_REPLICATE)
+    return out
+
+def to_template_window(frame, origin, scale, rect):
+    """
+    Cut template rectangle `rect` out of a live frame and bring it to
+    template resolution. The frame's top-left is screen pixel `origin`
+    and screen pixels are template pixels times `scale`.
+    """
+    x1, y1, x2, y2 = rect
+    ox, oy = origin
+    sr = (int(round(x1*scale)) - ox, int(round(y1*scale)) - oy,
+          int(round(x2*scale)) - ox, int(round(y2*scale)) - oy)
+    live = crop_padded(frame, sr)
+    if live is not None and scale != 1.0:
+        live = cv2.resize(live, (x2 - x1, y2 - y1), interpolation=cv2.INTER_AREA)
+    return live
+
+def estimate_shift(live_gray, tpl_gray):
+    """
+    Global translation (dx, dy) of live content relative to the template, in
+    full-resolution pixels, from phase correlation on downscaled copies.
+    Both images must have the same size. Returns (0, 0) when the peak is weak.
+    """
+    h, w = tpl_gray.shape[:2]
+    # multiples of 8: at some odd sizes phaseCorrelate reports a half-pixel
+    # shift between identical images, which is 1/ALIGN_SCALE px at full size
+    size = (max(int(w*ALIGN_SCALE) + 7 & ~7, 8), max(int(h*ALIGN_SCALE) + 7 & ~7, 8))
+    a = cv2.resize(tpl_gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    b = cv2.resize(live_gray, size, interpolation=cv2.INTER_AREA).astype(np.float32)
+    win = cv2.createHanningWindow(size, cv2.CV_32F)
+    (dx, dy), resp = cv2.phaseCorrelate(a, b, win)
+    if resp < ALIGN_MIN_RESP:
+        return 0, 0
+    dx = int(round(dx * w / size[0]))
+    dy = int(round(dy * h / size[1]))
+    return (int(np.clip(dx, -ALIGN_MARGIN, ALIGN_MARGIN)),
+            int(np.clip(dy, -ALIGN_MARGIN, ALIGN_MARGIN)))
+
+def residual(live_gray, tpl_gray, margin, shift):
+    """
+    Mean absolute difference between the template and the live window
+    read at `shift`, over every RESIDUAL_STEP-th pixel.
+    """
+    h, w = tpl_gray.shape[:2]
+    dx, dy = shift
+    k = RESIDUAL_STEP
+    live = live_gray[margin+dy:margin+dy+h:k, margin+dx:margin+dx+w:k]
+    return float(np.abs(live.astype(np.int16) - tpl_gray[::k, ::k]).mean())
+
+def register(live_window, tpl_gray, margin):
+    """
+    live_window covers the template area plus `margin` on every side.
+    Returns the (dx, dy) shift to apply and records its cost in `stats`.
+
+    The phase-correlation estimate is refined to the pixel around it that
+    fits the template best, and only kept if that fits better than no
+    shift at all: a single moved or large changed object can pull the
+    peak away from the camera's real (often zero) motion, and registering
+    to it would flag every region.
+    """
+    t0 = time.perf_counter()
+    shift = (0, 0)
+    if ALIGN_ENABLED and tpl_gray.size:
+        h, w = tpl_gray.shape[:2]
+        gray = live_window
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_BGRA2GRAY if gray.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        est = estimate_shift(gray[margin:margin+h, margin:margin+w], tpl_gray)
+        if est != (0, 0):
+            # the estimate is only good to a pixel or so at ALIGN_SCALE: take the best
+            # fit around it, and none at all unless one of them beats (0, 0)
+            cands = {(int(np.clip(est[0] + i, -margin, margin)), int(np.clip(est[1] + j, -margin, margin)))
+                     for i in (-1, 0, 1) for j in (-1, 0, 1)}
+            cands.add((0, 0))
+            shift = min(sorted(cands, key=lambda c: c != (0, 0)),
+                        key=lambda c: residual(gray, tpl_gray, margin, c))
+            if shift == (0, 0):
+                stats.rejected += 1
+    stats.record((time.perf_counter() - t0) * 1000, shift)
+    return shift
+
+# ── baseline region localization ────────────────────────────────────
+def locate(gray_tpl, crop, scales=LOCATE_SCALES, levels=PYRAMID_LEVELS):
+    """
+    Find `crop` in `gray_tpl`, allowing for a modest scale difference.
+    Every scale is tried at a coarse pyramid level; only the best few
+    candidates are refined at full resolution in a small window around them.
+    Returns (score, (x1, y1, x2, y2)) or (-1.0, None).
+    """
+    th, tw = gray_tpl.shape[:2]
+    # don't shrink small crops into nothing
+    while levels > 0 and min(crop.shape[:2]) >> levels < 8:
+        levels -= 1
+    f = 1 << levels
+    coarse_tpl = cv2.resize(gray_tpl, (tw // f, th // f), interpolation=cv2.INTER_AREA) if f > 1 else gray_tpl
+
+    cands = []   # (coarse score, coarse loc, scaled crop) per scale
+    for s in scales:
+        scaled = crop if s == 1.0 else cv2.resize(crop, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+        ch, cw = scaled.shape[:2]
+        if ch > th or cw > tw:
+            continue
+        small = scaled if f == 1 else cv2.resize(scaled, (max(cw // f, 1), max(ch // f, 1)),
+                                                  interpolation=cv2.INTER_AREA)
+        if small.shape[0] > coarse_tpl.shape[0] or small.shape[1] > coarse_tpl.shape[1]:
+            continue
+        res = cv2.matchTemplate(coarse_tpl, small, cv2.TM_CCOEFF_NORMED)
+        _, val, _, loc = cv2.minMaxLoc(res)
+        cands.append((val, loc, scaled))
+
+    # coarse scores of neighbouring scales are close, so refine the best few
+    best = (-1.0, None)
+    for _, (cx, cy), scaled in sorted(cands, key=lambda c: -c[0])[:REFINE_CANDIDATES]:
+        ch, cw = scaled.shape[:2]
+        pad = 2 * f
+        x0, y0 = max(cx * f - pad, 0), max(cy * f - pad, 0)
+        x1, y1 = min(cx * f + cw + pad, tw), min(cy * f + ch + pad, th)
+        window = gray_tpl[y0:y1, x0:x1]
+        if window.shape[0] < ch or window.shape[1] < cw:
+            continue
+        res = cv2.matchTemplate(window, scaled, cv2.TM_CCOEFF_NORMED)
+        _, val, _, (lx, ly) = cv2.minMaxLoc(res)
+        if val > best[0]:
+            x, y = x0 + lx, y0 + ly
+            best = (float(val), (x, y, x + cw, y + ch))
+
+    # flat, low-texture crops can lose their peak when downsampled; fall
+    # back to the plain full-resolution match when the pyramid is unsure
+    if best[0] < EXACT_FALLBACK and crop.shape[0] <= th and crop.shape[1] <= tw:
+        res = cv2.matchTemplate(gray_tpl, crop, cv2.TM_CCOEFF_NORMED)
+        _, val, _, (x, y) = cv2.minMaxLoc(res)
+        if val > best[0]:
+            ch, cw = crop.shape[:2]
+            best = (float(val), (x, y, x + cw, y + ch))
+    return best
@@ -1,10 +1,26 @@
 import os
 import time
+import json
+import argparse
+import threading
+import multiprocessing
 import cv2
-import mss
 import numpy as np
-import easyocr
 from datetime import datetime
+import roomid
+import labelocr
+import heatmaps
+import diffengine
+import capture
+import align
+import history
+import retention
+import thresholds
+import manifest
+import bundle
+import profiling
+from profiling import timings
+import config
 
 # ───── CONFIG ──────────────────────────────────────────────────────
 ROOMS                   = ["Living", "Kitchen", "Bedroom", "Bathroom", "Entryway", "Yard"]
@@ -13,20 +29,64 @@ HEATMAP_SUBFOLDER       = "heatmaps"     # new subfolder for heatmaps
 MATCH_THRESHOLD         = 0.8
 BINARY_THRESH           = 20
 PIXEL_COUNT_THRESHOLD = 400
+DIFF_METRIC             = "absdiff"      # "absdiff": per-pixel diff; "ssim": coarse SSIM pass, full diff only where it flags
+SETTLE_DELAY            = 0.2            # wait after a camera switch before a manual scan
+OCR_FALLBACK            = True           # run EasyOCR when the label classifier is unsure
+OCR_MODE                = "fast"         # "fast": recognize a cached label box only; "full": detect + recognize
+HISTORY_ENABLED         = True           # record live scans in LogCabin/history.db
+REGION_WATCH_INTERVAL   = 2.0            # seconds between checks for re-authored rooms (watch_regions)
 # ────────────────────────────────────────────────────────────────────
+# overridable from odai.json / ODAI_BACKEND_<NAME> and hot-applied (see on_config)
+config.load_into("backend", globals())
 
-# Initialize OCR reader
-reader = easyocr.Reader(['en'], gpu=False)
+# ───── LAZY STATE ──────────────────────────────────────────────────
+# Nothing heavy happens at import: the OCR model, templates and regions
+# are loaded the first time they are needed (or by warmup()).
+REGION_CACHE_FILE = "regions_cache.json"
 
-# Load room templates
-template_images = {
-    room: cv2.imread(os.path.join(BASE_DIR, room, "template.png"))
-    for room in ROOMS
-}
+_reader = None
+_label_ocr = None
+_room_classifier = None
+_history = None
+_retention = None
+_bundle = None
+_bundle_key = None        # (BASE_DIR, index mtime) _bundle was opened for
+_bundle_thread = None
+template_images = {}      # room -> BGR template (None if missing)
+group_templates = {}      # room -> {class_name: grayscale crop}
+baseline_regions = {}     # room -> [{"class_name", "box"}]
+diff_models = {}          # room -> diffengine.RoomDiffModel
+rooms_reloaded = 0        # rooms watch_regions() reloaded after an edit on disk
+_load_lock = threading.RLock()
+_reader_lock = threading.Lock()   # separate so a slow model load never blocks template access
 
-# Pre-load cropped regions per room
-group_templates = {}
-for room in ROOMS:
+# Heatmaps are rendered and stored off the scan path
+heatmap_writer = heatmaps.HeatmapWriter()
+
+# One persistent mss handle per thread, grabbing only the rectangles a scan needs
+grabber = capture.Grabber(monitor=1)
+
+def get_reader():
+    """EasyOCR reader, built on first use."""
+    global _reader
+    with _reader_lock:
+        if _reader is None:
+            import easyocr
+            _reader = easyocr.Reader(['en'], gpu=False)
+        return _reader
+
+def get_template(room):
+    with _load_lock:
+        if room not in template_images:
+            b = _bundled(room)
+            if b is not None:
+                template_images[room] = b.array(room, "template") if b.meta(room)["template"] else None
+            else:
+                template_images[room] = cv2.imread(os.path.join(BASE_DIR, room, "template.png"))
+        return template_images[room]
+
+def _read_crops(room):
+    """{class_name: grayscale crop} decoded from LogCabin/<Room>/group_templates."""
     tpl_dir = os.path.join(BASE_DIR, room, "group_templates")
     crops = {}
     if os.path.isdir(tpl_dir):
@@ -35,103 +95,774 @@ for room in ROOMS:
             if ext.lower() == ".png":
                 path = os.path.join(tpl_dir, fn)
                 crops[name] = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-    group_templates[room] = crops
+    return crops
 
-def capture_screen():
-    with mss.mss() as sct:
-        frame = np.array(sct.grab(sct.monitors[1]))
-    return cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+def get_group_templates(room):
+    with _load_lock:
+        if room not in group_templates:
+            b = _bundled(room)
+            if b is not None:
+                group_templates[room] = {name: b.array(room, "crop/" + name)
+                                         for name in b.meta(room)["crops"]}
+            else:
+                group_templates[room] = _read_crops(room)
+        return group_templates[room]
 
-def detect_room_name(img):
-    h, w = img.shape[:2]
-    roi = img[int(h*0.80):h, 0:int(w*0.30)]
-    gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-    for _, text, _ in reader.readtext(gray):
+def get_label_ocr():
+    """OCR_MODE "fast" reader state: cached label box and last label hash."""
+    global _label_ocr
+    with _load_lock:
+        if _label_ocr is None:
+            _label_ocr = labelocr.LabelOCR(get_reader, ROOMS)
+        return _label_ocr
+
+def get_room_classifier():
+    global _room_classifier
+    with _load_lock:
+        if _room_classifier is None:
+            _room_classifier = roomid.RoomClassifier({r: get_template(r) for r in ROOMS})
+        return _room_classifier
+
+def get_history():
+    """Scan history store (LogCabin/history.db), opened on first use."""
+    global _history
+    with _load_lock:
+        if _history is None:
+            _history = history.HistoryStore(os.path.join(BASE_DIR, "history.db"))
+        return _history
+
+def get_retention():
+    global _retention
+    with _load_lock:
+        if _retention is None:
+            _retention = retention.RetentionManager(BASE_DIR, ROOMS, HEATMAP_SUBFOLDER)
+        return _retention
+
+def on_config(changed):
+    """
+    Apply a live config change: drop only what depended on the changed
+    settings, so it is rebuilt lazily on the next scan.
+    """
+    global _room_classifier, _history, _label_ocr
+    old_history = None
+    with _load_lock:
+        if {"BASE_DIR", "ROOMS"} & changed.keys() and _retention is not None:
+            # retargeted in place: the heatmap listener and viewers hold this manager
+            _retention.retarget(BASE_DIR, ROOMS)
+        if "BASE_DIR" in changed:
+            template_images.clear()
+            group_templates.clear()
+            baseline_regions.clear()
+            diff_models.clear()
+            _room_classifier = None
+            if "ROOMS" in changed:
+                _label_ocr = None
+            old_history, _history = _history, None
+        else:
+            if "ROOMS" in changed:
+                old, new = changed["ROOMS"]
+                for room in set(old) - set(new):
+                    for cache in (template_images, group_templates, baseline_regions, diff_models):
+                        cache.pop(room, None)
+                _room_classifier = None
+                _label_ocr = None
+            if "MATCH_THRESHOLD" in changed:
+                # part of every room's region-cache stamp: re-match on next use
+                baseline_regions.clear()
+                diff_models.clear()
+            elif {"BINARY_THRESH", "PIXEL_COUNT_THRESHOLD", "DIFF_METRIC"} & changed.keys():
+                # per-region limits depend on these; regions and templates stay
+                diff_models.clear()
+    if old_history is not None:
+        # outside the lock: waits for the old store's last commit
+        old_history.close()
+
+def start_retention():
+    """Bound the heatmap folders in the background; new heatmaps are indexed as they are written."""
+    mgr = get_retention()
+    heatmap_writer.add_listener(lambda a: mgr.note_written(a.get("heatmap_path")))
+    mgr.start()
+    return mgr
+
+def _room_stamp(room):
+    """mtimes of what a room's regions are built from: template, manifest and crop folder."""
+    out = []
+    for rel in ("template.png", manifest.MANIFEST_FILE, "group_templates"):
+        try:
+            out.append(os.stat(os.path.join(BASE_DIR, room, rel)).st_mtime_ns)
+        except OSError:
+            out.append(None)
+    return tuple(out)
+
+def reload_room(room, template=False):
+    """Forget one room's crops, regions and diff model (and template) so they are rebuilt on next use."""
+    global _room_classifier
+    with _load_lock:
+        for cache in (group_templates, baseline_regions, diff_models):
+            cache.pop(room, None)
+        if template:
+            template_images.pop(room, None)
+            _room_classifier = None
+
+def watch_regions(interval=None):
+    """
+    Background thread that reloads a room as soon as its template, region
+    manifest or crops change on disk (e.g. while train.py is open), leaving
+    every other room's state alone. Reloads are counted in rooms_reloaded
+    (the workers' stats()).
+    """
+    def run():
+        global rooms_reloaded
+        stamps = {}
+        while True:
+            for room in list(ROOMS):
+                st = _room_stamp(room)
+                old = stamps.get(room)
+                stamps[room] = st
+                if old is not None and st != old:
+                    reload_room(room, template=st[0] != old[0])
+                    rooms_reloaded += 1
+            time.sleep(interval or REGION_WATCH_INTERVAL)
+    t = threading.Thread(target=run, name="region-watch", daemon=True)
+    t.start()
+    return t
+
+# ───── TEMPLATE BUNDLE ─────────────────────────────────────────────
+# Decoded templates, crops and regions are read from a memory-mapped
+# bundle (see bundle.py) for every room it holds as the room is on disk
+# now. A room that changed since is loaded from its PNGs as before, and
+# the bundle is rebuilt in the background for the next start.
+def get_bundle():
+    """The LogCabin bundle, re-opened whenever it is rebuilt; None if there is none."""
+    global _bundle, _bundle_key
+    if not bundle.ENABLED:
+        return None
+    with _load_lock:
+        try:
+            key = (BASE_DIR, os.stat(bundle.index_path(BASE_DIR)).st_mtime_ns)
+        except OSError:
+            key = (BASE_DIR, None)
+        if key != _bundle_key:
+            _bundle_key = key
+            _bundle = bundle.Bundle.open(BASE_DIR) if key[1] is not None else None
+        return _bundle
+
+def _bundle_settings():
+    # matched regions depend on these as well as on the files
+    return {"match_threshold": MATCH_THRESHOLD, "locate_scales": list(align.LOCATE_SCALES)}
+
+def _bundled(room):
+    """The bundle if it holds `room` as it is on disk now, else None (and schedule a rebuild)."""
+    b = get_bundle()
+    if b is not None and b.fresh(room, _bundle_settings()):
+        return b
+    if bundle.ENABLED and os.path.isdir(os.path.join(BASE_DIR, room)):
+        rebuild_bundle()
+    return None
+
+def bundle_current():
+    b = get_bundle()
+    return b is not None and all(b.fresh(room, _bundle_settings()) for room in ROOMS)
+
+def build_bundle():
+    """
+    Pack every room of ROOMS, read fresh from disk, into the bundle.
+    Returns the index path, or None if another process is already building.
+    """
+    lock = bundle.try_lock(BASE_DIR)
+    if lock is None:
+        return None
+    try:
+        rooms = {}
         for room in ROOMS:
-            if room.lower() in text.lower():
-                return room
+            room_dir = os.path.join(BASE_DIR, room)
+            # stamped before reading, so an edit made meanwhile shows up as stale
+            stamp = bundle.source_stamp(room_dir)
+            stamp.update(_bundle_settings())
+            tpl_img = cv2.imread(os.path.join(room_dir, "template.png"))
+            crops = {n: c for n, c in _read_crops(room).items() if c is not None}
+            # crops are packed even without a template: get_group_templates() reads them anyway
+            entry = {"stamp": stamp, "meta": {"template": tpl_img is not None, "crops": sorted(crops),
+                                              "regions": []},
+                     "arrays": {"crop/" + n: c for n, c in crops.items()}}
+            if tpl_img is not None:
+                regs, missing = manifest.load_regions(room_dir)
+                if missing:
+                    regs = regs + _matched_regions(room, missing, tpl_img, crops)
+                model = diffengine.RoomDiffModel(tpl_img, regs, dynamic_rect(*tpl_img.shape[:2]))
+                entry["meta"]["regions"] = regs
+                entry["arrays"].update(template=tpl_img, gray=model.tpl_gray)
+            rooms[room] = entry
+        return bundle.write(BASE_DIR, rooms)
+    finally:
+        bundle.unlock(lock)
+
+def rebuild_bundle(background=True):
+    """build_bundle(), by default on a thread; a no-op while a build is already running."""
+    global _bundle_thread
+
+    def work():
+        try:
+            build_bundle()
+        except OSError as e:
+            print("template bundle not written:", e)
+    if not background:
+        work()
+        return None
+    with _load_lock:
+        if _bundle_thread is not None and _bundle_thread.is_alive():
+            return _bundle_thread
+        _bundle_thread = threading.Thread(target=work, name="bundle-build", daemon=True)
+        _bundle_thread.start()
+        return _bundle_thread
+
+def warmup(background=True):
+    """Load the OCR model, classifier and every room's regions ahead of the first scan."""
+    def work():
+        get_room_classifier()
+        for room in ROOMS:
+            get_baseline_regions(room)
+        get_reader()
+    if not background:
+        work()
+        return None
+    t = threading.Thread(target=work, name="backend-warmup", daemon=True)
+    t.start()
+    return t
+
+def capture_screen():
+    """Full monitor as a BGR frame (replay, calibration and other full-frame users)."""
+    return cv2.cvtColor(grabber.grab(), cv2.COLOR_BGRA2BGR)
+
+to_gray = labelocr.to_gray
+
+def ocr_room_from_label(roi):
+    """Full EasyOCR pass (text detector + recognizer) over the label ROI."""
+    for _, text, _ in get_reader().readtext(to_gray(roi)):
+        room = labelocr.match_room(text, ROOMS)
+        if room:
+            return room
     return None
 
+def ocr_room(roi):
+    with timings.stage("ocr"):
+        if OCR_MODE == "fast":
+            return get_label_ocr().read(roi)
+        return ocr_room_from_label(roi)
+
+def detect_room_from_label(roi):
+    """Classify by label signature; only run OCR when the classifier is unsure."""
+    with timings.stage("detect"):
+        room, _ = get_room_classifier().classify_roi(roi)
+        if room or not OCR_FALLBACK:
+            return room
+        return ocr_room(roi)
+
+def detect_room_name_ocr(img):
+    return ocr_room_from_label(roomid.label_roi(img))
+
+def detect_room_name(img):
+    return detect_room_from_label(roomid.label_roi(img))
+
+def dynamic_rect(h, w):
+    """(x1, y1, x2, y2) of the room-label overlay that is excluded from diffs."""
+    return roomid.label_rect(h, w)
+
 def mask_dynamic(img):
     h, w = img.shape[:2]
+    x1, y1, x2, y2 = dynamic_rect(h, w)
     m = img.copy()
-    cv2.rectangle(m, (0, int(h*0.80)), (int(w*0.30), h), (0,0,0), -1)
+    cv2.rectangle(m, (x1, y1), (x2, y2), (0,0,0), -1)
     return m
 
-def detect_regions_in_template(room):
-    tpl_img = template_images.get(room)
+def detect_regions_in_template(room, names=None, tpl_img=None, crops=None):
+    """
+    Find each crop (or just `names`) in the room's template with
+    align.locate(). tpl_img and crops default to get_template() and
+    get_group_templates().
+    """
+    tpl_img = get_template(room) if tpl_img is None else tpl_img
     if tpl_img is None:
         return []
     gray_tpl = cv2.cvtColor(tpl_img, cv2.COLOR_BGR2GRAY)
     regs = []
-    for name, tpl in group_templates[room].items():
-        if tpl is None:
+    for name, tpl in (get_group_templates(room) if crops is None else crops).items():
+        if tpl is None or (names is not None and name not in names):
             continue
-        res = cv2.matchTemplate(gray_tpl, tpl, cv2.TM_CCOEFF_NORMED)
-        _, max_val, _, max_loc = cv2.minMaxLoc(res)
-        if max_val >= MATCH_THRESHOLD:
-            x, y = max_loc
-            h, w = tpl.shape
+        # multi-scale, coarse-to-fine search instead of one full-size match
+        max_val, box = align.locate(gray_tpl, tpl)
+        if box is not None and max_val >= MATCH_THRESHOLD:
+            x1, y1, x2, y2 = box
             regs.append({
                 "class_name": name,
-                "box": [float(x), float(y), float(x+w), float(y+h)]
+                "box": [float(x1), float(y1), float(x2), float(y2)]
             })
     return regs
 
-# Precompute baseline regions
-baseline_regions = {
-    room: detect_regions_in_template(room)
-    for room in ROOMS
-}
+def _source_stamp(room, names):
+    """mtime/size of the template and every crop; any change invalidates the cache."""
+    files = {"template.png": os.path.join(BASE_DIR, room, "template.png")}
+    tpl_dir = os.path.join(BASE_DIR, room, "group_templates")
+    if os.path.isdir(tpl_dir):
+        for fn in sorted(os.listdir(tpl_dir)):
+            if fn.lower().endswith(".png"):
+                files["group_templates/" + fn] = os.path.join(tpl_dir, fn)
+    stamp = {"match_threshold": MATCH_THRESHOLD, "locate_scales": list(align.LOCATE_SCALES),
+             "matched": sorted(names)}
+    for key, path in files.items():
+        try:
+            st = os.stat(path)
+            stamp[key] = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stamp[key] = None
+    return stamp
 
-def process_room():
+def _matched_regions(room, names, tpl_img=None, crops=None):
     """
-    Capture screen, detect room, and for each baseline region:
-    diff that crop, then flag if pixel_count > PIXEL_COUNT_THRESHOLD.
-    Heatmaps are saved under LogCabin/<Room>/heatmaps/.
-    Returns (room, anomalies, None).
+    Boxes for crops the manifest doesn't cover, loaded from
+    LogCabin/<Room>/regions_cache.json when it matches the current template
+    files, otherwise re-matched (see detect_regions_in_template()) and
+    written back.
     """
-    time.sleep(0.2)
-    img = capture_screen()
-    room = detect_room_name(img)
-    tpl_img = template_images.get(room)
-    if not room or tpl_img is None:
-        return None, [], None
+    cache_path = os.path.join(BASE_DIR, room, REGION_CACHE_FILE)
+    stamp = _source_stamp(room, names)
+    try:
+        with open(cache_path) as f:
+            cached = json.load(f)
+        if cached.get("stamp") == stamp:
+            return cached["regions"]
+    except (OSError, ValueError, KeyError):
+        pass
+    regs = detect_regions_in_template(room, set(names), tpl_img, crops)
+    if stamp.get("template.png") is not None:
+        try:
+            with open(cache_path, "w") as f:
+                json.dump({"stamp": stamp, "regions": regs}, f, indent=1)
+        except OSError:
+            pass
+    return regs
+
+def get_baseline_regions(room):
+    """
+    Region boxes for a room. Crops authored with train.py come straight
+    from the boxes in LogCabin/<Room>/regions.json (see manifest.py); only
+    crops it doesn't describe, or describes for an older template or crop,
+    are located by template matching.
+    """
+    with _load_lock:
+        if room in baseline_regions:
+            return baseline_regions[room]
+        b = _bundled(room)
+        if b is not None:
+            baseline_regions[room] = b.meta(room)["regions"]
+            return baseline_regions[room]
+        regs, missing = manifest.load_regions(os.path.join(BASE_DIR, room))
+        if missing:
+            regs = regs + _matched_regions(room, missing)
+        baseline_regions[room] = regs
+        return regs
 
-    # mask dynamic UI
-    img_m = mask_dynamic(img)
-    tpl_m = mask_dynamic(tpl_img)
+def get_diff_model(room):
+    """Masked grayscale template and region table for a room, built once."""
+    with _load_lock:
+        if room not in diff_models:
+            tpl_img = get_template(room)
+            if tpl_img is None:
+                return None
+            regs = get_baseline_regions(room)
+            limits = thresholds.load_limits(os.path.join(BASE_DIR, room), regs,
+                                            BINARY_THRESH, PIXEL_COUNT_THRESHOLD, DIFF_METRIC)
+            b = _bundled(room)
+            diff_models[room] = diffengine.RoomDiffModel(
+                tpl_img, regs, dynamic_rect(*tpl_img.shape[:2]), limits,
+                tpl_gray=b.array(room, "gray") if b is not None and b.meta(room)["regions"] == regs else None,
+                metric=DIFF_METRIC)
+        return diff_models[room]
+
+def _register_window(room, model, frame, origin, scale):
+    """
+    Region area plus the alignment margin, brought to template resolution
+    and registered. Returns (live, ox, oy), live's top-left being template
+    pixel (ox, oy), or None if the frame doesn't cover the area.
+    """
+    if scale is None:
+        scale = frame.shape[1] / get_template(room).shape[1]
+    m = align.ALIGN_MARGIN
+    ux1, uy1, ux2, uy2 = model.union
+    win = (ux1 - m, uy1 - m, ux2 + m, uy2 + m)
+    live = align.to_template_window(frame, origin, scale, win)
+    if live is None:
+        return None
+    dx, dy = align.register(live, model.tpl_gray, m)
+    return live, win[0] - dx, win[1] - dy
+
+def analyze_regions(room, frame, origin=(0, 0), scale=None, temporal=None):
+    """
+    Diff all of a room's baseline regions in one pass and flag those whose
+    pixel_count exceeds their limit: the calibrated one from
+    LogCabin/<Room>/thresholds.json (see calibrate()), or
+    PIXEL_COUNT_THRESHOLD for regions that were never calibrated.
 
-    # ensure the heatmap directory exists
+    `frame` (BGR or BGRA) may be just a crop of the screen whose top-left is
+    screen pixel `origin`; screen pixels are template pixels times `scale`
+    (by default the frame is taken to be a full screenshot and the scale is
+    its width over the template's). The region area is brought to template
+    resolution and registered to the template (align.register) before
+    diffing, so resolution changes and small camera shifts don't flag
+    every region.
+
+    With a temporal.TemporalFilter, regions that look the same as when
+    they were last diffed keep that diff's count instead of being re-diffed, and a
+    region is only reported once it has been flagged for PERSIST_FRAMES
+    scans in a row. Its heatmap is written when it is first confirmed;
+    later scans report it with that same heatmap.
+
+    Heatmaps for LogCabin/<Room>/heatmaps/ are handed to heatmap_writer, so
+    "heatmap_path" is None until the write completes.
+    """
+    model = get_diff_model(room)
+    if model is None:
+        return []
     heat_dir = os.path.join(BASE_DIR, room, HEATMAP_SUBFOLDER)
-    os.makedirs(heat_dir, exist_ok=True)
+
+    # region area plus an alignment margin, in template coordinates
+    with timings.stage("align"):
+        reg = _register_window(room, model, frame, origin, scale)
+    if reg is None:
+        return []
+    live, ox, oy = reg
+    ux1, uy1, ux2, uy2 = model.union
+
+    with timings.stage("diff"):
+        if temporal is None:
+            # one diff over the union of all regions, counts read from an integral image
+            counts, binm, base = model.score(live, BINARY_THRESH, (ox, oy))
+            report = np.flatnonzero(counts > model.limits)
+            fresh = np.ones(len(counts), np.bool_)
+            prev = None
+        else:
+            # only re-diff regions whose pixels moved since the previous scan
+            dirty = temporal.changed(room, model, live[uy1-oy:uy2-oy, ux1-ox:ux2-ox])
+            counts, binm, base = model.score(live, BINARY_THRESH, (ox, oy), subset=dirty)
+            counts = temporal.merge_counts(room, dirty, counts)
+            confirmed, fresh = temporal.confirm(room, counts > model.limits)
+            report = np.flatnonzero(confirmed)
+            prev = temporal.rooms[room].anomalies
+            fresh |= confirmed & np.array([p is None for p in prev], np.bool_)
+            if (fresh & ~dirty).any():
+                # confirmed on a scan that skipped it: diff just those for the heatmaps
+                _, binm, base = model.score(live, BINARY_THRESH, (ox, oy), subset=fresh, gate=False)
 
     anomalies = []
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    for region in baseline_regions[room]:
+    # microseconds, so two scans within a second don't overwrite each other's heatmaps
+    ts = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    for i in report:
+        if not fresh[i] and prev[i] is not None:
+            anomaly = dict(prev[i], pixel_count=int(counts[i]))
+            anomalies.append(anomaly)
+            continue
+        region = model.regions[i]
         cls = region["class_name"]
-        x1, y1, x2, y2 = map(int, region["box"])
-        live_crop = img_m[y1:y2, x1:x2]
-        tpl_crop  = tpl_m[y1:y2, x1:x2]
-
-        diff = cv2.absdiff(live_crop, tpl_crop)
-        gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
-        _, binm = cv2.threshold(gray, BINARY_THRESH, 255, cv2.THRESH_BINARY)
-        pix_count = int(np.count_nonzero(binm))
-
-        if pix_count > PIXEL_COUNT_THRESHOLD:
-            heat = cv2.applyColorMap(binm, cv2.COLORMAP_JET)
-            overlay = cv2.addWeighted(live_crop, 0.7, heat, 0.5, 0)
-            # save into the heatmaps subfolder
-            fname = f"{room}_{cls}_{ts}_HEAT.png"
-            heat_path = os.path.join(heat_dir, fname)
-            cv2.imwrite(heat_path, overlay)
-
-            anomalies.append({
-                "class_name": cls,
-                "box": region["box"],
-                "pixel_count": pix_count,
-                "heatmap_path": heat_path
-            })
+        x1, y1, x2, y2 = model.boxes[i]
+        live_crop = live[y1-oy:y2-oy, x1-ox:x2-ox]
+        if live_crop.shape[2] == 4:
+            live_crop = cv2.cvtColor(live_crop, cv2.COLOR_BGRA2BGR)
+        # save into the heatmaps subfolder (asynchronously)
+        heat_path = os.path.join(heat_dir, f"{room}_{cls}_{ts}_HEAT.png")
+        anomaly = {
+            "class_name": cls,
+            "box": region["box"],
+            "pixel_count": int(counts[i]),
+            "heatmap_path": None,
+            # where the heatmap will land, for the history store
+            "heatmap_ref": heat_path if heatmap_writer.mode == "disk" else None
+        }
+        heatmap_writer.submit(anomaly, live_crop, model.region_mask(binm, i, base), heat_path)
+        anomalies.append(anomaly)
+
+    if prev is not None:
+        prev[:] = [None] * len(prev)
+        for i, a in zip(report, anomalies):
+            prev[i] = a
+    return anomalies
+
+def analyze_frame(img):
+    """
+    Detect the room in a full BGR frame and diff its regions.
+    Returns (room, anomalies).
+    """
+    room = detect_room_name(img)
+    if not room or get_template(room) is None:
+        return None, []
+    return room, analyze_regions(room, img)
+
+def capture_scan():
+    """
+    Grab only what a scan needs: the label corner first, then the bounding
+    rectangle of the detected room's regions (plus the alignment margin).
+    Returns (room, frame, origin, scale); frame is BGRA and None if no room
+    was found.
+    """
+    with profiling.dump("capture"):
+        h, w = grabber.size()
+        with timings.stage("capture"):
+            label = grabber.grab(roomid.label_rect(h, w))
+        room = detect_room_from_label(label)
+        model = get_diff_model(room) if room else None
+        if model is None:
+            return None, None, (0, 0), 1.0
+        scale = w / get_template(room).shape[1]
+        m = align.ALIGN_MARGIN
+        ux1, uy1, ux2, uy2 = model.union
+        rect = grabber.clip((int((ux1 - m) * scale), int((uy1 - m) * scale),
+                             int(np.ceil((ux2 + m) * scale)), int(np.ceil((uy2 + m) * scale))))
+        with timings.stage("capture"):
+            frame = grabber.grab(rect)
+        return room, frame, rect[:2], scale
+
+def analyze_scan(captured, temporal=None):
+    """
+    Second half of a live scan: diff the regions grabbed by capture_scan().
+    Pass the same temporal.TemporalFilter for consecutive frames of a
+    continuous scan.
+    """
+    room, frame, origin, scale = captured
+    if frame is None:
+        return None, []
+    with profiling.dump("analyze"), timings.stage("analyze"):
+        anomalies = analyze_regions(room, frame, origin, scale, temporal)
+        if HISTORY_ENABLED:
+            get_history().record(room, anomalies)
+    return room, anomalies
 
+def process_room():
+    """
+    Wait for the camera to settle, capture the label and region area and analyze it.
+    Returns (room, anomalies, None).
+    """
+    with timings.stage("settle"):
+        time.sleep(SETTLE_DELAY)
+    with timings.stage("scan"):
+        room, anomalies = analyze_scan(capture_scan())
     return room, anomalies, None
+
+# ───── CALIBRATION ─────────────────────────────────────────────────
+# python -m backend calibrate [<dir-or-video>] learns a pixel-count limit
+# per region from frames with nothing out of place and stores them in
+# LogCabin/<Room>/thresholds.json, which get_diff_model() picks up.
+def measure_regions(room, frame, origin=(0, 0), scale=None):
+    """Changed-pixel count per baseline region (no flags, no heatmaps), or None."""
+    model = get_diff_model(room)
+    if model is None:
+        return None
+    reg = _register_window(room, model, frame, origin, scale)
+    if reg is None:
+        return None
+    live, ox, oy = reg
+    # ungated: calibration needs every region's count, not just the coarse pass's picks
+    counts, _, _ = model.score(live, BINARY_THRESH, (ox, oy), gate=False)
+    return counts
+
+def calibrate(frames=thresholds.CALIB_FRAMES, source=None, rooms=None, interval=0.5,
+              k=thresholds.NOISE_K):
+    """
+    Learn per-region limits from clean frames and write thresholds.json
+    for every room that got any. Live (source=None), the room on screen is
+    sampled every `interval` seconds until each of `rooms` has `frames`
+    samples; switch cameras while it runs, Ctrl+C stops early. With a
+    directory or video, every frame whose room is recognized is used.
+    Returns {room: frames used}.
+    """
+    rooms = list(rooms or ROOMS)
+    calib = {}
+
+    def sample(room, frame, origin=(0, 0), scale=None):
+        if room not in rooms:
+            return
+        counts = measure_regions(room, frame, origin, scale)
+        if counts is not None:
+            calib.setdefault(room, thresholds.Calibration(get_baseline_regions(room))).add(counts)
+
+    try:
+        if source is not None:
+            for task in list_replay_tasks(source):
+                for _, img in _task_frames(task):
+                    if img is not None:
+                        sample(detect_room_name(img), img)
+        else:
+            have = lambda r: len(calib[r].samples) if r in calib else 0
+            while any(have(r) < frames for r in rooms):
+                room, frame, origin, scale = capture_scan()
+                if room and have(room) < frames:
+                    sample(room, frame, origin, scale)
+                    print(f"{room}: {len(calib[room].samples)}/{frames}", end="\r", flush=True)
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+    for room, c in calib.items():
+        thresholds.save(os.path.join(BASE_DIR, room), c.result(BINARY_THRESH, k, DIFF_METRIC))
+        with _load_lock:
+            diff_models.pop(room, None)   # rebuilt with the new limits on next use
+    return {room: len(c.samples) for room, c in calib.items()}
+
+# ───── REPLAY ──────────────────────────────────────────────────────
+# Offline batch mode: python -m backend replay <dir-or-video> [-o report.jsonl]
+# Runs the same room detection and region diff over saved frames in a
+# process pool. Needs only cv2/numpy (no keyboard, mss or GUI toolkit).
+IMAGE_EXTS  = (".png", ".jpg", ".jpeg", ".bmp")
+VIDEO_CHUNK = 32      # frames decoded per task when replaying a video
+
+def list_replay_tasks(source):
+    """Image paths for a directory, or (video, start, count) chunks for a video."""
+    if os.path.isdir(source):
+        return [os.path.join(source, fn) for fn in sorted(os.listdir(source))
+                if fn.lower().endswith(IMAGE_EXTS)]
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise SystemExit(f"Cannot open {source}")
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    return [(source, start, min(VIDEO_CHUNK, n - start)) for start in range(0, n, VIDEO_CHUNK)]
+
+def _replay_init(base_dir, heatmap_mode, ocr, dump_dir=None, metric=None):
+    global BASE_DIR, OCR_FALLBACK, DIFF_METRIC
+    BASE_DIR = base_dir
+    OCR_FALLBACK = ocr
+    DIFF_METRIC = metric or DIFF_METRIC
+    heatmap_writer.mode = heatmap_mode
+    if dump_dir:
+        profiling.enable_dumps(dump_dir)
+
+def _replay_frame(name, img):
+    timings.reset()
+    t0 = time.perf_counter()
+    try:
+        with profiling.dump("replay"):
+            room, anomalies = analyze_frame(img)
+        err = None
+    except Exception as e:
+        room, anomalies, err = None, [], str(e)
+    heatmap_writer.flush()
+    stages = {s: round(float(v.sum()), 3) for s, v in timings.snapshot().items()}
+    rec = {
+        "frame": name,
+        "room": room,
+        "anomalies": [{k: a[k] for k in ("class_name", "box", "pixel_count", "heatmap_path")}
+                      for a in anomalies],
+        "ms": round((time.perf_counter() - t0) * 1000, 3),
+        "align_ms": round(align.stats.last_ms, 3),
+        "stages": stages,
+    }
+    if err:
+        rec["error"] = err
+    return rec
+
+def _task_frames(task):
+    """(name, BGR frame) for each frame of a replay task; frame is None if unreadable."""
+    if isinstance(task, str):
+        yield task, cv2.imread(task)
+        return
+    video, start, count = task
+    cap = cv2.VideoCapture(video)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+    for i in range(start, start + count):
+        ok, img = cap.read()
+        if not ok:
+            break
+        yield f"{os.path.basename(video)}#{i}", img
+    cap.release()
+
+def _replay_task(task):
+    out = []
+    for name, img in _task_frames(task):
+        if img is None:
+            out.append({"frame": name, "room": None, "anomalies": [], "error": "unreadable"})
+        else:
+            out.append(_replay_frame(os.path.basename(name), img))
+    return out
+
+def replay(source, out_path, workers=None, heatmap_mode="off", ocr=True, dump_dir=None,
+           metric=None):
+    """
+    Analyze every frame of `source`, write one JSON line per frame, return
+    the summary. Each record carries its per-stage milliseconds; their
+    percentiles over the run end up in the summary's "stages".
+    """
+    tasks = list_replay_tasks(source)
+    if bundle.ENABLED and not bundle_current():
+        rebuild_bundle(background=False)    # workers then map it instead of each decoding the PNGs
+    frames = anomalous = 0
+    stages = profiling.StageTimer(window=65536)
+    t0 = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    with open(out_path, "w") as out, ctx.Pool(workers, initializer=_replay_init,
+                                             initargs=(BASE_DIR, heatmap_mode, ocr, dump_dir,
+                                                       metric)) as pool:
+        for recs in pool.imap(_replay_task, tasks):
+            for rec in recs:
+                out.write(json.dumps(rec) + "\n")
+                frames += 1
+                anomalous += bool(rec["anomalies"])
+                for stage, ms in rec.get("stages", {}).items():
+                    stages.record(stage, ms)
+        elapsed = time.perf_counter() - t0
+        summary = {
+            "frames": frames,
+            "frames_with_anomalies": anomalous,
+            "seconds": round(elapsed, 3),
+            "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+            "workers": workers or os.cpu_count(),
+            "stages": stages.summary(),
+        }
+        out.write(json.dumps({"summary": summary}) + "\n")
+    return summary
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m backend")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rp = sub.add_parser("replay", help="run the detector over a directory of frames or a video")
+    rp.add_argument("source", help="directory of screenshots or a video file")
+    rp.add_argument("-o", "--out", default="replay.jsonl", help="JSONL report path")
+    rp.add_argument("-j", "--workers", type=int, default=None, help="processes (default: all cores)")
+    rp.add_argument("--heatmaps", choices=("off", "disk"), default="off",
+                    help="write heatmaps into LogCabin/<Room>/heatmaps as a live scan would")
+    rp.add_argument("--no-ocr", action="store_true", help="never fall back to EasyOCR")
+    rp.add_argument("--metric", choices=diffengine.METRICS, default=None,
+                    help="region comparison (default: DIFF_METRIC)")
+    rp.add_argument("--profile", nargs="?", const="profiles", default=None, metavar="DIR",
+                    help="print per-stage latencies and dump a cProfile per frame into DIR")
+    cp = sub.add_parser("calibrate", help="learn per-region thresholds from frames without anomalies")
+    cp.add_argument("source", nargs="?", default=None,
+                    help="directory or video of clean frames (default: sample the live screen)")
+    cp.add_argument("-n", "--frames", type=int, default=thresholds.CALIB_FRAMES,
+                    help="live frames per room")
+    cp.add_argument("--rooms", nargs="+", choices=ROOMS, default=None)
+    cp.add_argument("-k", type=float, default=thresholds.NOISE_K, help="limit = mean + k*std")
+    cp.add_argument("--no-ocr", action="store_true", help="never fall back to EasyOCR")
+    sub.add_parser("bundle", help="pack every room's templates, crops and regions into the "
+                                  "memory-mapped bundle (otherwise rebuilt automatically)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "replay":
+        summary = replay(args.source, args.out, args.workers, args.heatmaps, not args.no_ocr,
+                         args.profile, args.metric)
+        print(f"{summary['frames']} frames, {summary['frames_with_anomalies']} with anomalies, "
+              f"{summary['seconds']} s, {summary['fps']} fps -> {args.out}")
+        if args.profile:
+            print(profiling.format_table(summary["stages"]))
+            print(f"per-frame profiles in {args.profile}/")
+    elif args.cmd == "calibrate":
+        global OCR_FALLBACK
+        OCR_FALLBACK = not args.no_ocr
+        used = calibrate(args.frames, args.source, args.rooms, k=args.k)
+        for room, n in used.items():
+            print(f"{room}: {n} frames -> {thresholds.path_for(os.path.join(BASE_DIR, room))}")
+        if not used:
+            print("No room recognized; nothing calibrated.")
+    elif args.cmd == "bundle":
+        path = build_bundle()
+        print(f"-> {path}" if path else "Another process is building the bundle.")
+
+if __name__ == "__main__":
+    main()
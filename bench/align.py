@@ -0,0 +1,89 @@
+"""
+Registration benchmark: does one changed object take over the global
+alignment?
+
+    python bench/align.py [--rooms Kitchen Bedroom] [--regions 6 16] [--seeds 4] [--jitter 12]
+
+For every room built by bench/synth.py, each region in turn is shifted
+(or removed) on its own, with and without a camera shift of up to
+--jitter template pixels. The frames go through backend.analyze_regions()
+(the room is known, so the label's own movement doesn't matter). A
+registration is bad when it is more than 1 px off the camera shift that
+was applied; every other region flagged besides the changed one counts
+as a false positive (a shifted object may also cover a neighbour's box).
+Limits are calibrated from clean frames first, as in bench/suite.py.
+Exits with 1 if any registration was bad.
+"""
+import os
+import sys
+import shutil
+import argparse
+import tempfile
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import align
+import backend
+from bench.synth import Scene, TEMPLATE_SIZE, rooms_available
+from bench.suite import use_base_dir, calibrate
+
+def run(scenes, jitter, rng):
+    """{kind: [cases, bad shifts, false positives]} over every region of every scene."""
+    out = {}
+    for scene in scenes:
+        for i in range(len(scene.regions)):
+            for kind in ("shift", "remove"):
+                for jit in (0, jitter) if jitter else (0,):
+                    cam = tuple(int(v) for v in rng.integers(-jit, jit + 1, 2)) if jit else (0, 0)
+                    img = scene.frame([(i, kind)], rng=rng)
+                    if cam != (0, 0):
+                        img = cv2.warpAffine(img, np.float32([[1, 0, cam[0]], [0, 1, cam[1]]]),
+                                             img.shape[1::-1], borderMode=cv2.BORDER_REPLICATE)
+                    anomalies = backend.analyze_regions(scene.room, img)
+                    shift = align.stats.last_shift
+                    row = out.setdefault(f"{kind}{'+camera' if jit else ''}", [0, 0, 0])
+                    row[0] += 1
+                    row[1] += max(abs(shift[0] - cam[0]), abs(shift[1] - cam[1])) > 1
+                    row[2] += sum(a["class_name"] != scene.regions[i]["class_name"] for a in anomalies)
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rooms", nargs="+", default=None, help="default: every room in LogCabin")
+    ap.add_argument("--regions", nargs="+", type=int, default=[6, 16], help="regions per room")
+    ap.add_argument("--seeds", type=int, default=4, help="synthetic rooms built per region count")
+    ap.add_argument("--jitter", type=int, default=12, help="max camera shift, template px (0: none)")
+    ap.add_argument("--calib", type=int, default=6, help="clean frames per room to calibrate limits")
+    args = ap.parse_args()
+
+    src_dir, src_rooms = backend.BASE_DIR, backend.ROOMS
+    rooms = args.rooms or rooms_available()
+    backend.OCR_FALLBACK = False
+    backend.HISTORY_ENABLED = False
+    backend.heatmap_writer.mode = "off"
+
+    totals = {}
+    for n_regions in args.regions:
+        for seed in range(args.seeds):
+            rng = np.random.default_rng(seed)
+            scenes = [Scene(room, n_regions, rng, src_dir) for room in rooms]
+            tmp = tempfile.mkdtemp(prefix="odai-align-")
+            try:
+                for scene in scenes:
+                    scene.write(tmp)
+                use_base_dir(tmp, rooms)
+                calibrate(scenes, TEMPLATE_SIZE, args.calib, rng)
+                for kind, row in run(scenes, args.jitter, rng).items():
+                    t = totals.setdefault(kind, [0, 0, 0])
+                    for j, v in enumerate(row):
+                        t[j] += v
+            finally:
+                use_base_dir(src_dir, src_rooms)
+                shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"{'case':<14} {'frames':>7} {'bad shift':>10} {'false pos':>10}")
+    for kind, (n, bad, fp) in totals.items():
+        print(f"{kind:<14} {n:>7} {bad:>10} {fp:>10}")
+    print(f"shifts rejected by the residual check: {align.stats.rejected}")
+    sys.exit(1 if any(bad for _, bad, _ in totals.values()) else 0)
@@ -0,0 +1,62 @@
+"""
+Capture benchmark: full-monitor grab (fresh mss context, whole-frame
+BGRA->BGR) vs. the persistent region-limited grabber used by scans.
+
+    python bench/capture.py [--room Bedroom] [--repeat 30]
+
+Needs a display. Without a template for the room, a quarter of the
+screen stands in for its region area.
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import mss
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import roomid
+
+def full_frame():
+    with mss.mss() as sct:
+        frame = np.array(sct.grab(sct.monitors[1]))
+    out = cv2.cvtColor(frame, cv2.COLOR_BGRA2BGR)
+    return frame.nbytes + out.nbytes
+
+def region_limited(union):
+    g = backend.grabber
+    before = g.bytes_copied
+    h, w = g.size()
+    label = g.grab(roomid.label_rect(h, w))
+    roomid.roi_signature(label)
+    g.grab(union)
+    return g.bytes_copied - before
+
+def measure(fn, repeat):
+    fn()
+    times, sizes = [], []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        sizes.append(fn())
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times)//2], sum(sizes) / len(sizes)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--room", default=backend.ROOMS[0])
+    ap.add_argument("--repeat", type=int, default=30)
+    args = ap.parse_args()
+
+    model = backend.get_diff_model(args.room)
+    if model is not None:
+        union = model.union
+    else:
+        h, w = backend.grabber.size()
+        union = (w // 4, h // 4, w // 2, h // 2)
+    print(f"room {args.room}, region area {union}")
+    for name, fn in (("full frame", full_frame), ("region-limited", lambda: region_limited(union))):
+        ms, nbytes = measure(fn, args.repeat)
+        print(f"{name:<15} median {ms:7.2f} ms   {nbytes/1e6:7.2f} MB copied per scan")
@@ -0,0 +1,69 @@
+"""
+Region diff micro-benchmark: per-region loop (the original process_room
+body) vs. diffengine.RoomDiffModel, on synthetic 1080p and 4K frames.
+
+    python bench/diff.py [--regions 8 32 128] [--repeat 50]
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import diffengine
+
+RESOLUTIONS = {"1080p": (1080, 1920), "4K": (2160, 3840)}
+
+def make_case(h, w, n_regions, rng):
+    tpl = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+    tpl = cv2.GaussianBlur(tpl, (0, 0), 3)
+    frame = tpl.copy()
+    regions = []
+    for i in range(n_regions):
+        rw, rh = int(rng.integers(w // 40, w // 6)), int(rng.integers(h // 40, h // 6))
+        x, y = int(rng.integers(0, w - rw)), int(rng.integers(0, int(h * 0.8) - rh))
+        regions.append({"class_name": f"r{i}", "box": [float(x), float(y), float(x+rw), float(y+rh)]})
+        if i % 4 == 0:
+            frame[y:y+rh//2, x:x+rw//2] ^= 0x80
+    return tpl, frame, regions
+
+def legacy(tpl, frame, regions):
+    img_m = backend.mask_dynamic(frame)
+    tpl_m = backend.mask_dynamic(tpl)
+    counts = []
+    for region in regions:
+        x1, y1, x2, y2 = map(int, region["box"])
+        diff = cv2.absdiff(img_m[y1:y2, x1:x2], tpl_m[y1:y2, x1:x2])
+        gray = cv2.cvtColor(diff, cv2.COLOR_BGR2GRAY)
+        _, binm = cv2.threshold(gray, backend.BINARY_THRESH, 255, cv2.THRESH_BINARY)
+        counts.append(int(np.count_nonzero(binm)))
+    return counts
+
+def timeit(fn, repeat):
+    fn()
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    times.sort()
+    return times[len(times)//2]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--regions", type=int, nargs="+", default=[8, 32, 128])
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'frame':<6} {'regions':>7} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8}")
+    for name, (h, w) in RESOLUTIONS.items():
+        for n in args.regions:
+            tpl, frame, regions = make_case(h, w, n, rng)
+            model = diffengine.RoomDiffModel(tpl, regions, backend.dynamic_rect(h, w))
+            t_old = timeit(lambda: legacy(tpl, frame, regions), args.repeat)
+            t_new = timeit(lambda: model.score(frame, backend.BINARY_THRESH), args.repeat)
+            print(f"{name:<6} {n:>7} {t_old:>10.2f} {t_new:>10.2f} {t_old/t_new:>7.1f}x")
@@ -0,0 +1,82 @@
+"""
+Feed scaling benchmark: scans per second with 1..N feed processes sharing
+one set of templates through feeds.SharedTemplates.
+
+    python bench/feeds.py [--procs 1 2 4] [--seconds 5] [--regions 32]
+
+Each process analyzes a synthetic 1080p frame in a loop (no screen
+capture, heatmaps off), so the numbers show how the analysis itself scales
+with cores and what each process costs in private memory.
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import multiprocessing
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import feeds
+from bench.diff import make_case
+
+ROOM = "Bench"
+
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+def worker(manifest, frame, seconds, out):
+    backend.heatmap_writer.mode = "off"
+    backend.HISTORY_ENABLED = False
+    shm = feeds.SharedTemplates.attach(manifest)
+    backend.analyze_regions(ROOM, frame)
+    n, t_end = 0, time.perf_counter() + seconds
+    while time.perf_counter() < t_end:
+        backend.analyze_regions(ROOM, frame)
+        n += 1
+    out.put((n, rss_mb()))
+    del shm
+
+def run(manifest, frame, procs, seconds):
+    ctx = multiprocessing.get_context("spawn")
+    out = ctx.Queue()
+    ps = [ctx.Process(target=worker, args=(manifest, frame, seconds, out)) for _ in range(procs)]
+    for p in ps:
+        p.start()
+    res = [out.get() for _ in ps]
+    for p in ps:
+        p.join()
+    return sum(n for n, _ in res) / seconds, max(r for _, r in res)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--regions", type=int, default=32)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    tpl, frame, regions = make_case(1080, 1920, args.regions, rng)
+    backend.BASE_DIR = tempfile.mkdtemp()
+    backend.template_images[ROOM] = tpl
+    backend.baseline_regions[ROOM] = regions
+    shared = feeds.SharedTemplates([ROOM])
+    try:
+        print(f"{os.cpu_count()} cores, {args.regions} regions, shared block "
+              f"{shared.shm.size / 1e6:.1f} MB")
+        print(f"{'procs':>5} {'scans/s':>9} {'per proc':>9} {'scaling':>8} {'rss MB':>7}")
+        base = None
+        for n in args.procs:
+            rate, rss = run(shared.manifest, frame, n, args.seconds)
+            base = base or rate / n
+            print(f"{n:>5} {rate:>9.1f} {rate / n:>9.1f} {rate / base / n:>7.0%} {rss:>7.0f}")
+    finally:
+        shared.close()
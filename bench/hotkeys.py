@@ -0,0 +1,116 @@
+"""
+Hotkey harness: drives hotkeys.Hotkeys with synthetic key events and
+checks debounce and delivery, reporting press-to-callback latency.
+
+    python bench/hotkeys.py [--loop thread|tk|qt] [--os] [--presses 200]
+
+--loop picks what runs the callbacks: a plain thread standing in for a
+GUI loop, a real Tk mainloop (tk_poster) or a Qt event loop (qt_poster,
+works with QT_QPA_PLATFORM=offscreen). Presses are injected from a
+separate thread, as the keyboard module's hook delivers them. With --os
+they are sent through the OS instead (keyboard.press_and_release), which
+exercises the system-wide hook and needs root on Linux.
+
+Exits non-zero if any check fails.
+"""
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import hotkeys
+
+def check_debounce():
+    """Timestamped presses: auto-repeat inside the window is dropped, nothing is slept."""
+    fired = []
+    hk = hotkeys.Hotkeys(lambda fn: fn(), debounce=0.5)
+    hk.bind("6", lambda: fired.append("6")).bind("7", lambda: fired.append("7"))
+    for i in range(11):                  # "6" held for a second, repeating every 100 ms
+        hk.inject("6", now=i * 0.1)
+    hk.inject("7", now=0.05)             # other keys have their own window
+    hk.inject("x", now=0.0)              # unbound
+    ok = fired.count("6") == 3 and fired.count("7") == 1 and hk.debounced == 8
+    print(f"debounce     {'ok' if ok else 'FAIL'}  fired {fired}  {hk.stats()}")
+    return ok
+
+def thread_loop():
+    """A stand-in GUI thread: post() queues, the thread runs callbacks in order."""
+    q = queue.SimpleQueue()
+
+    def run():
+        while True:
+            fn = q.get()
+            if fn is None:
+                return
+            fn()
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    return q.put, lambda: q.put(None), None
+
+def tk_loop():
+    import tkinter as tk
+    root = tk.Tk()
+    root.withdraw()
+    return hotkeys.tk_poster(root), root.quit, root.mainloop
+
+def qt_loop():
+    from PyQt5 import QtWidgets
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    return hotkeys.qt_poster(), app.quit, app.exec_
+
+def check_delivery(loop, presses, via_os):
+    post, quit_loop, run_loop = {"thread": thread_loop, "tk": tk_loop, "qt": qt_loop}[loop]()
+    hk = hotkeys.Hotkeys(post, debounce=0.0)
+    sent, lat, done = {}, [], threading.Event()
+
+    def on_key():
+        lat.append((time.perf_counter() - sent["t"]) * 1000)
+        if len(lat) >= presses:
+            done.set()
+            quit_loop()
+
+    hk.bind("6", on_key)
+    if via_os:
+        import keyboard
+        if not hk.start():
+            print("delivery     FAIL  system-wide hook unavailable")
+            return False
+
+    def feed():
+        time.sleep(0.2)                  # let the loop start
+        for _ in range(presses):
+            sent["t"] = time.perf_counter()
+            if via_os:
+                keyboard.press_and_release("6")
+            else:
+                hk.inject("6")
+            time.sleep(0.005)
+        if not done.wait(5):
+            quit_loop()
+
+    threading.Thread(target=feed, daemon=True).start()
+    if run_loop is not None:
+        run_loop()
+    done.wait(6)
+    hk.stop()
+    ok = len(lat) == presses
+    if lat:
+        p50, p99 = np.percentile(lat, (50, 99))
+        print(f"delivery     {'ok' if ok else 'FAIL'}  {loop}{' via OS' if via_os else ''}: "
+              f"{len(lat)}/{presses} callbacks, press-to-callback p50 {p50:.3f} ms, p99 {p99:.3f} ms")
+    else:
+        print(f"delivery     FAIL  {loop}: no callbacks")
+    return ok
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--loop", choices=["thread", "tk", "qt"], default="thread")
+    ap.add_argument("--os", action="store_true", help="send real key events through the OS hook")
+    ap.add_argument("--presses", type=int, default=200)
+    args = ap.parse_args()
+    results = [check_debounce(), check_delivery(args.loop, args.presses, args.os)]
+    sys.exit(0 if all(results) else 1)
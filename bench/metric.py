@@ -0,0 +1,139 @@
+"""
+Diff metric benchmark: "absdiff" vs. "ssim" (diffengine.METRICS), per-region
+cost and how often each flags a region that hasn't changed.
+
+    python bench/metric.py [<clean frames dir-or-video>] [--frames 40] [--regions 32]
+
+With a source, every frame whose room is recognized is scored against
+that room's template and limits, as a replay would. The frames are taken
+to be clean, as for `python -m backend calibrate`, so every flagged
+region counts as a false positive. Without a source, a synthetic 1080p
+room is used. Its frames get a random brightness offset, contrast
+gain and sensor noise, and a real change is pasted into --changed of
+the regions. That measures the false-positive rate on the untouched
+regions and the detection rate on the changed ones. There each region's
+limit is --fraction of its area; the patch covers a quarter of it.
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import diffengine
+import thresholds
+from bench.diff import make_case
+
+def perturb(tpl, regions, rng, changed):
+    """
+    tpl under other lighting and noise, with a solid patch over the
+    `changed` regions. Also returns how many patched pixels fall in each
+    region (regions overlap, so a patch can land in several).
+    """
+    gain, offset = rng.uniform(0.85, 1.15), rng.uniform(-30, 30)
+    f = tpl.astype(np.float32) * gain + offset
+    f += rng.normal(0, rng.uniform(2, 6), f.shape)
+    patched = np.zeros(tpl.shape[:2], np.uint8)
+    for i in np.flatnonzero(changed):
+        x1, y1, x2, y2 = map(int, regions[i]["box"])
+        w, h = x2 - x1, y2 - y1
+        f[y1 + h // 4:y2 - h // 4, x1 + w // 4:x2 - w // 4] = rng.integers(0, 256, 3)
+        patched[y1 + h // 4:y2 - h // 4, x1 + w // 4:x2 - w // 4] = 1
+    inside = [int(patched[int(r["box"][1]):int(r["box"][3]), int(r["box"][0]):int(r["box"][2])].sum())
+              for r in regions]
+    return np.clip(f, 0, 255).astype(np.uint8), np.array(inside)
+
+def synthetic_cases(n_frames, n_regions, changed, rng):
+    tpl, _, regions = make_case(1080, 1920, n_regions, rng)
+    # scene-scale structure (make_case's texture alone is fine-grained noise)
+    coarse = rng.integers(0, 256, (1080 // 16, 1920 // 16, 3), dtype=np.uint8)
+    coarse = cv2.resize(coarse, (1920, 1080), interpolation=cv2.INTER_CUBIC)
+    tpl = cv2.addWeighted(coarse, 0.7, tpl, 0.3, 0)
+    for _ in range(n_frames):
+        frame, inside = perturb(tpl, regions, rng, rng.random(len(regions)) < changed)
+        yield "Synthetic", tpl, regions, frame, inside
+
+def replay_cases(source):
+    for task in backend.list_replay_tasks(source):
+        for _, img in backend._task_frames(task):
+            room = backend.detect_room_name(img) if img is not None else None
+            if room and backend.get_template(room) is not None:
+                yield room, backend.get_template(room), backend.get_baseline_regions(room), img, None
+
+def run(cases, limit, fraction):
+    """`changed`: patched pixels per region (None for a replayed, clean frame)."""
+    models = {}
+    res = {m: {"us": 0.0, "regions": 0, "fp": 0, "neg": 0, "tp": 0, "pos": 0,
+               "coarse": 0, "escalated": 0} for m in diffengine.METRICS}
+    for room, tpl, regions, frame, changed in cases:
+        for metric in diffengine.METRICS:
+            model = models.get((room, metric))
+            if model is None:
+                if fraction is not None:
+                    limits = [fraction * (b[2] - b[0]) * (b[3] - b[1])
+                              for b in (r["box"] for r in regions)]
+                elif limit is None:
+                    limits = thresholds.load_limits(os.path.join(backend.BASE_DIR, room), regions,
+                                                    backend.BINARY_THRESH,
+                                                    backend.PIXEL_COUNT_THRESHOLD, metric)
+                else:
+                    limits = np.full(len(regions), limit)
+                model = models[room, metric] = diffengine.RoomDiffModel(
+                    tpl, regions, backend.dynamic_rect(*tpl.shape[:2]), limits, metric=metric)
+            if changed is None:
+                reg = backend._register_window(room, model, frame, (0, 0), None)
+                if reg is None:
+                    continue
+                live, ox, oy = reg
+            else:
+                live, ox, oy = frame, 0, 0
+            t0 = time.perf_counter()
+            counts, _, _ = model.score(live, backend.BINARY_THRESH, (ox, oy))
+            r = res[metric]
+            r["us"] += (time.perf_counter() - t0) * 1e6
+            r["regions"] += len(regions)
+            flagged = counts > model.limits
+            if changed is None:
+                changed = np.zeros(len(regions), np.int64)
+            # positives must be flagged, untouched regions must not; a
+            # region with a sliver of a neighbour's patch could go either way
+            pos, neg = changed > model.limits, changed == 0
+            r["fp"] += int((flagged & neg).sum())
+            r["neg"] += int(neg.sum())
+            r["tp"] += int((flagged & pos).sum())
+            r["pos"] += int(pos.sum())
+    for (room, metric), model in models.items():
+        res[metric]["coarse"] += model.coarse_regions
+        res[metric]["escalated"] += model.escalated
+    return res
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("source", nargs="?", default=None, help="directory or video of clean frames")
+    ap.add_argument("--frames", type=int, default=40, help="synthetic frames")
+    ap.add_argument("--regions", type=int, default=32, help="synthetic regions")
+    ap.add_argument("--changed", type=float, default=0.25, help="synthetic: share of regions patched")
+    ap.add_argument("--limit", type=int, default=None,
+                    help="pixel-count limit for every region of a replay (default: "
+                         "thresholds.json, else PIXEL_COUNT_THRESHOLD)")
+    ap.add_argument("--fraction", type=float, default=0.1,
+                    help="synthetic: limit as a fraction of the region area")
+    args = ap.parse_args()
+
+    if args.source:
+        cases = replay_cases(args.source)
+    else:
+        cases = synthetic_cases(args.frames, args.regions, args.changed, np.random.default_rng(0))
+    res = run(cases, args.limit, None if args.source else args.fraction)
+    print(f"{'metric':<8} {'us/region':>10} {'false pos':>10} {'detected':>10} {'escalated':>10}")
+    for metric, r in res.items():
+        if not r["regions"]:
+            print(f"{metric:<8} no frames scored")
+            continue
+        fp = f"{r['fp'] / r['neg']:.1%}" if r["neg"] else "n/a"
+        tp = f"{r['tp'] / r['pos']:.1%}" if r["pos"] else "n/a"
+        esc = f"{r['escalated'] / r['coarse']:.1%}" if r["coarse"] else "-"
+        print(f"{metric:<8} {r['us'] / r['regions']:>10.1f} {fp:>10} {tp:>10} {esc:>10}")
@@ -0,0 +1,173 @@
+"""
+Overlay frame-time benchmark: the Qt overlay under a stream of synthetic
+scan results, drawn the old way (immediate mode) and with
+overlayviews.BoxLayer / AnomalyPanel (retained mode).
+
+    QT_QPA_PLATFORM=offscreen python bench/overlay.py [--results 300] [--regions 24]
+                                                      [--size 1920x1080] [--no-viewer]
+
+Both modes show the same thing: a full-screen translucent window dimmed
+like TempUI's overlay, the scanned room's anomaly boxes with their
+heatmaps and, unless --no-viewer, the anomaly list refreshed on every
+result. The legacy mode works like TempUI did before. It fills the whole
+window on every repaint, converts and scales each heatmap while
+painting, and tears down and rebuilds the list's widgets per result. A
+frame is one result applied plus the repaint it causes, up to
+processEvents() returning. Anomalies appear, persist and clear, and
+their pixel counts jitter, as in continuous monitoring.
+"""
+import os
+import sys
+import time
+import argparse
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+from PyQt5 import QtCore, QtGui, QtWidgets
+import imagecache
+import overlayviews
+import profiling
+
+LABEL = overlayviews.LABEL_HEIGHT
+
+def results(n, n_regions, size, rng, flip=0.03):
+    """n (room, anomalies) for one room whose anomalies come and go."""
+    w, h = size
+    boxes = []
+    for _ in range(n_regions):
+        bw, bh = rng.integers(60, 240), rng.integers(60, 240)
+        x, y = rng.integers(320, w - bw), rng.integers(LABEL + 20, h - bh)
+        boxes.append([float(x), float(y), float(x + bw), float(y + bh)])
+    live = {}     # region index -> heatmap, while anomalous
+    for _ in range(n):
+        for i in np.flatnonzero(rng.random(n_regions) < flip):
+            if i in live:
+                del live[i]
+            else:
+                b = boxes[i]
+                live[i] = rng.integers(0, 256, (int(b[3] - b[1]), int(b[2] - b[0]), 3), dtype=np.uint8)
+        yield "Synthetic", [{"class_name": f"Region{i}", "box": boxes[i],
+                             "pixel_count": int(rng.integers(900, 1000)), "heatmap": live[i],
+                             "heatmap_path": None} for i in sorted(live)]
+
+class Window(QtWidgets.QWidget):
+    """Stand-in for TempUI.Overlay: translucent, dimmed, a viewer panel on the right."""
+
+    def __init__(self, size, thumbs):
+        super().__init__()
+        self.setAttribute(QtCore.Qt.WA_TranslucentBackground)
+        self.setGeometry(0, 0, *size)
+        self.thumbs = thumbs
+        self.paints = 0
+        self.painted_px = 0
+        self.right = QtWidgets.QVBoxLayout()
+        # TempUI's columns: a fixed 300 px panel, the viewer taking the rest
+        outer = QtWidgets.QHBoxLayout(self)
+        outer.addSpacing(300)
+        outer.addLayout(self.right, 1)
+
+    def count_paint(self, ev):
+        self.paints += 1
+        self.painted_px += sum(r.width() * r.height() for r in ev.region().rects())
+
+class Legacy(Window):
+    def __init__(self, size, thumbs):
+        super().__init__(size, thumbs)
+        self.anomalies = []
+
+    def apply(self, room, anomalies, viewer):
+        self.anomalies = anomalies
+        if viewer:
+            while self.right.count():
+                item = self.right.takeAt(0)
+                if item.widget():
+                    item.widget().deleteLater()
+            for a in anomalies:
+                hdr = QtWidgets.QLabel(f"{a['class_name']}: {a['pixel_count']} px changed")
+                self.right.addWidget(hdr)
+                thumb = self.thumbs.heatmap(a)
+                lbl = QtWidgets.QLabel()
+                lbl.setPixmap(overlayviews.to_pixmap(thumb))
+                self.right.addWidget(lbl)
+        self.update()
+
+    def paintEvent(self, ev):
+        self.count_paint(ev)
+        p = QtGui.QPainter(self)
+        p.fillRect(self.rect(), QtGui.QColor(0, 0, 0, 160))
+        for a in self.anomalies:
+            x1, y1, x2, y2 = map(int, a["box"])
+            rect = QtCore.QRect(x1, y1, x2 - x1, y2 - y1)
+            pix = overlayviews.to_pixmap(self.thumbs.heatmap(a)).scaled(rect.size())
+            p.setOpacity(overlayviews.HEAT_OPACITY)
+            p.drawPixmap(rect.topLeft(), pix)
+            p.setOpacity(1.0)
+            p.setPen(QtGui.QPen(QtGui.QColor(*overlayviews.BOX_COLOR), 2))
+            p.drawRect(rect)
+            label = QtCore.QRect(x1, y1 - LABEL, max(x2 - x1, 120), LABEL)
+            p.fillRect(label, QtGui.QColor(*overlayviews.BOX_COLOR, 200))
+            p.setPen(QtCore.Qt.white)
+            p.drawText(label, QtCore.Qt.AlignVCenter, f"{a['class_name']} {a['pixel_count']}")
+        p.end()
+
+class Retained(Window):
+    def __init__(self, size, thumbs):
+        super().__init__(size, thumbs)
+        self.viewer = overlayviews.AnomalyPanel(thumbs, lambda room, cls: "")
+        self.right.addWidget(self.viewer)
+        self.boxes = overlayviews.BoxLayer(self, thumbs)
+        self.boxes.setGeometry(self.rect())
+        self.boxes.lower()
+
+    def apply(self, room, anomalies, viewer):
+        self.boxes.set_result(room, anomalies, 1.0)
+        if viewer:
+            self.viewer.show_anomalies(room, anomalies)
+
+    def paintEvent(self, ev):
+        self.count_paint(ev)
+        p = QtGui.QPainter(self)
+        for r in ev.region().rects():
+            p.fillRect(r, QtGui.QColor(0, 0, 0, 160))
+        p.end()
+
+def run(cls, args, app):
+    rng = np.random.default_rng(args.seed)
+    thumbs = imagecache.ImageCache(box=(400, 400), upscale=True)
+    win = cls(args.size, thumbs)
+    win.show()
+    app.processEvents()
+    stream = list(results(args.results, args.regions, args.size, rng))
+    for _, anomalies in stream:      # decode outside the clock, as prefetch_heatmap would
+        for a in anomalies:
+            thumbs.heatmap(a)
+    win.paints = win.painted_px = 0
+    ms = []
+    for room, anomalies in stream:
+        t0 = time.perf_counter()
+        win.apply(room, anomalies, args.viewer)
+        app.processEvents()
+        ms.append((time.perf_counter() - t0) * 1000)
+    win.close()
+    s = profiling.summarize({"frame": ms})["frame"]
+    full = args.size[0] * args.size[1]
+    return s, win.paints, win.painted_px / max(len(ms), 1) / full
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--results", type=int, default=300)
+    ap.add_argument("--regions", type=int, default=24)
+    ap.add_argument("--size", type=lambda s: tuple(map(int, s.lower().split("x"))), default=(1920, 1080),
+                    help="window size, WxH")
+    ap.add_argument("--no-viewer", dest="viewer", action="store_false",
+                    help="don't refresh the anomaly list on every result")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    app = QtWidgets.QApplication(sys.argv)
+    print(f"{'mode':<9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'paints':>7} {'screen/frame':>13}")
+    for name, cls in (("legacy", Legacy), ("retained", Retained)):
+        s, paints, frac = run(cls, args, app)
+        print(f"{name:<9} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f} {s['max']:>8.2f} "
+              f"{paints:>7} {frac:>12.1%}")
@@ -0,0 +1,81 @@
+"""
+Room detection benchmark: signature classifier vs. the EasyOCR paths.
+
+    python bench/room_detect.py <screenshots_dir> [--repeat N]
+
+Ground truth is taken from the file path: the first room name that
+appears in it (e.g. shots/Bedroom_003.png or shots/Bedroom/003.png).
+
+"ocr" is the full detector + recognizer pass on every scan (OCR_MODE
+"full"); "ocr-fast" is labelocr.LabelOCR (OCR_MODE "fast"), which locates
+the label once and then only recognizes the cached box, skipping OCR
+when the label is unchanged. --repeat scans each shot N times in a row,
+as continuous monitoring of a still camera would.
+"""
+import os
+import sys
+import time
+import argparse
+import cv2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import labelocr
+
+EXTS = (".png", ".jpg", ".jpeg", ".bmp")
+
+def expected_room(path):
+    low = path.lower()
+    for room in backend.ROOMS:
+        if room.lower() in low:
+            return room
+    return None
+
+def load_shots(root):
+    shots = []
+    for dirpath, _, files in os.walk(root):
+        for fn in sorted(files):
+            if fn.lower().endswith(EXTS):
+                path = os.path.join(dirpath, fn)
+                img = cv2.imread(path)
+                if img is not None:
+                    shots.append((os.path.relpath(path, root), img))
+    return shots
+
+def run(name, fn, shots, repeat=1):
+    times, hits, labelled = [], 0, 0
+    for rel, img in (s for s in shots for _ in range(repeat)):
+        t0 = time.perf_counter()
+        room = fn(img)
+        times.append((time.perf_counter() - t0) * 1000)
+        want = expected_room(rel)
+        if want:
+            labelled += 1
+            hits += room == want
+    times.sort()
+    acc = f"{hits}/{labelled} ({100*hits/labelled:.1f}%)" if labelled else "n/a"
+    print(f"{name:<12} mean {sum(times)/len(times):8.2f} ms   median {times[len(times)//2]:8.2f} ms   "
+          f"max {times[-1]:8.2f} ms   accuracy {acc}")
+
+def classifier_only(img):
+    return backend.get_room_classifier().classify(img)[0]
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("shots")
+    ap.add_argument("--repeat", type=int, default=1, help="scans per screenshot, back to back")
+    args = ap.parse_args()
+    shots = load_shots(args.shots)
+    if not shots:
+        sys.exit(f"No screenshots under {args.shots}")
+    print(f"{len(shots)} screenshots x {args.repeat}")
+    backend.get_reader()    # model load is not part of any scan
+    run("ocr", backend.detect_room_name_ocr, shots, args.repeat)
+    fast = labelocr.LabelOCR(backend.get_reader, backend.ROOMS)
+    run("ocr-fast", lambda img: fast.read(backend.roomid.label_roi(img)), shots, args.repeat)
+    st = fast.stats()
+    print(f"{'':<12} {st['located']} located ({st['locate_ms']:.1f} ms), "
+          f"{st['recognized']} recognized ({st['recognize_ms']:.1f} ms), "
+          f"{st['skipped']} skipped as unchanged")
+    run("classifier", classifier_only, shots, args.repeat)
+    run("combined", backend.detect_room_name, shots, args.repeat)
@@ -0,0 +1,51 @@
+"""
+Startup benchmark: time to `import backend` and time to the first window.
+
+    python bench/startup.py [--runs N] [--ui UI.py|TempUI.py]
+
+Each run is a fresh interpreter, so the numbers include Python startup.
+"""
+import os
+import sys
+import time
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import backend; "
+    "print(f'IMPORT {time.perf_counter() - t}')"
+)
+
+def time_import():
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=ROOT,
+                         capture_output=True, text=True, check=True).stdout
+    for line in out.splitlines():
+        if line.startswith("IMPORT "):
+            return float(line.split()[1])
+    raise RuntimeError(out)
+
+def time_first_window(ui):
+    env = dict(os.environ, ODAI_STARTUP_BENCH="1")
+    t0 = time.time()
+    out = subprocess.run([sys.executable, ui], cwd=ROOT, env=env,
+                         capture_output=True, text=True, timeout=300).stdout
+    for line in out.splitlines():
+        if line.startswith("FIRST_WINDOW "):
+            return float(line.split()[1]) - t0
+    raise RuntimeError(f"{ui} never reported a window:\n{out}")
+
+def summarize(name, vals):
+    vals = sorted(vals)
+    print(f"{name:<24} min {vals[0]*1000:8.1f} ms   median {vals[len(vals)//2]*1000:8.1f} ms")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--ui", action="append", help="UI script(s) to launch (default: UI.py)")
+    args = ap.parse_args()
+
+    summarize("import backend", [time_import() for _ in range(args.runs)])
+    for ui in args.ui or ["UI.py"]:
+        summarize(f"{ui} first window", [time_first_window(ui) for _ in range(args.runs)])
@@ -0,0 +1,242 @@
+"""
+End-to-end benchmark suite: full-frame scans (room detection, alignment,
+region diff) over synthetic frames at several resolutions and region
+counts, headless.
+
+    python bench/suite.py [--sizes 1280x720 1920x1080 2560x1440] [--regions 8 32 128]
+                          [--frames 30] [--anomaly-rate 0.2] [-o suite.json]
+                          [--compare OLD.json]
+
+For every region count, bench/synth.py builds each room of LogCabin (its
+template, or its crops laid out on a synthetic background) into a
+temporary BASE_DIR. For every resolution, limits are first calibrated
+there from --calib clean frames, as `python -m backend calibrate` would;
+then --frames frames per room with random shifted, recolored or
+removed objects go through backend.analyze_frame(). Frames are rendered
+before the clock starts.
+
+Each run in the JSON report has:
+  - "scan": latency percentiles of a whole analyze_frame() (ms)
+  - "stages": percentiles per pipeline stage (detect, ocr, align, diff; see profiling.STAGES)
+  - "match": cold detect_regions_in_template() per room (ms)
+  - "fps": frames per second over the timed pass
+  - "peak_alloc_mb": peak Python/numpy allocation during a scan (tracemalloc,
+    measured on a separate pass so it doesn't slow the timed one)
+  - "max_rss_mb": the process's peak resident set so far
+  - "room_accuracy", "precision", "recall", "tp", "fp", "fn": the detected
+    room and flagged regions against what was injected
+
+With --compare, the runs are matched to an earlier report by resolution
+and region count, and the changes are printed.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import resource
+import subprocess
+import tracemalloc
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import profiling
+import thresholds
+from profiling import timings
+from bench.synth import Scene, rooms_available, parse_size
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def use_base_dir(path, rooms):
+    """Point backend at another LogCabin tree, dropping everything loaded from the old one."""
+    old = (backend.BASE_DIR, backend.ROOMS)
+    backend.BASE_DIR, backend.ROOMS = path, list(rooms)
+    backend.on_config({"BASE_DIR": (old[0], path), "ROOMS": (old[1], list(rooms))})
+
+def calibrate(scenes, size, n, rng):
+    """
+    Per-region limits from `n` clean frames of each room at `size`, saved as
+    thresholds.json (calibration is done at the resolution that is played).
+    """
+    for scene in scenes:
+        backend.reload_room(scene.room)
+        calib = thresholds.Calibration(backend.get_baseline_regions(scene.room))
+        for _ in range(n):
+            counts = backend.measure_regions(scene.room, scene.frame(size=size, rng=rng))
+            if counts is not None:
+                calib.add(counts)
+        if calib.samples:
+            thresholds.save(os.path.join(backend.BASE_DIR, scene.room),
+                            calib.result(backend.BINARY_THRESH, thresholds.NOISE_K, backend.DIFF_METRIC))
+        backend.reload_room(scene.room)
+
+def time_match(scenes):
+    """Cold template matching of every crop, per room."""
+    ms = []
+    for scene in scenes:
+        backend.reload_room(scene.room)
+        t0 = time.perf_counter()
+        backend.detect_regions_in_template(scene.room)
+        ms.append((time.perf_counter() - t0) * 1000)
+    return profiling.summarize({"match": ms})["match"]
+
+def run_config(scenes, size, n_frames, anomaly_rate, rng, mem_frames):
+    cases = []
+    for scene in scenes:
+        for _ in range(n_frames):
+            anomalies = scene.sample(anomaly_rate, rng)
+            truth = {scene.regions[i]["class_name"] for i, _ in anomalies}
+            cases.append((scene.room, truth, scene.frame(anomalies, size, rng=rng)))
+    rng.shuffle(cases)
+
+    # warm: diff models, classifier and limits are built outside the clock
+    for scene in scenes:
+        backend.analyze_frame(scene.frame(size=size, rng=rng))
+    backend.heatmap_writer.flush()
+
+    timings.reset()
+    scan_ms, hits, tp, fp, fn = [], 0, 0, 0, 0
+    t_start = time.perf_counter()
+    for room, truth, img in cases:
+        t0 = time.perf_counter()
+        got, anomalies = backend.analyze_frame(img)
+        scan_ms.append((time.perf_counter() - t0) * 1000)
+        flagged = {a["class_name"] for a in anomalies}
+        hits += got == room
+        tp += len(flagged & truth)
+        fp += len(flagged - truth)
+        fn += len(truth - flagged)
+    elapsed = time.perf_counter() - t_start
+    backend.heatmap_writer.flush()
+    stages = timings.summary()
+
+    tracemalloc.start()
+    peak = 0
+    for _, _, img in cases[:mem_frames]:
+        tracemalloc.reset_peak()
+        backend.analyze_frame(img)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    return {
+        "frames": len(cases),
+        "fps": round(len(cases) / elapsed, 2) if elapsed > 0 else 0.0,
+        "scan": profiling.summarize({"scan": scan_ms})["scan"],
+        "stages": stages,
+        "peak_alloc_mb": round(peak / 2**20, 2),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "room_accuracy": round(hits / len(cases), 4) if cases else None,
+        "precision": round(tp / (tp + fp), 4) if tp + fp else None,
+        "recall": round(tp / (tp + fn), 4) if tp + fn else None,
+        "tp": tp, "fp": fp, "fn": fn,
+    }
+
+def git_rev():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def meta(args):
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git": git_rev(),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "cv2_threads": cv2.getNumThreads(),
+        "settings": {"DIFF_METRIC": backend.DIFF_METRIC, "OCR_MODE": backend.OCR_MODE,
+                     "OCR_FALLBACK": backend.OCR_FALLBACK, "BINARY_THRESH": backend.BINARY_THRESH},
+        "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+    }
+
+def key(run):
+    return f"{run['size']} x{run['regions']}"
+
+def compare(old, new):
+    """Print new against old for every run both reports have."""
+    before = {key(r): r for r in old["runs"]}
+    print(f"\nvs {old['meta'].get('git')} ({old['meta'].get('time')})")
+    print(f"{'run':<16} {'scan p50':>16} {'scan p95':>16} {'fps':>16} {'peak MB':>14} {'recall':>14}")
+
+    def cell(a, b, fmt):
+        if a is None or b is None:
+            return f"{'-':>14}"
+        pct = f"{(b - a) / a:+.0%}" if a else ""
+        return f"{format(b, fmt):>8} {pct:>5}"
+    for r in new["runs"]:
+        o = before.get(key(r))
+        if o is None:
+            print(f"{key(r):<16} (not in old report)")
+            continue
+        print(f"{key(r):<16} {cell(o['scan']['p50'], r['scan']['p50'], '.2f'):>16} "
+              f"{cell(o['scan']['p95'], r['scan']['p95'], '.2f'):>16} {cell(o['fps'], r['fps'], '.1f'):>16} "
+              f"{cell(o['peak_alloc_mb'], r['peak_alloc_mb'], '.1f'):>14} "
+              f"{cell(o['recall'], r['recall'], '.3f'):>14}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--sizes", nargs="+", type=parse_size,
+                    default=[(1280, 720), (1920, 1080), (2560, 1440)], help="frame sizes, WxH")
+    ap.add_argument("--regions", nargs="+", type=int, default=[8, 32, 128], help="regions per room")
+    ap.add_argument("--rooms", nargs="+", default=None, help="default: every room in LogCabin")
+    ap.add_argument("--frames", type=int, default=30, help="timed frames per room and configuration")
+    ap.add_argument("--anomaly-rate", type=float, default=0.2, help="chance per region per frame")
+    ap.add_argument("--calib", type=int, default=8, help="clean frames per room to calibrate limits")
+    ap.add_argument("--mem-frames", type=int, default=5, help="frames of the tracemalloc pass")
+    ap.add_argument("--ocr", action="store_true", help="allow the EasyOCR fallback")
+    ap.add_argument("--heatmaps", action="store_true", help="render heatmaps (in memory) as a live scan would")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("-o", "--out", default="suite.json")
+    ap.add_argument("--compare", metavar="OLD.json", default=None)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    src_dir = backend.BASE_DIR
+    rooms = args.rooms or rooms_available()
+    backend.OCR_FALLBACK = args.ocr
+    backend.HISTORY_ENABLED = False
+    backend.heatmap_writer.mode = "memory" if args.heatmaps else "off"
+
+    report = {"meta": meta(args), "runs": []}
+    for n_regions in args.regions:
+        scenes = [Scene(room, n_regions, rng, src_dir) for room in rooms]
+        tmp = tempfile.mkdtemp(prefix="odai-suite-")
+        try:
+            for scene in scenes:
+                scene.write(tmp)
+            use_base_dir(tmp, rooms)
+            backend.rebuild_bundle(background=False)    # not built behind the timed passes
+            match = time_match(scenes)
+            for size in args.sizes:
+                calibrate(scenes, size, args.calib, rng)
+                run = {"size": f"{size[0]}x{size[1]}", "regions": n_regions, "rooms": len(scenes),
+                       "match": match}
+                run.update(run_config(scenes, size, args.frames, args.anomaly_rate, rng,
+                                      args.mem_frames))
+                report["runs"].append(run)
+                print(f"{key(run):<16} scan p50 {run['scan']['p50']:7.2f} ms  p95 {run['scan']['p95']:7.2f}  "
+                      f"{run['fps']:6.1f} fps  peak {run['peak_alloc_mb']:6.1f} MB  "
+                      f"room {run['room_accuracy']:.1%}  precision {run['precision'] or 0:.1%}  "
+                      f"recall {run['recall'] or 0:.1%}")
+        finally:
+            use_base_dir(src_dir, backend.ROOMS)
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=1)
+    print(f"-> {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
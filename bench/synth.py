@@ -0,0 +1,196 @@
+"""
+Synthetic frame generator: rooms built from LogCabin's templates and
+crops, and frames of them with controlled anomalies.
+
+    python bench/synth.py OUT [--rooms Kitchen Bedroom] [--regions 16] [--frames 20]
+                              [--size 1920x1080] [--anomaly-rate 0.3]
+
+A room uses LogCabin/<Room>/template.png and its baseline regions when
+the template exists. Otherwise its group_templates crops are laid out on
+a grid over a textured background, so the boxes are known exactly. A
+room without crops gets random texture patches instead. Either way the
+room name is drawn where the game draws it, so the label classifier
+works. An anomaly moves an object (shift), changes its colours
+(recolor) or paints the background over it (remove).
+
+OUT receives a LogCabin-style tree (template.png, group_templates/,
+regions.json) and frames/<room>_<n>_<anomalies>.png, which can be fed to
+`python -m backend replay OUT/frames` with BASE_DIR=OUT.
+"""
+import os
+import sys
+import argparse
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import backend
+import roomid
+import manifest
+
+KINDS = ("shift", "recolor", "remove")
+TEMPLATE_SIZE = (1920, 1080)
+
+def background(size, rng):
+    """Scene-like texture: large smooth blobs plus a little fine grain."""
+    w, h = size
+    coarse = rng.integers(30, 220, (h // 40 + 1, w // 40 + 1, 3), dtype=np.uint8)
+    bg = cv2.resize(coarse, (w, h), interpolation=cv2.INTER_CUBIC)
+    grain = rng.integers(0, 24, (h, w, 1), dtype=np.uint8)
+    return cv2.add(bg, np.repeat(grain, 3, axis=2))
+
+def draw_label(img, room):
+    x1, y1, x2, y2 = roomid.label_rect(*img.shape[:2])
+    img[y1:y2, x1:x2] = (20, 20, 20)
+    scale = (y2 - y1) / 90
+    cv2.putText(img, room, (x1 + (y2 - y1) // 4, y2 - (y2 - y1) // 3), cv2.FONT_HERSHEY_SIMPLEX,
+                scale, (240, 240, 240), max(int(scale * 3), 1), cv2.LINE_AA)
+
+def _crops(room_dir, n, rng):
+    tpl_dir = os.path.join(room_dir, "group_templates")
+    crops = []
+    for name in manifest.crop_names(room_dir):
+        img = cv2.imread(os.path.join(tpl_dir, name + ".png"))
+        if img is not None:
+            crops.append((name, img))
+    if not crops:
+        crops = [(f"Patch{i}", background((64, 48), rng)) for i in range(min(n, 8))]
+    out = []
+    for i in range(n):
+        name, img = crops[i % len(crops)]
+        out.append((name if i < len(crops) else f"{name}_{i // len(crops)}", img))
+    return out
+
+class Scene:
+    """One room: background, clean template, region boxes and the objects in them."""
+
+    def __init__(self, room, n_regions, rng, src_dir=None):
+        """`src_dir`: LogCabin-style tree to take the room from (default BASE_DIR)."""
+        self.room = room
+        w, h = TEMPLATE_SIZE
+        self.bg = background(TEMPLATE_SIZE, rng)
+        room_dir = os.path.join(src_dir or backend.BASE_DIR, room)
+        tpl_path = os.path.join(room_dir, "template.png")
+        real = cv2.imread(tpl_path) if os.path.exists(tpl_path) else None
+        if real is not None:
+            sx, sy = w / real.shape[1], h / real.shape[0]
+            self.template = cv2.resize(real, TEMPLATE_SIZE, interpolation=cv2.INTER_AREA)
+            if os.path.samefile(os.path.dirname(room_dir), backend.BASE_DIR):
+                regs = backend.get_baseline_regions(room)
+            else:
+                regs, _ = manifest.load_regions(room_dir)   # boxes authored with train.py only
+            regs = regs[:n_regions]
+            self.regions = [{"class_name": r["class_name"],
+                             "box": [r["box"][0] * sx, r["box"][1] * sy, r["box"][2] * sx, r["box"][3] * sy]}
+                            for r in regs]
+            self.crops = {r["class_name"]: self.template[int(r["box"][1]):int(r["box"][3]),
+                                                         int(r["box"][0]):int(r["box"][2])].copy()
+                          for r in self.regions}
+        else:
+            self.template = self.bg.copy()
+            self.regions, self.crops = [], {}
+            # grid over the part of the frame above the label band
+            top = int(h * roomid.LABEL_ROI[0])
+            cols = int(np.ceil(np.sqrt(n_regions * w / top)))
+            rows = int(np.ceil(n_regions / cols))
+            cw, ch = w // cols, top // rows
+            for i, (name, img) in enumerate(_crops(room_dir, n_regions, rng)):
+                cx, cy = (i % cols) * cw, (i // cols) * ch
+                f = min((cw * 0.6) / img.shape[1], (ch * 0.6) / img.shape[0])
+                pw, ph = max(int(img.shape[1] * f), 4), max(int(img.shape[0] * f), 4)
+                x1 = cx + int(rng.integers(0, cw - pw + 1))
+                y1 = cy + int(rng.integers(0, ch - ph + 1))
+                obj = cv2.resize(img, (pw, ph), interpolation=cv2.INTER_AREA)
+                self.template[y1:y1 + ph, x1:x1 + pw] = obj
+                self.regions.append({"class_name": name, "box": [float(x1), float(y1),
+                                                                 float(x1 + pw), float(y1 + ph)]})
+                self.crops[name] = obj
+        draw_label(self.template, room)
+
+    def write(self, base_dir):
+        """Save as a LogCabin room (template, crops and a regions.json manifest)."""
+        room_dir = os.path.join(base_dir, self.room)
+        os.makedirs(os.path.join(room_dir, "group_templates"), exist_ok=True)
+        cv2.imwrite(os.path.join(room_dir, "template.png"), self.template)
+        for r in self.regions:
+            name = r["class_name"]
+            cv2.imwrite(os.path.join(room_dir, "group_templates", f"{name}.png"), self.crops[name])
+            manifest.record(room_dir, name, r["box"])
+
+    def frame(self, anomalies=(), size=TEMPLATE_SIZE, noise=2.0, jitter=0, rng=None):
+        """
+        The room at `size` with each (region index, kind) of `anomalies`
+        applied, plus sensor noise and up to `jitter` template pixels of
+        camera shift.
+        """
+        rng = rng or np.random.default_rng()
+        img = self.template.copy()
+        for i, kind in anomalies:
+            x1, y1, x2, y2 = map(int, self.regions[i]["box"])
+            obj = img[y1:y2, x1:x2].copy()
+            if kind == "remove":
+                img[y1:y2, x1:x2] = self.bg[y1:y2, x1:x2]
+            elif kind == "recolor":
+                hsv = cv2.cvtColor(obj, cv2.COLOR_BGR2HSV)
+                hsv[..., 0] = (hsv[..., 0].astype(np.int16) + 60) % 180
+                hsv[..., 1] = np.maximum(hsv[..., 1], 160)
+                img[y1:y2, x1:x2] = cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)
+            elif kind == "shift":
+                dx, dy = max((x2 - x1) // 4, 1), max((y2 - y1) // 4, 1)
+                img[y1:y2, x1:x2] = self.bg[y1:y2, x1:x2]
+                h, w = img.shape[:2]
+                tx2, ty2 = min(x2 + dx, w), min(y2 + dy, int(h * roomid.LABEL_ROI[0]))
+                img[y1 + dy:ty2, x1 + dx:tx2] = obj[:ty2 - y1 - dy, :tx2 - x1 - dx]
+            else:
+                raise ValueError(f"unknown anomaly kind {kind!r}")
+        if jitter:
+            dx, dy = rng.integers(-jitter, jitter + 1, 2)
+            img = cv2.warpAffine(img, np.float32([[1, 0, dx], [0, 1, dy]]), TEMPLATE_SIZE,
+                                 borderMode=cv2.BORDER_REPLICATE)
+        if size != TEMPLATE_SIZE:
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        if noise:
+            n = np.empty(img.shape, np.int16)
+            cv2.setRNGSeed(int(rng.integers(2**31)))
+            cv2.randn(n, 0, noise)
+            img = cv2.add(img, n, dtype=cv2.CV_8U)
+        return img
+
+    def sample(self, anomaly_rate, rng):
+        """Random anomalies for one frame: [(region index, kind)]."""
+        hit = np.flatnonzero(rng.random(len(self.regions)) < anomaly_rate)
+        return [(int(i), KINDS[int(rng.integers(len(KINDS)))]) for i in hit]
+
+def rooms_available():
+    """Rooms with a LogCabin folder, or the configured ROOMS if there are none."""
+    found = [r for r in backend.ROOMS if os.path.isdir(os.path.join(backend.BASE_DIR, r))]
+    return found or list(backend.ROOMS)
+
+def parse_size(s):
+    w, h = s.lower().split("x")
+    return int(w), int(h)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("out")
+    ap.add_argument("--rooms", nargs="+", default=None)
+    ap.add_argument("--regions", type=int, default=16)
+    ap.add_argument("--frames", type=int, default=20, help="per room")
+    ap.add_argument("--size", type=parse_size, default=TEMPLATE_SIZE, help="frame size, WxH")
+    ap.add_argument("--anomaly-rate", type=float, default=0.3, help="chance per region per frame")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    frames_dir = os.path.join(args.out, "frames")
+    os.makedirs(frames_dir, exist_ok=True)
+    for room in args.rooms or rooms_available():
+        scene = Scene(room, args.regions, rng)
+        scene.write(args.out)
+        for n in range(args.frames):
+            anomalies = scene.sample(args.anomaly_rate, rng)
+            tag = "+".join(f"{scene.regions[i]['class_name']}-{k}" for i, k in anomalies) or "clean"
+            cv2.imwrite(os.path.join(frames_dir, f"{room}_{n:03d}_{tag}.png"),
+                        scene.frame(anomalies, args.size, rng=rng))
+        print(f"{room}: {len(scene.regions)} regions, {args.frames} frames")
+    print(f"-> {args.out} (BASE_DIR) and {frames_dir}")
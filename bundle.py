@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import uuid
+import numpy as np
+import config
+import manifest
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+BUNDLE_NAME = "templates"   # LogCabin/templates.json (index) + templates-<id>.bin (data)
+ENABLED     = True          # read templates, crops and regions from the bundle when it is current
+ALIGN       = 64            # byte alignment of every array in the data file
+LOCK_STALE  = 120.0         # seconds after which another process's build lock is ignored
+# ────────────────────────────────────────────────────────────────────
+config.load_into("bundle", globals())
+
+# Every room's decoded template, diff-ready grayscale crop, region boxes
+# and group_templates crops, packed into one flat file:
+#   templates.json        {"version", "data": "templates-<id>.bin",
+#                          "rooms": {room: {"stamp": ..., "meta": ...,
+#                                           "arrays": {key: [offset, shape, dtype]}}}}
+#   templates-<id>.bin    the arrays, ALIGN-aligned, C order
+# Opened with np.memmap, so loading is a page-table update instead of PNG
+# decoding, and every process reading it shares the same page-cache pages.
+# A room's entry is only used while its stamp (the mtimes and sizes of its
+# source files, plus the settings its regions depend on) still matches.
+VERSION = 1
+
+def index_path(base_dir):
+    return os.path.join(base_dir, BUNDLE_NAME + ".json")
+
+def source_stamp(room_dir):
+    """{relative path: [mtime_ns, size]} of everything a room is built from."""
+    files = {"template.png": os.path.join(room_dir, "template.png")}
+    files[manifest.MANIFEST_FILE] = manifest.path_for(room_dir)
+    tpl_dir = os.path.join(room_dir, "group_templates")
+    if os.path.isdir(tpl_dir):
+        for fn in sorted(os.listdir(tpl_dir)):
+            if fn.lower().endswith(".png"):
+                files["group_templates/" + fn] = os.path.join(tpl_dir, fn)
+    stamp = {}
+    for key, path in files.items():
+        try:
+            st = os.stat(path)
+            stamp[key] = [st.st_mtime_ns, st.st_size]
+        except OSError:
+            stamp[key] = None
+    return stamp
+
+def write(base_dir, rooms):
+    """
+    rooms: {room: {"stamp": dict, "meta": JSON-able dict, "arrays": {key: ndarray}}}.
+    Writes a new data file, then swaps the index over to it, so a reader
+    sees either the old bundle or the new one. Returns the index path.
+    """
+    data_name = f"{BUNDLE_NAME}-{uuid.uuid4().hex[:12]}.bin"
+    index = {"version": VERSION, "data": data_name, "rooms": {}}
+    offset = 0
+    with open(os.path.join(base_dir, data_name), "wb") as f:
+        for room, entry in rooms.items():
+            layout = {}
+            for key, arr in entry["arrays"].items():
+                arr = np.ascontiguousarray(arr)
+                pad = -offset % ALIGN
+                f.write(b"\0" * pad)
+                offset += pad
+                layout[key] = [offset, list(arr.shape), arr.dtype.str]
+                f.write(arr.tobytes())
+                offset += arr.nbytes
+            index["rooms"][room] = {"stamp": entry["stamp"], "meta": entry["meta"], "arrays": layout}
+    path = index_path(base_dir)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+    _remove_old(base_dir, data_name)
+    return path
+
+def _remove_old(base_dir, keep):
+    for fn in os.listdir(base_dir):
+        if fn.startswith(BUNDLE_NAME + "-") and fn.endswith(".bin") and fn != keep:
+            try:
+                os.remove(os.path.join(base_dir, fn))
+            except OSError:
+                pass    # still mapped by a process on Windows; removed by a later build
+
+class Bundle:
+    """Read-only views into a built bundle; see open()."""
+
+    def __init__(self, base_dir, index, data):
+        self.base_dir = base_dir
+        self.rooms = index["rooms"]
+        self.data = data
+
+    @classmethod
+    def open(cls, base_dir):
+        """The current bundle in base_dir, or None if there is none (or it is unreadable)."""
+        try:
+            with open(index_path(base_dir)) as f:
+                index = json.load(f)
+            if index.get("version") != VERSION:
+                return None
+            path = os.path.join(base_dir, index["data"])
+            if os.path.getsize(path) == 0:
+                return cls(base_dir, index, None)
+            data = np.memmap(path, np.uint8, mode="r")
+        except (OSError, ValueError, KeyError):
+            return None
+        return cls(base_dir, index, data)
+
+    def fresh(self, room, settings=None):
+        """True if room is in the bundle and nothing it was built from has changed."""
+        entry = self.rooms.get(room)
+        if entry is None:
+            return False
+        stamp = source_stamp(os.path.join(self.base_dir, room))
+        if settings:
+            stamp.update(settings)
+        return entry["stamp"] == json.loads(json.dumps(stamp))
+
+    def meta(self, room):
+        return self.rooms[room]["meta"]
+
+    def array(self, room, key):
+        """Read-only view of one packed array (no copy)."""
+        offset, shape, dtype = self.rooms[room]["arrays"][key]
+        dtype = np.dtype(dtype)
+        n = int(np.prod(shape)) * dtype.itemsize
+        if n == 0:
+            return np.empty(shape, dtype)
+        return np.asarray(self.data[offset:offset + n]).view(dtype).reshape(shape)
+
+def try_lock(base_dir):
+    """
+    Claim the right to rebuild base_dir's bundle across processes (e.g.
+    every replay worker noticing the same stale room). Returns the lock
+    path, or None if another build is running.
+    """
+    path = os.path.join(base_dir, BUNDLE_NAME + ".lock")
+    try:
+        if time.time() - os.path.getmtime(path) > LOCK_STALE:
+            os.remove(path)
+    except OSError:
+        pass
+    try:
+        os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+    except OSError:
+        return None
+    return path
+
+def unlock(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
@@ -0,0 +1,66 @@
+import threading
+import numpy as np
+
+class Grabber:
+    """
+    Screen grabber that keeps one mss instance per thread (mss handles must
+    not be shared across threads) and grabs only the rectangles asked for.
+
+    Rectangles are (x1, y1, x2, y2) relative to the monitor's top-left, or
+    to `region` (left, top, width, height within the monitor) when the game
+    runs in a window rather than full screen. grab() returns a BGRA array that views mss's own buffer, so the only
+    copy made is the one from the OS; colour conversion is left to the
+    caller so it can be done on the sub-regions it actually needs.
+    """
+
+    def __init__(self, monitor=1, region=None):
+        self.monitor_index = monitor
+        self.region = region
+        self._local = threading.local()
+        self.grabs = 0
+        self.bytes_copied = 0
+
+    def _sct(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is None:
+            import mss
+            sct = self._local.sct = mss.mss()
+        return sct
+
+    @property
+    def monitor(self):
+        mon = self._sct().monitors[self.monitor_index]
+        if self.region is None:
+            return mon
+        left, top, width, height = self.region
+        return {"left": mon["left"] + left, "top": mon["top"] + top,
+                "width": width, "height": height}
+
+    def size(self):
+        """(height, width) of the monitor."""
+        mon = self.monitor
+        return mon["height"], mon["width"]
+
+    def clip(self, rect):
+        h, w = self.size()
+        x1, y1, x2, y2 = rect
+        return max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+
+    def grab(self, rect=None):
+        mon = self.monitor
+        if rect is None:
+            rect = (0, 0, mon["width"], mon["height"])
+        x1, y1, x2, y2 = self.clip(rect)
+        shot = self._sct().grab({
+            "left": mon["left"] + x1, "top": mon["top"] + y1,
+            "width": x2 - x1, "height": y2 - y1,
+        })
+        self.grabs += 1
+        self.bytes_copied += len(shot.raw)
+        return np.frombuffer(shot.raw, np.uint8).reshape(shot.height, shot.width, 4)
+
+    def close(self):
+        sct = getattr(self._local, "sct", None)
+        if sct is not None:
+            sct.close()
+            self._local.sct = None
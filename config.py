@@ -0,0 +1,151 @@
+"""
+Settings live where they always have: the CONFIG block of each module.
+A module opts in by calling load_into("<section>", globals()) right after
+its block; the values in the config file's "<section>" object and in
+ODAI_<SECTION>_<NAME> environment variables then replace the defaults
+(environment wins). Only names the module already defines can be set;
+relative *_DIR paths are taken from the config file's directory. Several
+modules may share a section; each one only receives the names it defines.
+
+    {
+      "backend": {"BINARY_THRESH": 25, "ROOMS": ["Living", "Kitchen"]},
+      "monitor": {"MONITOR_RATE": 4.0},
+      "hotkeys": {"DEBOUNCE": 0.3}
+    }
+
+watch() re-reads the file whenever it changes and applies the new values
+to every registered namespace; if the namespace defines on_config(changed)
+it is called with {name: (old, new)} so it can drop what depended on them.
+"""
+
+import os
+import json
+import time
+import threading
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+CONFIG_FILE    = os.environ.get("ODAI_CONFIG", os.path.join(os.path.dirname(__file__), "odai.json"))
+ENV_PREFIX     = "ODAI_"      # ODAI_<SECTION>_<NAME>=value, e.g. ODAI_BACKEND_BINARY_THRESH=25
+WATCH_INTERVAL = 1.0          # seconds between checks of CONFIG_FILE's mtime
+# ────────────────────────────────────────────────────────────────────
+
+_namespaces = {}      # section -> [(globals dict, {name: value before any override})]
+_lock = threading.RLock()
+_watcher = None
+
+def _read_file():
+    try:
+        with open(CONFIG_FILE) as f:
+            doc = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"config: ignoring {CONFIG_FILE}: {e}")
+        return {}
+    return {k.lower(): v for k, v in doc.items() if isinstance(v, dict)}
+
+def _coerce(raw, default):
+    """Environment strings to the default's type; JSON is accepted for anything."""
+    try:
+        return json.loads(raw)
+    except ValueError:
+        pass
+    if isinstance(default, bool):
+        return raw.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, (list, tuple)):
+        return [s.strip() for s in raw.split(",") if s.strip()]
+    return raw
+
+def _env(section, names):
+    out = {}
+    prefix = f"{ENV_PREFIX}{section.upper()}_"
+    for key, raw in os.environ.items():
+        if key.startswith(prefix) and key[len(prefix):] in names:
+            name = key[len(prefix):]
+            out[name] = _coerce(raw, names[name])
+    return out
+
+def _resolve(section, file_doc, defaults):
+    """Effective values of `defaults`' names: defaults, then the file, then the environment."""
+    values = dict(defaults)
+    for name, v in file_doc.get(section, {}).items():
+        if name in defaults:
+            values[name] = v
+    values.update(_env(section, defaults))
+    base = os.path.dirname(os.path.abspath(CONFIG_FILE))
+    for name, v in values.items():
+        # JSON has no tuples
+        if isinstance(defaults[name], tuple) and isinstance(v, list):
+            values[name] = tuple(v)
+        # *_DIR paths are relative to the config file
+        elif name.endswith("_DIR") and isinstance(v, str) and v:
+            values[name] = os.path.join(base, v)
+    return values
+
+def check(file_doc=None):
+    """
+    Report settings that no module registered for their section defines.
+    Done by watch() and reload() rather than load_into(), as another module
+    imported later may register the same section with the missing name.
+    """
+    doc = _read_file() if file_doc is None else file_doc
+    with _lock:
+        known = {section: set().union(*(d for _, d in entries)) for section, entries in _namespaces.items()}
+    for section, values in doc.items():
+        for name in values:
+            if section in known and name not in known[section]:
+                print(f"config: unknown setting {section}.{name}")
+
+def load_into(section, namespace):
+    """Apply the current settings for `section` to a module's globals and keep it updated."""
+    section = section.lower()
+    with _lock:
+        defaults = {k: v for k, v in namespace.items() if k.isupper() and not k.startswith("_")}
+        _namespaces.setdefault(section, []).append((namespace, defaults))
+        namespace.update(_resolve(section, _read_file(), defaults))
+
+def reload():
+    """Re-read the file and push changed values into every registered namespace."""
+    doc = _read_file()
+    check(doc)
+    with _lock:
+        sections = [(section, list(entries)) for section, entries in _namespaces.items()]
+    for section, entries in sections:
+        for ns, defaults in entries:
+            values = _resolve(section, doc, defaults)
+            changed = {k: (ns.get(k), v) for k, v in values.items() if ns.get(k) != v}
+            if not changed:
+                continue
+            ns.update({k: new for k, (_, new) in changed.items()})
+            print("config:", ", ".join(f"{section}.{k}={new!r}" for k, (_, new) in changed.items()))
+            hook = ns.get("on_config")
+            if hook is not None:
+                try:
+                    hook(changed)
+                except Exception as e:
+                    print(f"config: {section}.on_config failed:", e)
+
+def _mtime():
+    try:
+        return os.stat(CONFIG_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+def watch(interval=WATCH_INTERVAL):
+    """Start (once) a background thread that applies edits to the config file as they are saved."""
+    global _watcher
+    with _lock:
+        if _watcher is not None:
+            return
+        check()
+        def run():
+            last = _mtime()
+            while True:
+                time.sleep(interval)
+                m = _mtime()
+                if m != last:
+                    last = m
+                    reload()
+
+        _watcher = threading.Thread(target=run, name="config-watch", daemon=True)
+        _watcher.start()
@@ -0,0 +1,217 @@
+import cv2
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+METRICS    = ("absdiff", "ssim")
+PYR_LEVELS = 2       # "ssim": the coarse pass runs at 1/2**PYR_LEVELS resolution
+SSIM_WIN   = 7       # Gaussian window of the SSIM statistics, in coarse pixels...
+SSIM_SIGMA = 1.5     # ...and its sigma
+SSIM_MIN   = 0.5     # coarse pixels below this SSIM count as changed
+ESCALATE   = 0.5     # a region gets the full-resolution diff once its coarse count
+                     # (in full-resolution pixels) passes this fraction of its limit
+# ────────────────────────────────────────────────────────────────────
+
+_C1 = (0.01 * 255) ** 2
+_C2 = (0.03 * 255) ** 2
+
+class RoomDiffModel:
+    """
+    Precomputed diff state for one room.
+
+    The masked grayscale template is cut to the union of the room's region
+    boxes once. score() then converts only that part of the live frame,
+    runs one absdiff/threshold over it and reads every region's changed-pixel
+    count from a single integral image, with no per-region allocations.
+
+    With metric "ssim" the whole union is first compared at a coarse
+    pyramid level with a vectorized SSIM map, which ignores brightness and
+    contrast changes and is averaged over a window, so sensor noise does not
+    count. Only regions the coarse pass flags get the full-resolution diff,
+    with each region's live pixels first matched to the template's mean and
+    contrast over that region. Other regions score 0.
+    """
+
+    def __init__(self, template, regions, mask_rect=None, limits=None, tpl_gray=None,
+                 metric="absdiff"):
+        if metric not in METRICS:
+            raise ValueError(f"unknown diff metric {metric!r}; expected one of {METRICS}")
+        self.metric = metric
+        self.coarse_regions = 0    # regions compared at the coarse level ("ssim")
+        self.escalated = 0         # ...of which were diffed at full resolution
+        h, w = template.shape[:2]
+        self.names = [r["class_name"] for r in regions]
+        self.regions = regions
+        # per-region pixel-count limits above which a region is flagged
+        self.limits = None if limits is None else np.asarray(limits, np.int64)
+        boxes = np.array([list(map(int, r["box"])) for r in regions], np.int32).reshape(-1, 4)
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        self.boxes = boxes
+        if len(boxes):
+            self.union = (int(boxes[:, 0].min()), int(boxes[:, 1].min()),
+                          int(boxes[:, 2].max()), int(boxes[:, 3].max()))
+        else:
+            self.union = (0, 0, 0, 0)
+        ux1, uy1, ux2, uy2 = self.union
+        # boxes relative to the union crop, in integral-image index order
+        self.rel = boxes - np.array([ux1, uy1, ux1, uy1], np.int32)
+
+        if tpl_gray is None:
+            gray = template if template.ndim == 2 else cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+            tpl_gray = np.ascontiguousarray(gray[uy1:uy2, ux1:ux2])
+        # may be handed in precomputed, e.g. as a view into shared memory
+        self.tpl_gray = tpl_gray
+
+        # part of the union crop covered by the dynamic UI mask, in crop coords
+        self.mask_rect = None
+        if mask_rect is not None:
+            mx1, my1, mx2, my2 = mask_rect
+            mx1, my1 = max(mx1 - ux1, 0), max(my1 - uy1, 0)
+            mx2, my2 = min(mx2 - ux1, ux2 - ux1), min(my2 - uy1, uy2 - uy1)
+            if mx2 > mx1 and my2 > my1:
+                self.mask_rect = (mx1, my1, mx2, my2)
+        self._coarse_tpl = None
+
+    def score(self, frame, thresh, origin=(0, 0), subset=None, gate=True):
+        """
+        frame: BGR, BGRA or grayscale image whose top-left pixel is at
+        template coordinate `origin`.
+        subset: optional bool array; when given, only the bounding box of
+        those regions is diffed and the other regions' counts are 0.
+        gate: with metric "ssim", limit the full-resolution diff to the
+        regions the coarse pass flags; pass False to diff all of `subset`
+        (e.g. for the heatmap of a region confirmed earlier).
+        Returns (counts, binm, base): changed-pixel count per region (int
+        array in self.regions order), the 0/1 diff mask and the template
+        coordinate of its top-left corner.
+        """
+        if self.metric == "absdiff":
+            return self._diff(frame, thresh, origin, subset, False)
+        if gate:
+            want = np.ones(len(self.regions), np.bool_) if subset is None else subset
+            coarse = self.coarse_counts(frame, origin)
+            limits = self.limits if self.limits is not None else np.zeros(len(self.regions))
+            subset = want & (coarse > limits * ESCALATE)
+            self.coarse_regions += int(want.sum())
+            self.escalated += int(subset.sum())
+        return self._diff(frame, thresh, origin, subset, True)
+
+    def _diff(self, frame, thresh, origin, subset, normalize):
+        n = len(self.regions)
+        if subset is None:
+            bx1, by1, bx2, by2 = self.union
+        elif subset.any():
+            b = self.boxes[subset]
+            bx1, by1 = int(b[:, 0].min()), int(b[:, 1].min())
+            bx2, by2 = int(b[:, 2].max()), int(b[:, 3].max())
+        else:
+            return np.zeros(n, np.int64), None, (0, 0)
+        if bx2 <= bx1 or by2 <= by1:
+            return np.zeros(n, np.int64), None, (0, 0)
+        ux1, uy1 = self.union[:2]
+        ox, oy = origin
+        live = frame[by1-oy:by2-oy, bx1-ox:bx2-ox]
+        if live.ndim == 3:
+            live = cv2.cvtColor(live, cv2.COLOR_BGRA2GRAY if live.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        tpl = self.tpl_gray[by1-uy1:by2-uy1, bx1-ux1:bx2-ux1]
+        if normalize:
+            binm = self._normalized_mask(live, tpl, thresh, subset, bx1, by1)
+        else:
+            diff = cv2.absdiff(live, tpl)
+            _, binm = cv2.threshold(diff, thresh, 1, cv2.THRESH_BINARY)
+        if self.mask_rect is not None:
+            mx1, my1, mx2, my2 = self.mask_rect
+            # mask_rect is relative to the union; shift it into this box
+            dx, dy = bx1 - ux1, by1 - uy1
+            mx1, my1 = max(mx1 - dx, 0), max(my1 - dy, 0)
+            mx2, my2 = min(mx2 - dx, bx2 - bx1), min(my2 - dy, by2 - by1)
+            if mx2 > mx1 and my2 > my1:
+                binm[my1:my2, mx1:mx2] = 0
+        ii = cv2.integral(binm, sdepth=cv2.CV_32S)
+        r = (self.boxes - np.array([bx1, by1, bx1, by1], np.int32))
+        if subset is not None:
+            # regions outside the box would index out of range; score them as 0
+            r = np.where(subset[:, None], r, 0)
+        counts = (ii[r[:, 3], r[:, 2]] - ii[r[:, 1], r[:, 2]]
+                  - ii[r[:, 3], r[:, 0]] + ii[r[:, 1], r[:, 0]])
+        return counts.astype(np.int64), binm, (bx1, by1)
+
+    def _normalized_mask(self, live, tpl, thresh, subset, bx, by):
+        """
+        0/1 diff mask of the box at (bx, by), each region's live pixels first
+        brought to the template's mean and contrast over that region.
+        """
+        binm = np.zeros(live.shape, np.uint8)
+        idx = range(len(self.regions)) if subset is None else np.flatnonzero(subset)
+        for i in idx:
+            x1, y1, x2, y2 = self.boxes[i] - np.array([bx, by, bx, by], np.int32)
+            if x2 <= x1 or y2 <= y1:
+                continue
+            l, t = live[y1:y2, x1:x2], tpl[y1:y2, x1:x2]
+            lm, ls = (float(v[0, 0]) for v in cv2.meanStdDev(l))
+            tm, ts = (float(v[0, 0]) for v in cv2.meanStdDev(t))
+            gain = ts / ls if ls > 1.0 else 1.0
+            _, m = cv2.threshold(cv2.absdiff(cv2.addWeighted(l, gain, l, 0, tm - gain * lm), t),
+                                 thresh, 1, cv2.THRESH_BINARY)
+            # overlapping regions: a pixel counts if either region's diff has it
+            cv2.bitwise_or(binm[y1:y2, x1:x2], m, dst=binm[y1:y2, x1:x2])
+        return binm
+
+    def _coarse_template(self):
+        """Union template at the coarse level, with its SSIM mean/variance maps."""
+        if self._coarse_tpl is None:
+            f = 1 << PYR_LEVELS
+            h, w = self.tpl_gray.shape
+            size = (max(w // f, 1), max(h // f, 1))
+            b = cv2.resize(self.tpl_gray, size, interpolation=cv2.INTER_LINEAR).astype(np.float32)
+            mu = cv2.GaussianBlur(b, (SSIM_WIN, SSIM_WIN), SSIM_SIGMA)
+            var = cv2.GaussianBlur(b * b, (SSIM_WIN, SSIM_WIN), SSIM_SIGMA) - mu * mu
+            # coarse boxes relative to the union: floor the start, ceil the end
+            r = self.rel.copy()
+            r[:, :2] //= f
+            r[:, 2:] = -(-r[:, 2:] // f)
+            r[:, [0, 2]] = r[:, [0, 2]].clip(0, size[0])
+            r[:, [1, 3]] = r[:, [1, 3]].clip(0, size[1])
+            mask = None
+            if self.mask_rect is not None:
+                mx1, my1, mx2, my2 = self.mask_rect
+                mask = (mx1 // f, my1 // f, -(-mx2 // f), -(-my2 // f))
+            self._coarse_tpl = (size, b, mu, var, r, mask)
+        return self._coarse_tpl
+
+    def coarse_counts(self, frame, origin=(0, 0)):
+        """
+        Per region, the number of coarse pixels whose SSIM against the
+        template is below SSIM_MIN, scaled to full-resolution pixels so it
+        compares with the region limits.
+        """
+        n = len(self.regions)
+        ux1, uy1, ux2, uy2 = self.union
+        if ux2 <= ux1 or uy2 <= uy1:
+            return np.zeros(n, np.int64)
+        size, b, mu_b, var_b, r, mask = self._coarse_template()
+        ox, oy = origin
+        # INTER_LINEAR reads a fraction of the pixels INTER_AREA does (several
+        # times faster here); the SSIM window does the averaging
+        live = cv2.resize(frame[uy1-oy:uy2-oy, ux1-ox:ux2-ox], size, interpolation=cv2.INTER_LINEAR)
+        if live.ndim == 3:
+            live = cv2.cvtColor(live, cv2.COLOR_BGRA2GRAY if live.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+        a = live.astype(np.float32)
+        mu_a = cv2.GaussianBlur(a, (SSIM_WIN, SSIM_WIN), SSIM_SIGMA)
+        var_a = cv2.GaussianBlur(a * a, (SSIM_WIN, SSIM_WIN), SSIM_SIGMA) - mu_a * mu_a
+        cov = cv2.GaussianBlur(a * b, (SSIM_WIN, SSIM_WIN), SSIM_SIGMA) - mu_a * mu_b
+        ssim = ((2 * mu_a * mu_b + _C1) * (2 * cov + _C2)) / \
+               ((mu_a * mu_a + mu_b * mu_b + _C1) * (var_a + var_b + _C2))
+        bad = (ssim < SSIM_MIN).astype(np.uint8)
+        if mask is not None:
+            bad[mask[1]:mask[3], mask[0]:mask[2]] = 0
+        ii = cv2.integral(bad, sdepth=cv2.CV_32S)
+        counts = (ii[r[:, 3], r[:, 2]] - ii[r[:, 1], r[:, 2]]
+                  - ii[r[:, 3], r[:, 0]] + ii[r[:, 1], r[:, 0]])
+        return counts.astype(np.int64) << (2 * PYR_LEVELS)
+
+    def region_mask(self, binm, i, base=None):
+        """0/255 mask of region i, suitable for heatmap rendering."""
+        bx, by = base if base is not None else self.union[:2]
+        x1, y1, x2, y2 = self.boxes[i]
+        return binm[y1-by:y2-by, x1-bx:x2-bx] * np.uint8(255)
@@ -0,0 +1,321 @@
+import time
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+import numpy as np
+import backend
+import capture
+import diffengine
+import temporal
+import monitor
+import profiling
+from profiling import timings
+import config
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+# One entry per camera feed: a monitor (mss index), optionally narrowed to
+# the game window's (left, top, width, height) on that monitor.
+FEEDS = [
+    {"name": "Monitor 1", "monitor": 1},
+    # {"name": "Window 2", "monitor": 2, "region": (0, 0, 1920, 1080)},
+]
+FEED_OCR = False      # an EasyOCR model per feed process is ~100 MB; rely on the label classifier
+STATS_INTERVAL = 2.0  # seconds between stage-timing snapshots sent to the parent
+# ────────────────────────────────────────────────────────────────────
+config.load_into("feeds", globals())
+
+# per-feed counters shared with the parent, as slots in one Array
+SCANS, ERRORS, DROPPED, SCAN_US, ALIGN_US, SKIPPED = range(6)
+
+class SharedTemplates:
+    """
+    Every room's template and precomputed diff crop, packed into one
+    shared-memory block by the parent. Feed processes attach read-only
+    numpy views instead of each loading (and holding) their own copies;
+    only the small region tables and limits are pickled.
+    """
+
+    def __init__(self, rooms):
+        arrays, tables = [], {}
+        for room in rooms:
+            model = backend.get_diff_model(room)
+            if model is None:
+                continue
+            arrays += [(room, "template", backend.get_template(room)), (room, "gray", model.tpl_gray)]
+            tables[room] = {"regions": model.regions, "limits": model.limits.tolist()}
+        layout, offset = [], 0
+        for room, kind, arr in arrays:
+            layout.append((room, kind, offset, arr.shape, arr.dtype.str))
+            offset += (arr.nbytes + 63) & ~63
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for (room, kind, arr), (_, _, off, shape, dtype) in zip(arrays, layout):
+            np.ndarray(shape, dtype, buffer=self.shm.buf, offset=off)[...] = arr
+        self.manifest = {"name": self.shm.name, "layout": layout, "tables": tables}
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+    @staticmethod
+    def attach(manifest):
+        """In a feed process: install the shared arrays as backend's templates and diff models."""
+        # spawned feeds share the parent's resource tracker, so the block
+        # is unlinked once, by the parent's close()
+        shm = shared_memory.SharedMemory(name=manifest["name"])
+        views = {}
+        for room, kind, off, shape, dtype in manifest["layout"]:
+            v = np.ndarray(tuple(shape), np.dtype(dtype), buffer=shm.buf, offset=off)
+            v.flags.writeable = False
+            views[room, kind] = v
+        for room, table in manifest["tables"].items():
+            tpl = views[room, "template"]
+            backend.template_images[room] = tpl
+            backend.baseline_regions[room] = table["regions"]
+            backend.diff_models[room] = diffengine.RoomDiffModel(
+                tpl, table["regions"], backend.dynamic_rect(*tpl.shape[:2]),
+                table["limits"], tpl_gray=views[room, "gray"], metric=backend.DIFF_METRIC)
+        return shm
+
+def _feed_main(feed, manifest, base_dir, results, stats, control, continuous, counters, rate,
+               dump_dir):
+    """Capture+analysis loop of one feed process."""
+    backend.BASE_DIR = base_dir
+    backend.OCR_FALLBACK = FEED_OCR
+    if dump_dir:
+        profiling.enable_dumps(dump_dir)
+    config.watch()
+    shm = SharedTemplates.attach(manifest)    # held until exit: backend's views point into it
+    backend.watch_regions()    # a re-authored room is then loaded from disk in this process
+    backend.grabber = capture.Grabber(feed.get("monitor", 1), feed.get("region"))
+    # heatmaps stored here are sent back with the result, for the parent's listeners
+    written = []
+    backend.heatmap_writer.add_listener(written.append)
+    name = feed["name"]
+    filt, was_continuous = None, False
+    next_t = next_stats = time.monotonic()
+    while True:
+        if time.monotonic() >= next_stats:
+            next_stats = time.monotonic() + STATS_INTERVAL
+            try:
+                stats.put_nowait((name, timings.snapshot()))
+            except queue.Full:
+                pass
+        on = bool(continuous.value)
+        if on and not was_continuous:
+            filt = temporal.TemporalFilter()    # a new run of consecutive frames
+            next_t = time.monotonic()
+        was_continuous = on
+        try:
+            wait = max(next_t - time.monotonic(), 0) if on else STATS_INTERVAL
+            msg = control.get(timeout=wait)
+        except queue.Empty:
+            msg = None
+        if msg == "stop":
+            break
+        if isinstance(msg, tuple) and msg[0] == "trigger":
+            with timings.stage("settle"):
+                time.sleep(backend.SETTLE_DELAY)
+            use = None
+            ids = (msg[1],) if msg[1] is not None else ()
+        elif on and time.monotonic() >= next_t:
+            r = rate if rate is not None else monitor.MONITOR_RATE
+            period = 1.0 / max(r, 0.01)
+            # frames due while the last scan ran are never captured: dropped,
+            # as ScanWorker drops a frame replaced before it was analyzed
+            late = int((time.monotonic() - next_t) / period)
+            if late:
+                with counters.get_lock():
+                    counters[SKIPPED] += late
+            next_t = time.monotonic() + period
+            use, ids = filt, ()
+        else:
+            continue
+
+        t0 = time.perf_counter()
+        try:
+            room, anomalies = backend.analyze_scan(backend.capture_scan(), use)
+            # results cross a process boundary, so finish the heatmaps first
+            backend.heatmap_writer.flush()
+            stored, written[:] = list(written), []
+        except Exception as e:
+            with counters.get_lock():
+                counters[ERRORS] += 1
+            print(f"{name}: scan error:", e)
+            continue
+        scan_ms = (time.perf_counter() - t0) * 1000
+        timings.record("scan", scan_ms)
+        with counters.get_lock():
+            counters[SCANS] += 1
+            counters[SCAN_US] += int(scan_ms * 1000)
+            counters[ALIGN_US] += int(backend.align.stats.last_ms * 1000)
+        try:
+            # one pickle: the stored anomalies stay the same dicts as in `anomalies`
+            results.put((name, room, anomalies, ids, stored), timeout=1.0)
+        except queue.Full:
+            with counters.get_lock():
+                counters[DROPPED] += 1
+    del shm
+
+class ScanScheduler:
+    """
+    One capture+analysis process per entry in FEEDS, for several monitors
+    or game windows at once.
+
+    Templates and diff crops are shared through SharedTemplates, so adding
+    a feed costs a process, not another copy of every room. Each process
+    runs the same capture_scan()/analyze_scan() pipeline as ScanWorker
+    against its own grabber, so throughput scales with cores. Results from
+    all feeds arrive on one queue; the interface mirrors ScanWorker, so
+    either can drive the UIs.
+    """
+
+    def __init__(self, feeds=None, rate=None, max_results=monitor.MAX_RESULTS):
+        self.feeds = list(feeds or FEEDS)
+        self.rate = rate
+        self._ctx = multiprocessing.get_context("spawn")
+        self.results = self._ctx.Queue(maxsize=max_results * max(len(self.feeds), 1))
+        self._stats = self._ctx.Queue(maxsize=4 * max(len(self.feeds), 1))
+        self._snapshots = {}     # feed -> latest {stage: samples}
+        self._continuous = self._ctx.Value("b", 0)
+        self._control = []
+        self._counters = []
+        self._procs = []
+        self._shared = None
+        self.last_feed = {}      # room -> feed that reported it last
+
+    @property
+    def continuous(self):
+        return bool(self._continuous.value)
+
+    # ── control ─────────────────────────────────────────────────────
+    def start(self):
+        if self._procs:
+            return
+        self._shared = SharedTemplates(backend.ROOMS)
+        for feed in self.feeds:
+            control = self._ctx.Queue()
+            counters = self._ctx.Array("q", 6)
+            p = self._ctx.Process(
+                target=_feed_main, name=f"feed-{feed['name']}", daemon=True,
+                args=(feed, self._shared.manifest, backend.BASE_DIR, self.results, self._stats,
+                      control, self._continuous, counters, self.rate, profiling.DUMP_DIR))
+            p.start()
+            self._control.append(control)
+            self._counters.append(counters)
+            self._procs.append(p)
+
+    def stop(self):
+        for c in self._control:
+            c.put("stop")
+        deadline = time.monotonic() + 5
+        while any(p.is_alive() for p in self._procs) and time.monotonic() < deadline:
+            # don't let unread queues block a feed's exit
+            self.get_feed_results()
+            self.stage_stats()
+            time.sleep(0.05)
+        for p in self._procs:
+            if p.is_alive():
+                p.terminate()
+            p.join()
+        self._procs, self._control, self._counters = [], [], []
+        if self._shared is not None:
+            self._shared.close()
+            self._shared = None
+
+    def _broadcast(self, msg):
+        for c in self._control:
+            c.put(msg)
+
+    def trigger(self, trigger_id=None):
+        """Request a single scan on every feed; each feed's result carries trigger_id."""
+        self._broadcast(("trigger", trigger_id))
+
+    def set_continuous(self, on):
+        self._continuous.value = int(bool(on))
+        self._broadcast("wake")
+
+    def toggle_continuous(self):
+        self.set_continuous(not self.continuous)
+        return self.continuous
+
+    # ── results ─────────────────────────────────────────────────────
+    def get_feed_results(self):
+        """
+        (feed, room, anomalies, trigger_ids) from every feed since the last
+        call. Never blocks. Heatmaps the feeds stored are announced to this
+        process's backend.heatmap_writer listeners (retention, thumbnail
+        prefetch) as they arrive.
+        """
+        out = []
+        while True:
+            try:
+                feed, room, anomalies, ids, stored = self.results.get_nowait()
+            except queue.Empty:
+                return out
+            for a in stored:
+                backend.heatmap_writer.notify(a)
+            out.append((feed, room, anomalies, ids))
+
+    def get_results(self, with_triggers=False):
+        """(room, anomalies) like ScanWorker.get_results()."""
+        out = []
+        for feed, room, anomalies, ids in self.get_feed_results():
+            if room:
+                self.last_feed[room] = feed
+            out.append((room, anomalies, ids) if with_triggers else (room, anomalies))
+        return out
+
+    def stage_stats(self):
+        """Per-stage latency percentiles pooled over every feed's recent scans."""
+        while True:
+            try:
+                feed, snap = self._stats.get_nowait()
+            except queue.Empty:
+                break
+            self._snapshots[feed] = snap
+        pooled = {}
+        for snap in self._snapshots.values():
+            for stage, v in snap.items():
+                pooled.setdefault(stage, []).append(v)
+        return profiling.summarize({s: np.concatenate(v) for s, v in pooled.items()})
+
+    def feed_stats(self):
+        out = {}
+        for feed, c in zip(self.feeds, self._counters):
+            with c.get_lock():
+                scans, errors, dropped, scan_us, align_us, skipped = c[:]
+            out[feed["name"]] = {
+                "scans": scans, "errors": errors, "dropped": dropped, "skipped": skipped,
+                "scan_ms": scan_us / scans / 1000 if scans else 0.0,
+                "align_ms": align_us / scans / 1000 if scans else 0.0,
+            }
+        return out
+
+    def stats(self):
+        per = self.feed_stats().values()
+        scans = sum(f["scans"] for f in per)
+        return {
+            "continuous":      self.continuous,
+            "feeds":           len(self.feeds),
+            "frames_captured": scans,
+            "frames_analyzed": scans,
+            "frames_dropped":  sum(f["skipped"] for f in per),
+            "results_dropped": sum(f["dropped"] for f in per),
+            "errors":          sum(f["errors"] for f in per),
+            "align_ms":        sum(f["align_ms"] * f["scans"] for f in per) / scans if scans else 0.0,
+            "rooms_reloaded":  backend.rooms_reloaded,    # watched here as well as in each feed
+        }
+
+def make_worker(remote=True):
+    """
+    service.RemoteWorker when SERVICE_URL points at a running scan service
+    (and `remote`), else ScanScheduler when more than one feed is
+    configured, else the in-process ScanWorker.
+    """
+    if remote:
+        import service
+        if service.SERVICE_URL:
+            return service.RemoteWorker(service.SERVICE_URL)
+    if len(FEEDS) > 1:
+        return ScanScheduler()
+    return monitor.ScanWorker()
@@ -0,0 +1,94 @@
+import os
+import atexit
+import queue
+import threading
+import cv2
+from profiling import timings
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+HEATMAP_MODE  = "disk"   # "disk": PNG file, "memory": BGR array, "encoded": PNG bytes, "off"
+QUEUE_SIZE    = 16       # pending heatmaps before submit() blocks the scan
+# ────────────────────────────────────────────────────────────────────
+
+def render(live_crop, binm):
+    """Colour the binary diff mask and blend it over the live crop."""
+    heat = cv2.applyColorMap(binm, cv2.COLORMAP_JET)
+    return cv2.addWeighted(live_crop, 0.7, heat, 0.5, 0)
+
+class HeatmapWriter:
+    """
+    Renders and stores heatmaps on a background thread.
+
+    submit() only queues the work, so a scan returns as soon as the pixel
+    counts are known. When the job finishes the anomaly dict is updated in
+    place: "heatmap_path" (disk mode), "heatmap" (memory mode, BGR array) or
+    "heatmap_png" (encoded mode, PNG bytes). The queue is bounded; when it
+    is full submit() blocks, which pushes back on the scan loop instead of
+    growing memory without limit.
+    """
+
+    def __init__(self, mode=HEATMAP_MODE, maxsize=QUEUE_SIZE):
+        self.mode = mode
+        self.jobs = queue.Queue(maxsize=maxsize)
+        self.listeners = []
+        self.written = 0
+        self.errors = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def add_listener(self, fn):
+        """fn(anomaly) is called on the writer thread after each heatmap is stored."""
+        self.listeners.append(fn)
+
+    def notify(self, anomaly):
+        """Call the listeners for a heatmap stored elsewhere (e.g. by a feed process)."""
+        for fn in self.listeners:
+            try:
+                fn(anomaly)
+            except Exception as e:
+                print("heatmap listener error:", e)
+
+    def submit(self, anomaly, live_crop, binm, path):
+        if self.mode == "off":
+            return
+        self._ensure_thread()
+        self.jobs.put((anomaly, live_crop, binm, path, self.mode))
+
+    def flush(self):
+        """Block until every submitted heatmap has been stored."""
+        self.jobs.join()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="heatmap-writer", daemon=True)
+                self._thread.start()
+                # don't lose queued heatmaps (or die mid-encode) at interpreter exit
+                atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            anomaly, live_crop, binm, path, mode = self.jobs.get()
+            try:
+                with timings.stage("render"):
+                    overlay = render(live_crop, binm)
+                if mode == "memory":
+                    anomaly["heatmap"] = overlay
+                elif mode == "encoded":
+                    with timings.stage("write"):
+                        ok, buf = cv2.imencode(".png", overlay)
+                    if ok:
+                        anomaly["heatmap_png"] = buf.tobytes()
+                else:
+                    with timings.stage("write"):
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        ok = cv2.imwrite(path, overlay)
+                    if ok:
+                        anomaly["heatmap_path"] = path
+                self.written += 1
+                self.notify(anomaly)
+            except Exception as e:
+                self.errors += 1
+                print("heatmap error:", e)
+            finally:
+                self.jobs.task_done()
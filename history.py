@@ -0,0 +1,171 @@
+import time
+import queue
+import sqlite3
+import threading
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+COMMIT_ROWS     = 200    # commit once this many rows are pending...
+COMMIT_INTERVAL = 1.0    # ...or this many seconds after the first pending row
+# ────────────────────────────────────────────────────────────────────
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id          INTEGER PRIMARY KEY,
+    ts          REAL NOT NULL,
+    room        TEXT NOT NULL,
+    n_anomalies INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS anomalies (
+    id          INTEGER PRIMARY KEY,
+    scan_id     INTEGER NOT NULL REFERENCES scans(id),
+    ts          REAL NOT NULL,
+    room        TEXT NOT NULL,
+    class_name  TEXT NOT NULL,
+    pixel_count INTEGER NOT NULL,
+    x1 REAL, y1 REAL, x2 REAL, y2 REAL,
+    heatmap     TEXT
+);
+CREATE INDEX IF NOT EXISTS scans_room_ts      ON scans(room, ts);
+CREATE INDEX IF NOT EXISTS anomalies_room_cls ON anomalies(room, class_name, ts);
+CREATE INDEX IF NOT EXISTS anomalies_cls_ts   ON anomalies(class_name, ts);
+CREATE INDEX IF NOT EXISTS anomalies_ts       ON anomalies(ts);
+"""
+
+_CLOSE = object()     # queued by close(): commit what is pending and stop the writer
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+class HistoryStore:
+    """
+    Append-only scan history in SQLite (WAL mode).
+
+    record() only enqueues; a writer thread inserts rows and commits in
+    batches (COMMIT_ROWS / COMMIT_INTERVAL), so the scan loop never waits on
+    the disk. A batch that fails (e.g. the database stays locked by another
+    process past the busy timeout) is rolled back, logged and counted in
+    self.errors / self.dropped; the writer carries on with the next one.
+    Queries open their own connection per thread, which WAL lets run
+    alongside the writer.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        conn = _connect(path)
+        conn.executescript(SCHEMA)
+        conn.close()
+        self.pending = queue.Queue()
+        self.errors = 0           # failed batches
+        self.dropped = 0          # scans lost with them
+        self._local = threading.local()
+        self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self._thread.start()
+
+    # ── writing ─────────────────────────────────────────────────────
+    def record(self, room, anomalies, ts=None):
+        """Queue one scan result. Anomalies are the dicts returned by backend."""
+        rows = [(a["class_name"], a["pixel_count"], *map(float, a["box"]),
+                 a.get("heatmap_path") or a.get("heatmap_ref"))
+                for a in anomalies]
+        self.pending.put((ts or time.time(), room, rows))
+
+    def flush(self):
+        """Block until everything recorded so far is committed (or its batch failed)."""
+        done = threading.Event()
+        self.pending.put(done)
+        while not done.wait(0.5):
+            if not self._thread.is_alive():
+                raise RuntimeError(f"history writer for {self.path} has stopped")
+
+    def close(self):
+        """Commit everything recorded so far and stop the writer thread."""
+        self.pending.put(_CLOSE)
+        self._thread.join()
+
+    def _run(self):
+        conn = _connect(self.path)
+        n = scans = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+            try:
+                item = self.pending.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+            try:
+                if isinstance(item, tuple):
+                    ts, room, rows = item
+                    scans += 1
+                    cur = conn.execute("INSERT INTO scans (ts, room, n_anomalies) VALUES (?, ?, ?)",
+                                       (ts, room, len(rows)))
+                    scan_id = cur.lastrowid
+                    conn.executemany(
+                        "INSERT INTO anomalies (scan_id, ts, room, class_name, pixel_count, "
+                        "x1, y1, x2, y2, heatmap) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(scan_id, ts, room, *r) for r in rows])
+                    n += 1 + len(rows)
+                    if deadline is None:
+                        deadline = time.monotonic() + COMMIT_INTERVAL
+                # commit on a full batch, when the interval expires, or on flush()
+                if n and (not isinstance(item, tuple) or n >= COMMIT_ROWS
+                          or time.monotonic() >= deadline):
+                    conn.commit()
+                    n = scans = 0
+                    deadline = None
+            except sqlite3.Error as e:
+                self.errors += 1
+                self.dropped += scans
+                print(f"history: dropped {scans} scans:", e)
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    pass
+                n = scans = 0
+                deadline = None
+            if isinstance(item, threading.Event):
+                item.set()
+            elif item is _CLOSE:
+                conn.close()
+                return
+
+    # ── querying ────────────────────────────────────────────────────
+    def _reader(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
+
+    def query(self, room=None, class_name=None, since=None, until=None, limit=100):
+        """
+        Anomalies matching every given filter, newest first, as dicts with
+        ts, room, class_name, pixel_count, box and heatmap.
+        e.g. query("Bathroom", "Door", since=time.time() - 3600)
+        """
+        where, args = [], []
+        for col, op, val in (("room", "=", room), ("class_name", "=", class_name),
+                             ("ts", ">=", since), ("ts", "<", until)):
+            if val is not None:
+                where.append(f"{col} {op} ?")
+                args.append(val)
+        sql = "SELECT * FROM anomalies"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        rows = self._reader().execute(sql, (*args, limit)).fetchall()
+        return [{
+            "ts": r["ts"], "room": r["room"], "class_name": r["class_name"],
+            "pixel_count": r["pixel_count"], "box": [r["x1"], r["y1"], r["x2"], r["y2"]],
+            "heatmap": r["heatmap"],
+        } for r in rows]
+
+    def recent_scans(self, room=None, limit=20):
+        """Latest scans (ts, room, n_anomalies), newest first."""
+        sql, args = "SELECT ts, room, n_anomalies FROM scans", ()
+        if room is not None:
+            sql, args = sql + " WHERE room = ?", (room,)
+        rows = self._reader().execute(sql + " ORDER BY ts DESC LIMIT ?", (*args, limit)).fetchall()
+        return [dict(r) for r in rows]
@@ -0,0 +1,122 @@
+import time
+import queue
+import threading
+import config
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+DEBOUNCE = 0.5     # seconds a key is ignored after it fired (auto-repeat, bounces)
+GLOBAL   = True    # system-wide hook via the keyboard module (root on Linux); else window keys only
+# ────────────────────────────────────────────────────────────────────
+config.load_into("hotkeys", globals())
+
+class Hotkeys:
+    """
+    Hotkeys for both UIs, delivered as events instead of polled.
+
+    Every key press, from the keyboard module's system-wide hook, from the
+    focused window's own key events or from inject(), takes the same path:
+    it is debounced by timestamp on whatever thread it arrived on, and the
+    bound callback is handed to `post`, which must run it on the GUI
+    thread (see tk_poster() / qt_poster()). Nothing sleeps and nothing
+    wakes up while no key is pressed.
+    """
+
+    def __init__(self, post, debounce=None):
+        self.post = post
+        self.debounce = debounce      # None follows DEBOUNCE, including live config changes
+        self.bindings = {}            # key -> callback
+        self.last = {}                # key -> time it last fired
+        self.pressed = 0
+        self.fired = 0
+        self.debounced = 0
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def bind(self, key, fn):
+        self.bindings[key.lower()] = fn
+        return self
+
+    def start(self):
+        """Install the system-wide hooks (if GLOBAL); window events can be fed to inject() regardless."""
+        if not GLOBAL or self._hooks:
+            return False
+        try:
+            import keyboard
+            for key in self.bindings:
+                self._hooks.append(keyboard.on_press_key(key, lambda e, k=key: self.inject(k)))
+        except (ImportError, OSError, ValueError) as e:
+            # no root / no input device: only keys pressed in our own window work
+            print("hotkeys: global hook unavailable:", e)
+            return False
+        return True
+
+    def stop(self):
+        if not self._hooks:
+            return
+        import keyboard
+        for h in self._hooks:
+            try:
+                keyboard.unhook(h)
+            except (KeyError, ValueError):
+                pass
+        self._hooks = []
+
+    def inject(self, key, now=None):
+        """
+        A press of `key`, from any thread. Returns True if its callback was
+        posted, False if the key is unbound or still within the debounce.
+        """
+        key = key.lower()
+        fn = self.bindings.get(key)
+        if fn is None:
+            return False
+        now = time.monotonic() if now is None else now
+        debounce = DEBOUNCE if self.debounce is None else self.debounce
+        with self._lock:
+            self.pressed += 1
+            if now - self.last.get(key, float("-inf")) < debounce:
+                self.debounced += 1
+                return False
+            self.last[key] = now
+            self.fired += 1
+        self.post(fn)
+        return True
+
+    def stats(self):
+        return {"pressed": self.pressed, "fired": self.fired, "debounced": self.debounced,
+                "global": bool(self._hooks)}
+
+def tk_poster(root):
+    """post(fn) for Tk: queue fn and wake the main loop with a virtual event."""
+    pending = queue.SimpleQueue()
+
+    def run(_event=None):
+        while True:
+            try:
+                fn = pending.get_nowait()
+            except queue.Empty:
+                return
+            fn()
+
+    root.bind("<<Hotkey>>", run)
+
+    def post(fn):
+        pending.put(fn)
+        # event_generate is safe from other threads with a threaded Tcl
+        root.event_generate("<<Hotkey>>", when="tail")
+    return post
+
+def qt_poster():
+    """post(fn) for Qt: a queued signal, so fn runs on the GUI thread. Create it on that thread."""
+    from PyQt5 import QtCore
+
+    class Poster(QtCore.QObject):
+        call = QtCore.pyqtSignal(object)
+
+    poster = Poster()
+    poster.call.connect(lambda fn: fn(), QtCore.Qt.QueuedConnection)
+
+    def post(fn):
+        poster.call.emit(fn)
+    post.poster = poster    # keep the QObject alive with the function
+    return post
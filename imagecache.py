@@ -0,0 +1,131 @@
+import os
+import queue
+import threading
+from collections import OrderedDict
+import cv2
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+THUMB_BOX  = (550, 550)            # thumbnails fit in this (w, h)
+MAX_BYTES  = 64 * 1024 * 1024      # decoded thumbnails kept before the LRU evicts
+# ────────────────────────────────────────────────────────────────────
+
+def _decode(data):
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+class ImageCache:
+    """
+    LRU of decoded, already-scaled RGB thumbnails for the anomaly viewers.
+
+    Files are keyed on path, mtime and size, so a rewritten file is decoded
+    again; in-memory heatmaps are keyed on the array/bytes object, which the
+    entry keeps alive so its id can't be reused. prefetch_*() fill the cache
+    on a background thread, leaving template()/heatmap() a dict lookup on
+    the GUI thread, which then only wraps the array in a PhotoImage/QPixmap.
+    """
+
+    def __init__(self, box=THUMB_BOX, upscale=False, max_bytes=MAX_BYTES, read_archive=None):
+        self.box = box
+        self.upscale = upscale            # also enlarge images smaller than box
+        self.max_bytes = max_bytes
+        self.read_archive = read_archive  # path -> PNG bytes, for heatmaps moved out by retention
+        self.entries = OrderedDict()      # key -> (thumb, keepalive, nbytes)
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._jobs = queue.Queue()
+        self._thread = None
+
+    # ── sources ─────────────────────────────────────────────────────
+    def _file(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            if not path or self.read_archive is None:
+                return None, None, None
+            return (path, None, None), lambda: _decode(self.read_archive(path)), None
+        return (path, st.st_mtime_ns, st.st_size), lambda: cv2.imread(path, cv2.IMREAD_COLOR), None
+
+    def _heatmap(self, a):
+        if a.get("heatmap_path"):
+            return self._file(a["heatmap_path"])
+        arr = a.get("heatmap")
+        if arr is not None:
+            return ("mem", id(arr)), lambda: arr, arr
+        data = a.get("heatmap_png")
+        if data:
+            return ("mem", id(data)), lambda: _decode(data), data
+        return None, None, None
+
+    # ── lookup ──────────────────────────────────────────────────────
+    def template(self, path):
+        """Thumbnail (RGB array) of an image file, or None if it can't be read."""
+        return self._get(*self._file(path))
+
+    def heatmap(self, a):
+        """Thumbnail of an anomaly's heatmap in whatever form the writer left it, or None."""
+        return self._get(*self._heatmap(a))
+
+    def _get(self, key, load, keep):
+        if key is None:
+            return None
+        with self._lock:
+            hit = self.entries.get(key)
+            if hit is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return hit[0]
+            self.misses += 1
+        img = load()
+        if img is None:
+            return None
+        thumb = self._scale(img)
+        nbytes = thumb.nbytes + (keep.nbytes if isinstance(keep, np.ndarray) else len(keep or b""))
+        with self._lock:
+            if key not in self.entries:
+                self.entries[key] = (thumb, keep, nbytes)
+                self.bytes += nbytes
+                while self.bytes > self.max_bytes and len(self.entries) > 1:
+                    _, (_, _, n) = self.entries.popitem(last=False)
+                    self.bytes -= n
+        return thumb
+
+    def _scale(self, img):
+        h, w = img.shape[:2]
+        bw, bh = self.box
+        f = min(bw / w, bh / h)
+        if f < 1 or (self.upscale and f > 1):
+            size = (max(int(round(w * f)), 1), max(int(round(h * f)), 1))
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA if f < 1 else cv2.INTER_CUBIC)
+        return np.ascontiguousarray(img[:, :, ::-1])   # BGR -> RGB
+
+    # ── prefetch ────────────────────────────────────────────────────
+    def prefetch_template(self, path):
+        self._submit(lambda: self.template(path))
+
+    def prefetch_heatmap(self, a):
+        """Safe from any thread, e.g. as a HeatmapWriter listener."""
+        self._submit(lambda: self.heatmap(a))
+
+    def _submit(self, job):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="thumbnail-prefetch", daemon=True)
+                self._thread.start()
+        self._jobs.put(job)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                job()
+            except Exception as e:
+                print("thumbnail error:", e)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self.entries), "bytes": self.bytes,
+                    "hits": self.hits, "misses": self.misses}
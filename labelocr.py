@@ -0,0 +1,147 @@
+import time
+import hashlib
+import threading
+import cv2
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+BOX_PAD      = 6      # pixels of margin kept around the located text
+MAX_HEIGHT   = 64     # crops are shrunk to this height (EasyOCR's recognizer input height)
+HASH_CELL    = 4      # the skip hash is taken over a 1/HASH_CELL-size thumbnail ...
+HASH_SHIFT   = 3      # ... with each pixel quantized to 256 >> HASH_SHIFT levels
+MAX_MISSES   = 3      # recognition failures in a row before the box is located again
+# ────────────────────────────────────────────────────────────────────
+
+def to_gray(img):
+    if img.ndim == 2:
+        return img
+    return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY if img.shape[2] == 4 else cv2.COLOR_BGR2GRAY)
+
+def match_room(text, rooms):
+    low = text.lower()
+    for room in rooms:
+        if room.lower() in low:
+            return room
+    return None
+
+class LabelOCR:
+    """
+    OCR of the room label without running EasyOCR's text detector on
+    every scan.
+
+    The first read (or one after MAX_MISSES failed ones) runs the full
+    readtext() over the label ROI and keeps the box of the text that named a
+    room, as fractions of the ROI, widened to fit the longest room name.
+    Later reads crop that box, shrink it to MAX_HEIGHT and call recognize()
+    on it alone. Before either, a hash of a coarse thumbnail of the crop is
+    compared with the last read's; if it matches, the last room is returned
+    without any OCR. A failed recognize() is never reused that way, so a
+    still picture whose box cuts the label gets located again.
+    """
+
+    def __init__(self, get_reader, rooms):
+        self.get_reader = get_reader      # () -> easyocr.Reader, so the model stays lazy
+        self.rooms = list(rooms)
+        letters = "".join(self.rooms)
+        self.allowlist = "".join(sorted(set(letters.lower() + letters.upper()))) + " "
+        self.box = None                   # (x0, y0, x1, y1) as fractions of the ROI
+        self.misses = 0
+        self.last_hash = None
+        self.last_room = None
+        self.counts = {"skipped": 0, "recognized": 0, "located": 0, "failed": 0}
+        self.ms = {"recognize": 0.0, "locate": 0.0}
+        self._lock = threading.Lock()
+
+    def _crop(self, gray):
+        if self.box is None:
+            return gray
+        h, w = gray.shape
+        x0, y0, x1, y1 = self.box
+        return gray[int(y0 * h):max(int(y1 * h), 1), int(x0 * w):max(int(x1 * w), 1)]
+
+    @staticmethod
+    def _hash(crop):
+        h, w = crop.shape
+        small = cv2.resize(crop, (max(w // HASH_CELL, 1), max(h // HASH_CELL, 1)),
+                           interpolation=cv2.INTER_AREA) >> HASH_SHIFT
+        return hashlib.blake2b(small.tobytes(), digest_size=16).digest() + bytes(small.shape)
+
+    def read(self, roi):
+        """Room named in a label ROI (BGR/BGRA/gray), or None."""
+        gray = to_gray(roi)
+        with self._lock:
+            crop = self._crop(gray)
+            key = self._hash(crop)
+            if key == self.last_hash:
+                self.counts["skipped"] += 1
+                return self.last_room
+            if self.box is not None:
+                room = self._recognize(crop)
+                if room is None:
+                    self.misses += 1
+                    if self.misses >= MAX_MISSES:
+                        self.box = None
+                else:
+                    self.misses = 0
+            else:
+                room = self._locate(gray)
+                # the box moved: hash what the next read will crop
+                key = self._hash(self._crop(gray))
+            if room is None and self.box is not None:
+                # the cached box may cut the label: don't let the same picture skip
+                # the retries that lead to locating it again
+                key = None
+            self.last_hash, self.last_room = key, room
+            if room is None:
+                self.counts["failed"] += 1
+            return room
+
+    def _recognize(self, crop):
+        t0 = time.perf_counter()
+        h, w = crop.shape
+        if h > MAX_HEIGHT:
+            crop = cv2.resize(crop, (max(int(w * MAX_HEIGHT / h), 1), MAX_HEIGHT),
+                              interpolation=cv2.INTER_AREA)
+        # no horizontal/free lists: the whole crop is the one text box
+        results = self.get_reader().recognize(crop, allowlist=self.allowlist)
+        self.ms["recognize"] += (time.perf_counter() - t0) * 1000
+        self.counts["recognized"] += 1
+        text = " ".join(t for _, t, _ in results)
+        return match_room(text, self.rooms)
+
+    def _locate(self, gray):
+        t0 = time.perf_counter()
+        results = self.get_reader().readtext(gray)
+        self.ms["locate"] += (time.perf_counter() - t0) * 1000
+        self.counts["located"] += 1
+        for pts, text, _ in results:
+            room = match_room(text, self.rooms)
+            if room is None:
+                continue
+            pts = np.asarray(pts, np.float64)
+            h, w = gray.shape
+            x0, y0 = pts.min(axis=0) - BOX_PAD
+            x1, y1 = pts.max(axis=0) + BOX_PAD
+            # room names differ in length: leave room for the longest one
+            longest = max(len(r) for r in self.rooms)
+            x1 = x0 + (x1 - x0) * longest / max(len(text.strip()), 1)
+            self.box = (float(max(x0, 0) / w), float(max(y0, 0) / h),
+                        float(min(x1, w) / w), float(min(y1, h) / h))
+            self.misses = 0
+            return room
+        return None
+
+    def reset(self):
+        with self._lock:
+            self.box = None
+            self.misses = 0
+            self.last_hash = self.last_room = None
+
+    def stats(self):
+        with self._lock:
+            out = dict(self.counts)
+            out["box"] = self.box
+            for k, ms in self.ms.items():
+                n = self.counts["recognized" if k == "recognize" else "located"]
+                out[k + "_ms"] = ms / n if n else 0.0
+            return out
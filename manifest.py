@@ -0,0 +1,78 @@
+import os
+import json
+import hashlib
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+MANIFEST_FILE = "regions.json"   # per room, next to template.png
+# ────────────────────────────────────────────────────────────────────
+
+# Written by train.py's CropTool as crops are saved:
+#   {"template": <sha1 of template.png>,
+#    "regions": {class_name: {"box": [x1, y1, x2, y2], "crop": <sha1 of the crop png>}}}
+# The box is exactly where the crop was cut from the template, so backend
+# doesn't have to find it again with matchTemplate.
+
+def path_for(room_dir):
+    return os.path.join(room_dir, MANIFEST_FILE)
+
+def file_hash(path):
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()
+    except OSError:
+        return None
+
+def load(room_dir):
+    try:
+        with open(path_for(room_dir)) as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return doc if isinstance(doc, dict) else {}
+
+def save(room_dir, doc):
+    tmp = path_for(room_dir) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(doc, f, indent=1)
+    os.replace(tmp, path_for(room_dir))
+
+def record(room_dir, name, box):
+    """Add (or replace) the entry for a crop just saved to group_templates/<name>.png."""
+    tpl = file_hash(os.path.join(room_dir, "template.png"))
+    doc = load(room_dir)
+    if doc.get("template") != tpl:
+        # boxes recorded against another template no longer hold
+        doc = {"template": tpl, "regions": {}}
+    doc.setdefault("regions", {})[name] = {
+        "box": [float(v) for v in box],
+        "crop": file_hash(os.path.join(room_dir, "group_templates", f"{name}.png")),
+    }
+    save(room_dir, doc)
+
+def crop_names(room_dir):
+    tpl_dir = os.path.join(room_dir, "group_templates")
+    if not os.path.isdir(tpl_dir):
+        return []
+    return sorted(os.path.splitext(fn)[0] for fn in os.listdir(tpl_dir)
+                  if fn.lower().endswith(".png"))
+
+def load_regions(room_dir):
+    """
+    (regions, missing): region entries for the crops the manifest still
+    describes, and the names of crops it doesn't (no entry, or the template
+    or crop changed since it was written) and that have to be matched.
+    """
+    names = crop_names(room_dir)
+    doc = load(room_dir)
+    entries = doc.get("regions", {})
+    if not entries or doc.get("template") != file_hash(os.path.join(room_dir, "template.png")):
+        return [], names
+    regions, missing = [], []
+    for name in names:
+        e = entries.get(name)
+        crop = os.path.join(room_dir, "group_templates", f"{name}.png")
+        if e is None or e.get("crop") != file_hash(crop):
+            missing.append(name)
+        else:
+            regions.append({"class_name": name, "box": e["box"]})
+    return regions, missing
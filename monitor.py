@@ -0,0 +1,206 @@
+import time
+import queue
+import threading
+import backend
+import align
+import temporal
+from profiling import timings
+import config
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+MONITOR_RATE = 2.0   # frames per second captured in continuous mode
+MAX_RESULTS  = 32    # results kept for the UI before the oldest is dropped
+# ────────────────────────────────────────────────────────────────────
+config.load_into("monitor", globals())
+
+class ScanWorker:
+    """
+    Runs capture and analysis off the GUI thread.
+
+    A capture thread grabs frames (continuously at `rate` fps, or once per
+    trigger()) with backend.capture_scan(), which reads the room label and
+    grabs just that room's region area, into a single-frame slot; an analysis thread takes the newest
+    frame from that slot. If a new frame arrives before the previous one was
+    analyzed, the stale frame is replaced and counted as dropped, so analysis
+    never falls further behind than one frame.
+
+    Frames captured in continuous mode share a temporal.TemporalFilter, so
+    unchanged regions skip the diff and only anomalies that persist across
+    frames are reported; one-off trigger() scans stay stateless.
+
+    Results are (room, anomalies) tuples, read with get_results(). A
+    trigger() may carry an id, returned with the scan it caused (see
+    get_results(with_triggers=True)).
+    """
+
+    def __init__(self, rate=None, max_results=MAX_RESULTS):
+        self.rate = rate          # None follows MONITOR_RATE, including live config changes
+        self.continuous = False
+        self.results = queue.Queue(maxsize=max_results)
+        self.temporal = temporal.TemporalFilter()
+
+        self.frames_captured = 0
+        self.frames_analyzed = 0
+        self.frames_dropped  = 0
+        self.results_dropped = 0
+        self.errors          = 0
+
+        self._slot = None
+        self._slot_cv = threading.Condition()
+        self._wake = threading.Event()
+        self._pending_trigger = False
+        self._trigger_ids = []      # ids of the triggers the next triggered scan answers
+        self._trigger_lock = threading.Lock()
+        self._running = False
+        self._threads = []
+
+    # ── control ─────────────────────────────────────────────────────
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="scan-capture", daemon=True),
+            threading.Thread(target=self._analyze_loop, name="scan-analyze", daemon=True),
+        ]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        self._running = False
+        self._wake.set()
+        with self._slot_cv:
+            self._slot_cv.notify_all()
+        for t in self._threads:
+            t.join(timeout=2)
+        self._threads = []
+
+    def trigger(self, trigger_id=None):
+        """
+        Request a single scan (after the usual settle delay). Triggers that
+        arrive before it is captured are answered by that same scan.
+        """
+        with self._trigger_lock:
+            if trigger_id is not None:
+                self._trigger_ids.append(trigger_id)
+            self._pending_trigger = True
+        self._wake.set()
+
+    def set_continuous(self, on):
+        on = bool(on)
+        if on and not self.continuous:
+            # persistence counts consecutive frames; start a fresh run
+            self.temporal = temporal.TemporalFilter()
+        self.continuous = on
+        self._wake.set()
+
+    def toggle_continuous(self):
+        self.set_continuous(not self.continuous)
+        return self.continuous
+
+    def get_results(self, with_triggers=False):
+        """
+        All results produced since the last call, oldest first. Never blocks.
+        with_triggers: (room, anomalies, trigger_ids) instead, trigger_ids
+        being the ids passed to the trigger() calls the scan answered (empty
+        for continuous-mode scans).
+        """
+        out = []
+        while True:
+            try:
+                room, anomalies, ids = self.results.get_nowait()
+            except queue.Empty:
+                return out
+            out.append((room, anomalies, ids) if with_triggers else (room, anomalies))
+
+    def stats(self):
+        return {
+            "continuous":      self.continuous,
+            "frames_captured": self.frames_captured,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_dropped":  self.frames_dropped,
+            "results_dropped": self.results_dropped,
+            "errors":          self.errors,
+            "align_ms":        align.stats.as_dict()["mean_ms"],
+            "rooms_reloaded":  backend.rooms_reloaded,
+            **self.temporal.stats(),
+        }
+
+    def stage_stats(self):
+        """Per-stage latency percentiles (see profiling.StageTimer)."""
+        return timings.summary()
+
+    # ── threads ─────────────────────────────────────────────────────
+    def _capture_loop(self):
+        next_t = time.monotonic()
+        while self._running:
+            with self._trigger_lock:
+                triggered, self._pending_trigger = self._pending_trigger, False
+                ids, self._trigger_ids = tuple(self._trigger_ids), []
+            if triggered:
+                with timings.stage("settle"):
+                    time.sleep(backend.SETTLE_DELAY)
+                filt = None
+            elif self.continuous:
+                delay = next_t - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                    self._wake.clear()
+                    continue
+                rate = self.rate if self.rate is not None else MONITOR_RATE
+                next_t = time.monotonic() + 1.0 / max(rate, 0.01)
+                filt = self.temporal
+                ids = ()
+            else:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+
+            t0 = time.perf_counter()
+            try:
+                frame = (backend.capture_scan(), filt, t0, ids)
+            except Exception as e:
+                self.errors += 1
+                print("capture error:", e)
+                continue
+            self.frames_captured += 1
+            with self._slot_cv:
+                if self._slot is not None:
+                    self.frames_dropped += 1
+                    # the newer frame answers the dropped one's triggers
+                    frame = frame[:3] + (self._slot[3] + frame[3],)
+                self._slot = frame
+                self._slot_cv.notify()
+
+    def _analyze_loop(self):
+        while self._running:
+            with self._slot_cv:
+                while self._slot is None and self._running:
+                    self._slot_cv.wait()
+                frame, self._slot = self._slot, None
+            if frame is None:
+                continue
+            try:
+                captured, filt, t0, ids = frame
+                room, anomalies = backend.analyze_scan(captured, filt)
+            except Exception as e:
+                self.errors += 1
+                print("analyze error:", e)
+                continue
+            self.frames_analyzed += 1
+            # capture to result, including any wait in the slot
+            timings.record("scan", (time.perf_counter() - t0) * 1000)
+            self._publish((room, anomalies, ids))
+
+    def _publish(self, result):
+        while True:
+            try:
+                self.results.put_nowait(result)
+                return
+            except queue.Full:
+                # UI is not keeping up: drop the oldest result
+                try:
+                    self.results.get_nowait()
+                    self.results_dropped += 1
+                except queue.Empty:
+                    pass
@@ -0,0 +1,223 @@
+from collections import OrderedDict
+from PyQt5 import QtCore, QtGui, QtWidgets
+import config
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+BOX_COLOR     = (255, 60, 60)   # RGB of the anomaly outlines and labels
+HEAT_OPACITY  = 0.55            # heatmap drawn over the box at this opacity
+LABEL_HEIGHT  = 16              # px of the name/count strip above each box
+MAX_TEXTURES  = 64              # box-sized heatmap pixmaps kept before the LRU evicts
+# ────────────────────────────────────────────────────────────────────
+config.load_into("overlayviews", globals())
+
+def to_pixmap(thumb):
+    """QPixmap of an RGB thumbnail from imagecache (QPixmap.fromImage copies it)."""
+    h, w = thumb.shape[:2]
+    img = QtGui.QImage(thumb.data, w, h, thumb.strides[0], QtGui.QImage.Format_RGB888)
+    return QtGui.QPixmap.fromImage(img)
+
+def heat_key(a):
+    """Identity of an anomaly's heatmap: it changes only when a new heatmap is written."""
+    if a.get("heatmap_path"):
+        return a["heatmap_path"]
+    for k in ("heatmap", "heatmap_png"):
+        if a.get(k) is not None:
+            return (k, id(a[k]))
+    return None
+
+class BoxLayer(QtWidgets.QWidget):
+    """
+    Retained-mode layer drawing the last scanned room's anomalies at their
+    place on screen: an outline, the heatmap and a name/count strip.
+
+    set_result() keeps one item per anomaly and compares it with the one
+    it replaces. Only the areas that differ are invalidated: a moved or
+    new box (and its old place), or just the label strip when only the
+    count changed. paintEvent() redraws the items inside the dirty
+    region. Heatmaps are scaled to their box once and kept as pixmaps.
+    Mouse events pass through to the widgets underneath.
+    """
+
+    def __init__(self, parent, thumbs):
+        super().__init__(parent)
+        self.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self.setAttribute(QtCore.Qt.WA_NoSystemBackground)
+        self.thumbs = thumbs
+        self.room = None
+        self.items = {}                 # class_name -> item dict
+        self.textures = OrderedDict()   # (heat_key, w, h) -> QPixmap
+        self.paints = 0
+        self.painted_px = 0             # area repainted, summed over paints
+        self.pen = QtGui.QPen(QtGui.QColor(*BOX_COLOR), 2)
+        self.label_bg = QtGui.QColor(*BOX_COLOR, 200)
+
+    @staticmethod
+    def _label_rect(rect):
+        return QtCore.QRect(rect.left(), rect.top() - LABEL_HEIGHT, max(rect.width(), 120), LABEL_HEIGHT)
+
+    def _extent(self, item):
+        # the outline pen reaches a pixel outside the box
+        return QtGui.QRegion(item["rect"].adjusted(-2, -2, 2, 2)) + QtGui.QRegion(item["label"])
+
+    def set_result(self, room, anomalies, scale):
+        """Show `room`'s anomalies; `scale` maps template pixels to this widget's pixels."""
+        old = self.items if room == self.room else {}
+        dirty = QtGui.QRegion()
+        if room != self.room:
+            for item in self.items.values():
+                dirty += self._extent(item)
+        items = {}
+        for a in anomalies:
+            x1, y1, x2, y2 = a["box"]
+            rect = QtCore.QRect(int(x1 * scale), int(y1 * scale),
+                                max(int((x2 - x1) * scale), 1), max(int((y2 - y1) * scale), 1))
+            item = {"rect": rect, "label": self._label_rect(rect),
+                    "text": f"{a['class_name']} {a['pixel_count']}", "a": a, "heat": heat_key(a),
+                    "tex": None}
+            prev = old.get(a["class_name"])
+            if prev is not None and prev["rect"] == rect and prev["heat"] == item["heat"]:
+                item["tex"] = prev["tex"]
+                if prev["text"] != item["text"]:
+                    dirty += QtGui.QRegion(item["label"])
+            else:
+                if prev is not None:
+                    dirty += self._extent(prev)
+                dirty += self._extent(item)
+            items[a["class_name"]] = item
+        for cls in old.keys() - items.keys():
+            dirty += self._extent(old[cls])
+        self.room, self.items = room, items
+        self.refresh(dirty)
+
+    def refresh(self, dirty=None):
+        """
+        Pick up heatmaps that were still being written at set_result()
+        (call it from the result poll) and repaint just those boxes.
+        """
+        dirty = QtGui.QRegion() if dirty is None else dirty
+        for item in self.items.values():
+            if item["tex"] is None and item["heat"] is not None:
+                item["tex"] = self._texture(item)
+                if item["tex"] is not None:
+                    dirty += QtGui.QRegion(item["rect"])
+        if not dirty.isEmpty():
+            self.update(dirty)
+
+    def _texture(self, item):
+        size = item["rect"].size()
+        key = (item["heat"], size.width(), size.height())
+        pix = self.textures.get(key)
+        if pix is not None:
+            self.textures.move_to_end(key)
+            return pix
+        thumb = self.thumbs.heatmap(item["a"])
+        if thumb is None:
+            return None
+        pix = to_pixmap(thumb).scaled(size, QtCore.Qt.IgnoreAspectRatio, QtCore.Qt.SmoothTransformation)
+        self.textures[key] = pix
+        while len(self.textures) > MAX_TEXTURES:
+            self.textures.popitem(last=False)
+        return pix
+
+    def paintEvent(self, ev):
+        self.paints += 1
+        self.painted_px += sum(r.width() * r.height() for r in ev.region().rects())
+        area = ev.rect()
+        p = QtGui.QPainter(self)
+        for item in self.items.values():
+            rect, label = item["rect"], item["label"]
+            if not (area.intersects(rect.adjusted(-2, -2, 2, 2)) or area.intersects(label)):
+                continue
+            if item["tex"] is not None:
+                p.setOpacity(HEAT_OPACITY)
+                p.drawPixmap(rect.topLeft(), item["tex"])
+                p.setOpacity(1.0)
+            p.setPen(self.pen)
+            p.setBrush(QtCore.Qt.NoBrush)
+            p.drawRect(rect)
+            p.fillRect(label, self.label_bg)
+            p.setPen(QtCore.Qt.white)
+            p.drawText(label.adjusted(4, 0, 0, 0), QtCore.Qt.AlignVCenter | QtCore.Qt.AlignLeft, item["text"])
+        p.end()
+
+class AnomalyPanel(QtWidgets.QWidget):
+    """
+    The viewer's list of a room's anomalies (header, heatmap, template
+    crop), built from a pool of rows that are reused: opening another
+    room, or the same one again, only changes the rows whose anomaly
+    changed and hides the spare ones.
+    """
+
+    def __init__(self, thumbs, template_path, parent=None):
+        super().__init__(parent)
+        self.thumbs = thumbs
+        self.template_path = template_path     # (room, class_name) -> crop path
+        self.layout_ = QtWidgets.QVBoxLayout(self)
+        self.layout_.setContentsMargins(0, 0, 0, 0)
+        self.layout_.setSpacing(5)
+        self.close_btn = QtWidgets.QPushButton("✕")
+        self.close_btn.setFixedSize(24, 24)
+        self.close_btn.setStyleSheet("background-color: rgba(255,255,255,200);")
+        self.close_btn.clicked.connect(self.clear)
+        self.layout_.addWidget(self.close_btn, alignment=QtCore.Qt.AlignRight)
+        self.rows = []      # [{"widget", "hdr", "heat", "tpl"} + what they show: "text", "heatmap", "crop"]
+        self.layout_.addStretch(1)
+        self.clear()
+
+    def _row(self, i):
+        while len(self.rows) <= i:
+            w = QtWidgets.QWidget()
+            v = QtWidgets.QVBoxLayout(w)
+            v.setContentsMargins(0, 0, 0, 0)
+            hdr = QtWidgets.QLabel()
+            hdr.setStyleSheet("color: white; font-weight: bold;")
+            # a new count in the text must not re-lay out the whole list
+            hdr.setSizePolicy(QtWidgets.QSizePolicy.Ignored, QtWidgets.QSizePolicy.Fixed)
+            v.addWidget(hdr)
+            h = QtWidgets.QHBoxLayout()
+            heat, tpl = QtWidgets.QLabel(), QtWidgets.QLabel()
+            h.addWidget(heat)
+            h.addWidget(tpl)
+            v.addLayout(h)
+            # before the trailing stretch
+            self.layout_.insertWidget(self.layout_.count() - 1, w)
+            self.rows.append({"widget": w, "hdr": hdr, "heat": heat, "tpl": tpl,
+                              "text": None, "heatmap": None, "crop": None})
+        return self.rows[i]
+
+    @staticmethod
+    def _set_image(lbl, thumb, missing):
+        if thumb is None:
+            lbl.setPixmap(QtGui.QPixmap())
+            lbl.setText(missing)
+        else:
+            lbl.setPixmap(to_pixmap(thumb))
+
+    def show_anomalies(self, room, anomalies):
+        for i, a in enumerate(anomalies):
+            row = self._row(i)
+            cls = a["class_name"]
+            # each part is only touched when it differs from what the row shows;
+            # a new pixmap re-lays out the list, a new count does not
+            text = f"{cls}: {a['pixel_count']} px changed"
+            if row["text"] != text:
+                row["hdr"].setText(text)
+                row["text"] = text
+            heat = heat_key(a)
+            if row["heatmap"] is None or row["heatmap"] != heat:
+                thumb = self.thumbs.heatmap(a)
+                self._set_image(row["heat"], thumb, "(no heatmap)")
+                row["heatmap"] = heat if thumb is not None else None
+            if row["crop"] != (room, cls):
+                self._set_image(row["tpl"], self.thumbs.template(self.template_path(room, cls)),
+                                "(no template)")
+                row["crop"] = (room, cls)
+            row["widget"].show()
+        for row in self.rows[len(anomalies):]:
+            row["widget"].hide()
+        self.close_btn.show()
+
+    def clear(self):
+        for row in self.rows:
+            row["widget"].hide()
+        self.close_btn.hide()
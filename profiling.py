@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+ENABLED   = True        # per-stage timing (a perf_counter pair per stage)
+WINDOW    = 512         # samples kept per stage for the percentiles
+PROFILER  = "cprofile"  # per-scan dumps: "cprofile" (.prof) or "pyinstrument" (.html)
+DUMP_DIR  = None        # set (e.g. by --profile) to dump one profile per scan
+# ────────────────────────────────────────────────────────────────────
+
+# pipeline order, for printing; other stage names are listed after these
+# "ocr" is the part of "detect" spent in EasyOCR, "analyze" the whole
+# analysis half of a scan, "scan" capture + analysis
+STAGES = ["settle", "capture", "detect", "ocr", "align", "diff", "render", "write", "analyze", "scan"]
+
+class StageTimer:
+    """
+    Rolling per-stage latency in milliseconds.
+
+    Each stage keeps its last WINDOW samples in a preallocated ring, so
+    recording is a lock and an array store; percentiles are only computed
+    when summary() is asked for.
+    """
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.rings = {}       # stage -> float64 ring of ms
+        self.counts = {}      # stage -> samples ever recorded
+        self._lock = threading.Lock()
+
+    def record(self, stage, ms):
+        if not ENABLED:
+            return
+        with self._lock:
+            ring = self.rings.get(stage)
+            if ring is None:
+                ring = self.rings[stage] = np.zeros(self.window)
+                self.counts[stage] = 0
+            ring[self.counts[stage] % self.window] = ms
+            self.counts[stage] += 1
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one sample of `name`."""
+        if not ENABLED:
+            yield
+            return
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000)
+
+    def snapshot(self):
+        """{stage: recent samples}, e.g. to ship to another process."""
+        with self._lock:
+            return {s: r[:min(self.counts[s], self.window)].copy() for s, r in self.rings.items()}
+
+    def reset(self):
+        with self._lock:
+            self.rings.clear()
+            self.counts.clear()
+
+    def summary(self):
+        return summarize(self.snapshot())
+
+def summarize(samples):
+    """{stage: {"n", "mean", "p50", "p95", "p99", "max"}} for {stage: samples}, pipeline order."""
+    order = sorted(samples, key=lambda s: (STAGES.index(s) if s in STAGES else len(STAGES), s))
+    out = {}
+    for stage in order:
+        v = np.asarray(samples[stage])
+        if not len(v):
+            continue
+        p50, p95, p99 = np.percentile(v, (50, 95, 99))
+        out[stage] = {"n": int(len(v)), "mean": float(v.mean()), "p50": float(p50),
+                      "p95": float(p95), "p99": float(p99), "max": float(v.max())}
+    return out
+
+def format_table(summary):
+    lines = [f"{'stage':<8} {'n':>5} {'p50':>8} {'p95':>8} {'p99':>8}"]
+    for stage, s in summary.items():
+        lines.append(f"{stage:<8} {s['n']:>5} {s['p50']:>8.2f} {s['p95']:>8.2f} {s['p99']:>8.2f}")
+    return "\n".join(lines)
+
+timings = StageTimer()
+
+# ── per-scan profiler dumps ─────────────────────────────────────────
+_dump_seq = 0
+_dump_lock = threading.Lock()
+
+def enable_dumps(path, profiler=None):
+    """Dump a profile of every scan into `path` (see dump())."""
+    global DUMP_DIR, PROFILER
+    os.makedirs(path, exist_ok=True)
+    DUMP_DIR = path
+    PROFILER = profiler or PROFILER
+
+def from_argv(argv):
+    """
+    Handle the UIs' `--profile [DIR]` flag: enable per-scan dumps into DIR
+    (default ./profiles). Returns True if the flag was given.
+    """
+    if "--profile" not in argv:
+        return False
+    i = argv.index("--profile")
+    path = argv[i + 1] if i + 1 < len(argv) and not argv[i + 1].startswith("-") else "profiles"
+    enable_dumps(path)
+    return True
+
+@contextmanager
+def dump(name):
+    """
+    Profile the enclosed block on this thread and write it to
+    DUMP_DIR/<name>_<time>_<seq>.prof (or .html with pyinstrument).
+    Does nothing unless dumps are enabled.
+    """
+    global _dump_seq
+    if DUMP_DIR is None:
+        yield
+        return
+    with _dump_lock:
+        _dump_seq += 1
+        seq = _dump_seq
+    stem = os.path.join(DUMP_DIR, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{seq:05d}")
+    if PROFILER == "pyinstrument":
+        from pyinstrument import Profiler
+        prof = Profiler()
+        prof.start()
+        try:
+            yield
+        finally:
+            prof.stop()
+            with open(stem + ".html", "w") as f:
+                f.write(prof.output_html())
+        return
+    import cProfile
+    prof = cProfile.Profile()
+    try:
+        prof.enable()
+    except ValueError:
+        # another thread's scan is being profiled (one profiler at a time on 3.12+)
+        yield
+        return
+    try:
+        yield
+    finally:
+        prof.disable()
+        prof.dump_stats(stem + ".prof")
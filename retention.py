@@ -0,0 +1,240 @@
+import os
+import re
+import time
+import queue
+import zipfile
+import threading
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+MAX_BYTES_PER_ROOM  = 200 * 1024 * 1024   # heatmap bytes kept on disk per room
+MAX_AGE             = 7 * 24 * 3600       # seconds; older heatmaps are evicted
+KEEP_LAST_PER_CLASS = 50                  # newest heatmaps kept per room/class
+ARCHIVE             = True                # pack evicted heatmaps instead of deleting
+ARCHIVE_NAME        = "archive.zip"
+ARCHIVE_OLD_NAME    = "archive.old.zip"
+ARCHIVE_MAX_BYTES   = 500 * 1024 * 1024   # archive is rotated to archive.old.zip past this;
+                                          # only one old archive is kept, the previous one is deleted
+SWEEP_INTERVAL      = 30.0                # seconds between policy checks
+# ────────────────────────────────────────────────────────────────────
+
+class RetentionManager:
+    """
+    Keeps LogCabin/<Room>/heatmaps/ bounded by size, age and per-class count.
+
+    An in-memory index of each room's heatmaps is seeded with one listing
+    per room (on the background thread, one room at a time) and then kept
+    current through note_written(), so neither the scan path nor later
+    sweeps walk the directory. Evicted files, oldest first, are appended to
+    the room's archive.zip (stored, as PNGs are already compressed; the zip
+    directory is the index) or deleted when ARCHIVE is off. Each evicted
+    path's archive and member name is remembered, so read_heatmap() finds
+    that very file even when an older heatmap of the same name was archived
+    first. The archive is written outside the index lock, so stats() and
+    reads of heatmaps still on disk never wait for it.
+    """
+
+    def __init__(self, base_dir, rooms, subfolder="heatmaps"):
+        self.base_dir = base_dir
+        self.rooms = list(rooms)
+        self.subfolder = subfolder
+        self.index = {}            # room -> {path: (mtime, size, class_name)}
+        self.members = {}          # evicted path -> (archive file, member name)
+        self.evicted = 0
+        self.archived = 0
+        self._to_seed = list(self.rooms)
+        self._incoming = queue.Queue()
+        self._lock = threading.Lock()              # index and counters
+        self._archive_lock = threading.Lock()      # the rooms' archive files
+        self._thread = None
+
+    def heat_dir(self, room):
+        return os.path.join(self.base_dir, room, self.subfolder)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="heatmap-retention", daemon=True)
+            self._thread.start()
+
+    def note_written(self, path):
+        """Tell the manager about a new heatmap (cheap; safe from any thread)."""
+        if path:
+            self._incoming.put(path)
+
+    def retarget(self, base_dir, rooms):
+        """
+        Follow a change of LogCabin tree or room list (backend.on_config):
+        forget rooms that are gone, seed the ones that are new. Listeners
+        and readers holding this manager keep working.
+        """
+        rooms = list(rooms)
+        with self._lock:
+            if base_dir != self.base_dir:
+                self.index.clear()
+                new = rooms
+            else:
+                for room in set(self.index) - set(rooms):
+                    del self.index[room]
+                new = [r for r in rooms if r not in self.rooms]
+            self.base_dir, self.rooms = base_dir, rooms
+            self._to_seed = [r for r in self._to_seed if r in rooms and r not in new] + new
+
+    # ── background ──────────────────────────────────────────────────
+    def _run(self):
+        next_sweep = time.monotonic()
+        while True:
+            try:
+                self._add(self._incoming.get(timeout=1.0))
+            except queue.Empty:
+                pass
+            with self._lock:
+                room = self._to_seed.pop(0) if self._to_seed else None
+                rooms = list(self.rooms)
+            if room is not None:
+                self._seed(room)
+            elif time.monotonic() >= next_sweep:
+                for room in rooms:
+                    try:
+                        self.enforce(room)
+                    except OSError as e:
+                        print("retention error:", e)
+                next_sweep = time.monotonic() + SWEEP_INTERVAL
+
+    def _class_of(self, room, fn):
+        # <room>_<class>_<YYYYmmdd>_<HHMMSS>[_<microseconds>]_HEAT.png
+        m = re.match(rf"^{re.escape(room)}_(.+)_\d{{8}}_\d{{6}}(?:_\d{{6}})?_HEAT\.png$", fn)
+        return m.group(1) if m else None
+
+    def _seed(self, room):
+        d = self.heat_dir(room)
+        found = {}
+        if os.path.isdir(d):
+            with os.scandir(d) as it:
+                for e in it:
+                    cls = self._class_of(room, e.name)
+                    if cls and e.is_file():
+                        st = e.stat()
+                        found[e.path] = (st.st_mtime, st.st_size, cls)
+        with self._lock:
+            if room in self.rooms and d == self.heat_dir(room):
+                self.index.setdefault(room, {}).update(found)
+
+    def _add(self, path):
+        d, fn = os.path.split(path)
+        room = os.path.basename(os.path.dirname(d))
+        cls = self._class_of(room, fn)
+        if cls is None:
+            return
+        try:
+            st = os.stat(path)
+        except OSError:
+            return
+        with self._lock:
+            # a heatmap of a tree or room this manager no longer watches
+            if room not in self.rooms or os.path.normpath(d) != os.path.normpath(self.heat_dir(room)):
+                return
+            self.index.setdefault(room, {})[path] = (st.st_mtime, st.st_size, cls)
+
+    # ── policy ──────────────────────────────────────────────────────
+    def plan(self, room, now=None):
+        """Paths that the current policy would evict from a room, oldest first (call under _lock)."""
+        now = now or time.time()
+        entries = sorted(self.index.get(room, {}).items(), key=lambda kv: kv[1][0], reverse=True)
+        evict, kept, per_class, total = [], [], {}, 0
+        for path, (mtime, size, cls) in entries:        # newest first
+            per_class[cls] = per_class.get(cls, 0) + 1
+            if now - mtime > MAX_AGE or per_class[cls] > KEEP_LAST_PER_CLASS:
+                evict.append(path)
+            else:
+                kept.append((path, size))
+                total += size
+        while kept and total > MAX_BYTES_PER_ROOM:
+            path, size = kept.pop()                      # oldest remaining
+            evict.append(path)
+            total -= size
+        return sorted(evict, key=lambda p: self.index[room][p][0])
+
+    def enforce(self, room):
+        with self._lock:
+            victims = self.plan(room)
+        if not victims:
+            return 0
+        if ARCHIVE:
+            archived = self._archive(room, victims)
+            with self._lock:
+                self.archived += archived
+        for path in victims:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            entries = self.index.get(room, {})
+            for path in victims:
+                entries.pop(path, None)
+            self.evicted += len(victims)
+        return len(victims)
+
+    def _archive(self, room, paths):
+        """Append paths to the room's archive; returns how many were stored."""
+        d = self.heat_dir(room)
+        arc = os.path.join(d, ARCHIVE_NAME)
+        n = 0
+        with self._archive_lock:
+            if os.path.exists(arc) and os.path.getsize(arc) > ARCHIVE_MAX_BYTES:
+                os.replace(arc, os.path.join(d, ARCHIVE_OLD_NAME))
+                for path, (archive, name) in list(self.members.items()):
+                    if os.path.dirname(path) == d:
+                        if archive == ARCHIVE_NAME:
+                            self.members[path] = (ARCHIVE_OLD_NAME, name)
+                        else:
+                            del self.members[path]     # the old archive was just replaced
+            with zipfile.ZipFile(arc, "a", compression=zipfile.ZIP_STORED) as zf:
+                names = set(zf.namelist())
+                for path in paths:
+                    if not os.path.exists(path):
+                        continue
+                    fn = name = os.path.basename(path)
+                    stem, ext = os.path.splitext(fn)
+                    k = 1
+                    while name in names:
+                        # a heatmap of the same name was archived before: keep both
+                        name = f"{stem}.{k}{ext}"
+                        k += 1
+                    zf.write(path, name)
+                    names.add(name)
+                    self.members[path] = (ARCHIVE_NAME, name)
+                    n += 1
+        return n
+
+    # ── reading ─────────────────────────────────────────────────────
+    def read_heatmap(self, path):
+        """PNG bytes of a heatmap, from disk or, once evicted, from its room's archive."""
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            pass
+        d, fn = os.path.split(path)
+        with self._archive_lock:
+            member = self.members.get(path)
+            # archived before this process started: look it up by file name
+            tries = [member] if member else [(ARCHIVE_NAME, fn), (ARCHIVE_OLD_NAME, fn)]
+            for archive, name in tries:
+                arc = os.path.join(d, archive)
+                if not os.path.exists(arc):
+                    continue
+                with zipfile.ZipFile(arc) as zf:
+                    try:
+                        return zf.read(name)
+                    except KeyError:
+                        pass
+        return None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "files": sum(len(v) for v in self.index.values()),
+                "bytes": sum(s for v in self.index.values() for _, s, _ in v.values()),
+                "evicted": self.evicted,
+                "archived": self.archived,
+            }
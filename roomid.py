@@ -0,0 +1,76 @@
+import cv2
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+LABEL_ROI   = (0.80, 1.00, 0.00, 0.30)   # y0, y1, x0, x1 as fractions of the frame
+SIG_SIZE    = (96, 32)                   # (w, h) the label ROI is shrunk to
+SIG_BLUR    = 1.0                        # Gaussian sigma, in signature cells
+MIN_SCORE   = 0.70                       # best correlation needed to trust a match
+MIN_MARGIN  = 0.05                       # gap to the runner-up needed to trust a match
+# ────────────────────────────────────────────────────────────────────
+
+def label_rect(h, w):
+    """(x1, y1, x2, y2) of the corner where the game draws the room name."""
+    y0, y1, x0, x1 = LABEL_ROI
+    return int(w*x0), int(h*y0), int(w*x1), int(h*y1)
+
+def label_roi(img):
+    """Bottom-left corner of the frame where the game draws the room name."""
+    x1, y1, x2, y2 = label_rect(*img.shape[:2])
+    return img[y1:y2, x1:x2]
+
+def signature(img):
+    """Signature of a full frame's label ROI."""
+    return roi_signature(label_roi(img))
+
+def roi_signature(roi):
+    """
+    Zero-mean, unit-norm vector of the downscaled grayscale label ROI.
+    The dot product of two signatures is their normalized cross-correlation.
+    """
+    if roi.ndim == 3:
+        roi = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY if roi.shape[2] == 3 else cv2.COLOR_BGRA2GRAY)
+    small = cv2.resize(roi, SIG_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+    # soften cell boundaries so a few pixels of camera jitter barely move the score
+    small = cv2.GaussianBlur(small, (0, 0), SIG_BLUR).ravel()
+    small -= small.mean()
+    norm = float(np.linalg.norm(small))
+    if norm > 0:
+        small /= norm
+    return small
+
+class RoomClassifier:
+    """Matches a frame's label corner against one signature per room template."""
+
+    def __init__(self, templates):
+        self.rooms = []
+        sigs = []
+        for room, tpl in templates.items():
+            if tpl is None:
+                continue
+            self.rooms.append(room)
+            sigs.append(signature(tpl))
+        self.sigs = np.vstack(sigs) if sigs else np.zeros((0, SIG_SIZE[0]*SIG_SIZE[1]), np.float32)
+
+    def scores(self, roi):
+        """Correlation of a label ROI against every known room, in self.rooms order."""
+        return self.sigs @ roi_signature(roi)
+
+    def classify(self, img):
+        """Classify a full frame; see classify_roi()."""
+        return self.classify_roi(label_roi(img))
+
+    def classify_roi(self, roi):
+        """
+        Returns (room, score). room is None when the best match is weak or
+        too close to the runner-up, so the caller can fall back to OCR.
+        """
+        if not self.rooms:
+            return None, 0.0
+        s = self.scores(roi)
+        order = np.argsort(s)[::-1]
+        best = float(s[order[0]])
+        second = float(s[order[1]]) if len(order) > 1 else -1.0
+        if best < MIN_SCORE or best - second < MIN_MARGIN:
+            return None, best
+        return self.rooms[order[0]], best
@@ -0,0 +1,499 @@
+"""
+Headless scan service: one long-lived process keeps the OCR model,
+templates and diff models warm and runs the scans; viewers (UI.py,
+TempUI.py, scripts) attach over localhost HTTP or a Unix socket.
+
+    python service.py [--host 127.0.0.1] [--port 8765] [--socket PATH] [--profile [DIR]]
+
+    POST /scan[?wait=SECONDS]   trigger a scan; with wait (at most MAX_WAIT), block for its result
+    POST /continuous[?on=0|1]   set (or toggle) continuous monitoring
+    GET  /stream                server-sent events: "result" per scan, "stats" every STATS_INTERVAL
+    GET  /results?since=SEQ     results newer than SEQ still in the buffer
+    GET  /heatmap/<seq>/<i>     PNG heatmap of anomaly i of result seq
+    GET  /history?room=&limit=  recorded anomalies (backend.get_history())
+    GET  /stats                 worker counters, stage percentiles, trigger-to-result latency
+
+    curl -X POST 'localhost:8765/scan?wait=5'
+
+Viewers attach by setting SERVICE_URL ("http://127.0.0.1:8765" or
+"unix:/path/to.sock"), e.g. ODAI_SERVICE_SERVICE_URL; feeds.make_worker()
+then returns a RemoteWorker instead of scanning in-process.
+"""
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import http.client
+import socketserver
+from collections import deque, OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs
+import cv2
+import backend
+import profiling
+import config
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+HOST           = "127.0.0.1"
+PORT           = 8765
+SOCKET_PATH    = None     # serve on this Unix socket instead of HOST:PORT
+SERVICE_URL    = None     # viewers: attach to a running service instead of scanning in-process
+BUFFER         = 256      # recent results kept for /results, /heatmap and reconnecting streams
+STATS_INTERVAL = 1.0      # seconds between "stats" events on /stream
+MAX_WAIT       = 60.0     # longest /scan?wait a client may ask for, seconds
+# ────────────────────────────────────────────────────────────────────
+config.load_into("service", globals())
+
+def _public(a, seq, i):
+    """JSON form of an anomaly: heatmap arrays/bytes become a /heatmap URL."""
+    out = {k: v for k, v in a.items() if k not in ("heatmap", "heatmap_png")}
+    has = a.get("heatmap_path") or a.get("heatmap") is not None or a.get("heatmap_png")
+    out["heatmap_url"] = f"/heatmap/{seq}/{i}" if has else None
+    return out
+
+class ScanService:
+    """
+    Owns the scan worker (feeds.make_worker()) and fans its results out to
+    every subscriber. Each result gets a sequence number. trigger() hands
+    the worker an id that comes back with the scan it caused, so a result
+    lists the triggers it answers ("triggers", empty for continuous-mode
+    scans) and their trigger-to-result latency is recorded as the
+    "trigger" stage of self.latency.
+    """
+
+    def __init__(self, worker=None):
+        import feeds
+        self.worker = worker or feeds.make_worker(remote=False)
+        self.buffer = deque(maxlen=BUFFER)    # (seq, public result, raw anomalies)
+        self.seq = 0
+        self.latency = profiling.StageTimer()
+        self._triggers = OrderedDict()    # trigger id -> perf_counter() when asked, until answered
+        self._next_trigger = 0
+        self._cv = threading.Condition()
+        self._running = False
+        self.subscribers = 0
+
+    def start(self):
+        self.worker.start()
+        self._running = True
+        threading.Thread(target=self._pump, name="service-pump", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        self.worker.stop()
+        with self._cv:
+            self._cv.notify_all()
+
+    def trigger(self):
+        """Ask for a scan; returns its trigger id (see wait_trigger())."""
+        with self._cv:
+            self._next_trigger += 1
+            tid = self._next_trigger
+            self._triggers[tid] = time.perf_counter()
+            while len(self._triggers) > BUFFER:
+                # never answered (the scan failed): don't keep it forever
+                self._triggers.popitem(last=False)
+        self.worker.trigger(tid)
+        return tid
+
+    def set_continuous(self, on=None):
+        if on is None:
+            return self.worker.toggle_continuous()
+        self.worker.set_continuous(on)
+        return self.worker.continuous
+
+    def _pump(self):
+        while self._running:
+            results = self.worker.get_results(with_triggers=True)
+            if not results:
+                time.sleep(0.01)
+                continue
+            # viewers fetch heatmaps by URL, so they have to exist first
+            backend.heatmap_writer.flush()
+            with self._cv:
+                for room, anomalies, ids in results:
+                    latency = None
+                    for tid in ids:
+                        t = self._triggers.pop(tid, None)
+                        if t is not None:
+                            ms = (time.perf_counter() - t) * 1000
+                            self.latency.record("trigger", ms)
+                            latency = max(latency or 0.0, ms)
+                    self.seq += 1
+                    tpl = backend.get_template(room) if room else None
+                    pub = {"seq": self.seq, "time": time.time(), "room": room,
+                           "anomalies": [_public(a, self.seq, i) for i, a in enumerate(anomalies)],
+                           "template_size": tpl.shape[1::-1] if tpl is not None else None,
+                           "triggers": list(ids), "latency_ms": latency}
+                    self.buffer.append((self.seq, pub, anomalies))
+                self._cv.notify_all()
+
+    def since(self, seq):
+        with self._cv:
+            return [pub for s, pub, _ in self.buffer if s > seq]
+
+    def wait(self, seq, timeout):
+        """Results after `seq`, blocking up to `timeout` seconds for the first."""
+        deadline = time.monotonic() + timeout
+        with self._cv:
+            while self._running and self.seq <= seq:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cv.wait(left)
+        return self.since(seq)
+
+    def subscribe(self, n):
+        """Count a /stream subscriber in (1) or out (-1); handler threads run concurrently."""
+        with self._cv:
+            self.subscribers += n
+
+    def wait_trigger(self, tid, timeout):
+        """The first result answering trigger `tid`, blocking up to `timeout` seconds; None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cv:
+            while True:
+                pub = next((pub for _, pub, _ in self.buffer if tid in pub["triggers"]), None)
+                left = deadline - time.monotonic()
+                if pub is not None or not self._running or left <= 0:
+                    return pub
+                self._cv.wait(left)
+
+    def heatmap_png(self, seq, i):
+        with self._cv:
+            raw = next((r for s, _, r in self.buffer if s == seq), None)
+        if raw is None or not 0 <= i < len(raw):
+            return None
+        a = raw[i]
+        if a.get("heatmap_png"):
+            return a["heatmap_png"]
+        if a.get("heatmap") is not None:
+            ok, buf = cv2.imencode(".png", a["heatmap"])
+            return buf.tobytes() if ok else None
+        if a.get("heatmap_path"):
+            return backend.get_retention().read_heatmap(a["heatmap_path"])
+        return None
+
+    def stats(self):
+        return {"worker": self.worker.stats(), "stages": self.worker.stage_stats(),
+                "trigger": self.latency.summary().get("trigger"),
+                "subscribers": self.subscribers, "seq": self.seq}
+
+class Handler(BaseHTTPRequestHandler):
+    service = None     # set by serve()
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port)
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _json(self, obj, status=200):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _parse(self):
+        url = urlsplit(self.path)
+        return url.path.rstrip("/") or "/", {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+    def do_POST(self):
+        path, q = self._parse()
+        if self.headers.get("Content-Length"):
+            self.rfile.read(int(self.headers["Content-Length"]))
+        svc = self.service
+        if path == "/scan":
+            try:
+                wait = float(q.get("wait") or 10)
+                if wait != wait:
+                    raise ValueError
+            except ValueError:
+                return self._json({"error": f"wait must be a number of seconds, got {q['wait']!r}"}, 400)
+            wait = min(max(wait, 0.0), MAX_WAIT)
+            seq = svc.seq
+            tid = svc.trigger()
+            if "wait" in q:
+                pub = svc.wait_trigger(tid, wait)
+                return self._json(pub if pub else {"error": "timeout"}, 200 if pub else 504)
+            return self._json({"trigger": tid, "after": seq}, 202)
+        if path == "/continuous":
+            on = None if "on" not in q else q["on"].lower() in ("1", "true", "on", "yes")
+            return self._json({"continuous": svc.set_continuous(on)})
+        self._json({"error": "not found"}, 404)
+
+    def do_GET(self):
+        path, q = self._parse()
+        svc = self.service
+        if path == "/stream":
+            return self._stream(int(q.get("since") or self.headers.get("Last-Event-ID") or svc.seq))
+        if path == "/results":
+            return self._json({"seq": svc.seq, "results": svc.since(int(q.get("since", 0)))})
+        if path == "/stats":
+            return self._json(svc.stats())
+        if path == "/history":
+            rows = backend.get_history().query(room=q.get("room"), limit=int(q.get("limit", 50)))
+            return self._json(rows)
+        if path.startswith("/heatmap/"):
+            try:
+                _, _, seq, i = path.split("/")
+                png = svc.heatmap_png(int(seq), int(i))
+            except ValueError:
+                png = None
+            if png is None:
+                return self._json({"error": "no such heatmap"}, 404)
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(png)))
+            self.end_headers()
+            self.wfile.write(png)
+            return
+        self._json({"error": "not found"}, 404)
+
+    def _event(self, kind, data, seq=None):
+        head = f"id: {seq}\n" if seq is not None else ""
+        self.wfile.write(f"{head}event: {kind}\ndata: {json.dumps(data)}\n\n".encode())
+        self.wfile.flush()
+
+    def _stream(self, seq):
+        svc = self.service
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        svc.subscribe(1)
+        next_stats = 0.0
+        try:
+            while svc._running:
+                if time.monotonic() >= next_stats:
+                    next_stats = time.monotonic() + STATS_INTERVAL
+                    self._event("stats", svc.stats())
+                for pub in svc.wait(seq, min(STATS_INTERVAL, 1.0)):
+                    seq = pub["seq"]
+                    self._event("result", pub, seq)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            svc.subscribe(-1)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+def serve(service, host=HOST, port=PORT, socket_path=SOCKET_PATH):
+    """Serve `service` until interrupted."""
+    handler = type("BoundHandler", (Handler,), {"service": service})
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, handler)
+        where = f"unix:{socket_path}"
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        server.daemon_threads = True
+        where = f"http://{host}:{server.server_address[1]}"
+    print(f"scan service on {where}", flush=True)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if socket_path and os.path.exists(socket_path):
+            os.unlink(socket_path)
+    return server
+
+# ───── CLIENT ──────────────────────────────────────────────────────
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+def connect(url, timeout=10):
+    """HTTPConnection to a service URL ("http://host:port" or "unix:/path")."""
+    if url.startswith("unix:"):
+        return _UnixConnection(url[len("unix:"):], timeout)
+    u = urlsplit(url)
+    return http.client.HTTPConnection(u.hostname, u.port or 80, timeout=timeout)
+
+def request(url, method, path, timeout=10):
+    """(status, body bytes) of one request to the service."""
+    conn = connect(url, timeout)
+    try:
+        conn.request(method, path)
+        resp = conn.getresponse()
+        return resp.status, resp.read()
+    finally:
+        conn.close()
+
+class RemoteWorker:
+    """
+    ScanWorker's interface backed by a running service, so the UIs can
+    attach to it unchanged. A background thread follows /stream; results
+    queue up for get_results() and the latest "stats" event answers
+    stats() and stage_stats() without a request per GUI tick. Heatmaps the
+    viewer can't read from disk are fetched as PNG bytes ("heatmap_png"),
+    so viewers never open the retention archive themselves, and each
+    room's template size is kept from its results (template_sizes) for
+    overlays that scale boxes to the screen.
+    trigger() and the continuous switches only queue their request for a
+    control thread, so a slow or restarting service never blocks the GUI;
+    a failed request shows up as stats()["error"].
+    """
+
+    def __init__(self, url=None):
+        self.url = url or SERVICE_URL
+        self.results = queue.Queue()
+        self._stats = {"worker": {}, "stages": {}}
+        self._commands = queue.Queue()
+        self._running = False
+        self._since = None
+        self.errors = 0
+        self.error = None          # last failed control request, until one succeeds
+        self.template_sizes = {}   # room -> (w, h) of its template, as sent with each result
+
+    @property
+    def continuous(self):
+        return bool(self._stats["worker"].get("continuous"))
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        threading.Thread(target=self._follow, name="service-stream", daemon=True).start()
+        threading.Thread(target=self._control, name="service-control", daemon=True).start()
+
+    def stop(self):
+        self._running = False
+        self._commands.put(None)
+
+    def trigger(self):
+        self._commands.put("/scan")
+
+    def set_continuous(self, on):
+        # shown right away; the next "stats" event has the service's own answer
+        self._stats["worker"]["continuous"] = bool(on)
+        self._commands.put(f"/continuous?on={int(bool(on))}")
+
+    def toggle_continuous(self):
+        on = not self.continuous
+        self.set_continuous(on)
+        return on
+
+    def _control(self):
+        while True:
+            path = self._commands.get()
+            if path is None:
+                return
+            try:
+                status, body = request(self.url, "POST", path)
+                if status >= 400:
+                    raise http.client.HTTPException(f"{path}: HTTP {status}")
+                if path.startswith("/continuous"):
+                    self._stats["worker"]["continuous"] = json.loads(body)["continuous"]
+                self.error = None
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                self.errors += 1
+                self.error = f"service unreachable: {e}"
+
+    def get_results(self):
+        out = []
+        while True:
+            try:
+                out.append(self.results.get_nowait())
+            except queue.Empty:
+                return out
+
+    def stats(self):
+        st = {"continuous": False, "frames_captured": 0, "frames_analyzed": 0,
+              "frames_dropped": 0, "results_dropped": 0, "errors": 0, "align_ms": 0.0}
+        st.update(self._stats["worker"])
+        st["errors"] += self.errors
+        st["error"] = self.error
+        return st
+
+    def stage_stats(self):
+        stages = dict(self._stats["stages"])
+        if self._stats.get("trigger"):
+            stages["trigger"] = self._stats["trigger"]
+        return stages
+
+    def _fetch_heatmaps(self, anomalies):
+        for a in anomalies:
+            url = a.pop("heatmap_url", None)
+            if url and not (a.get("heatmap_path") and os.path.exists(a["heatmap_path"])):
+                status, png = request(self.url, "GET", url)
+                if status == 200:
+                    a["heatmap_png"] = png
+                    a["heatmap_path"] = None
+
+    def _follow(self):
+        while self._running:
+            try:
+                conn = connect(self.url, timeout=max(STATS_INTERVAL * 5, 5))
+                path = "/stream" if self._since is None else f"/stream?since={self._since}"
+                conn.request("GET", path)
+                resp = conn.getresponse()
+                kind, data = None, []
+                while self._running:
+                    line = resp.readline()
+                    if not line:
+                        break
+                    line = line.decode().rstrip("\n")
+                    if line.startswith("event:"):
+                        kind = line[6:].strip()
+                    elif line.startswith("data:"):
+                        data.append(line[5:].strip())
+                    elif not line and kind:
+                        self._dispatch(kind, json.loads("\n".join(data)))
+                        kind, data = None, []
+                conn.close()
+            except (OSError, http.client.HTTPException, ValueError) as e:
+                print("service stream:", e)
+            if self._running:
+                time.sleep(1.0)    # service restarting: reconnect and resume after the last result
+
+    def _dispatch(self, kind, msg):
+        if kind == "stats":
+            self._stats = msg
+        elif kind == "result":
+            self._since = msg["seq"]
+            self._fetch_heatmaps(msg["anomalies"])
+            if msg.get("template_size"):
+                self.template_sizes[msg["room"]] = tuple(msg["template_size"])
+            self.results.put((msg["room"], msg["anomalies"]))
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="headless scan service")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    ap.add_argument("--socket", default=SOCKET_PATH, help="serve on a Unix socket instead")
+    ap.add_argument("--profile", nargs="?", const="profiles", metavar="DIR",
+                    help="dump a cProfile of every scan into DIR")
+    args = ap.parse_args()
+    if args.profile:
+        profiling.enable_dumps(args.profile)
+    config.watch()
+    backend.warmup()
+    backend.start_retention()
+    backend.watch_regions()
+    svc = ScanService()
+    svc.start()
+    try:
+        serve(svc, args.host, args.port, args.socket)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        svc.stop()
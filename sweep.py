@@ -0,0 +1,197 @@
+"""
+All-rooms sweep: switch the camera to every room in turn and scan it,
+with the next room's camera switch, settle and capture running while the
+previous room is still being analyzed.
+
+    python sweep.py [--rooms Living Kitchen ...] [--keys Living=1 Kitchen=2 ...]
+                    [--sequential | --compare] [-o sweep.json]
+"""
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+import backend
+from profiling import timings
+import config
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+SWITCH_KEYS = {}     # room -> key that switches the game camera to it, e.g. {"Living": "1"}
+RETRIES     = 1      # re-settle and re-capture when the label shows another room
+# ────────────────────────────────────────────────────────────────────
+config.load_into("sweep", globals())
+
+def key_switch(room):
+    """Default camera switch: press SWITCH_KEYS[room] through the keyboard module."""
+    key = SWITCH_KEYS.get(room)
+    if key is None:
+        raise KeyError(f"no camera key for {room}; set SWITCH_KEYS in the \"sweep\" config")
+    import keyboard
+    keyboard.send(key)
+
+class Sweep:
+    """
+    One pass over `rooms` (default ROOMS). `switch(room)` brings that
+    room's camera up (default key_switch()). `on_room(room, anomalies)` is
+    called from the analysis thread as each room finishes.
+
+    Pipelined (the default), the calling thread switches, settles and
+    captures room after room, and an analysis thread diffs the frames as
+    they arrive. Heatmaps are written by backend.heatmap_writer as usual.
+    Room N+1 is settling and being captured while room N is diffed.
+    Sequential, each room is switched, settled, captured and analyzed
+    before the next, like pressing "6" once per room.
+
+    run() returns the consolidated report (see report()).
+    """
+
+    def __init__(self, rooms=None, switch=None, on_room=None, pipelined=True):
+        self.rooms = list(rooms or backend.ROOMS)
+        self.switch = switch or key_switch
+        self.on_room = on_room
+        self.pipelined = pipelined
+        self.results = {}       # room -> per-room entry of the report
+        self.seconds = None
+
+    def run(self):
+        t0 = time.perf_counter()
+        if self.pipelined:
+            frames = queue.SimpleQueue()
+            analyzer = threading.Thread(target=self._analyze_loop, args=(frames,),
+                                        name="sweep-analyze", daemon=True)
+            analyzer.start()
+            for room in self.rooms:
+                frames.put(self._capture(room))
+            frames.put(None)
+            analyzer.join()
+        else:
+            for room in self.rooms:
+                self._analyze(self._capture(room))
+        # heatmap_path is filled in once each heatmap is on disk
+        backend.heatmap_writer.flush()
+        self.seconds = time.perf_counter() - t0
+        return self.report()
+
+    def _capture(self, room):
+        entry = {"room": room, "seen": None, "anomalies": [], "attempts": 0, "ms": {}}
+        try:
+            t = time.perf_counter()
+            self.switch(room)
+            entry["ms"]["switch"] = (time.perf_counter() - t) * 1000
+            for entry["attempts"] in range(1, RETRIES + 2):
+                t = time.perf_counter()
+                with timings.stage("settle"):
+                    time.sleep(backend.SETTLE_DELAY)
+                entry["ms"]["settle"] = entry["ms"].get("settle", 0) + (time.perf_counter() - t) * 1000
+                t = time.perf_counter()
+                captured = backend.capture_scan()
+                entry["ms"]["capture"] = entry["ms"].get("capture", 0) + (time.perf_counter() - t) * 1000
+                entry["seen"] = captured[0]
+                if captured[0] == room:
+                    break
+        except Exception as e:
+            entry["error"] = str(e)
+            captured = None
+        return entry, captured
+
+    def _analyze(self, item):
+        entry, captured = item
+        room = entry["room"]
+        if captured is not None and captured[0] == room:
+            t = time.perf_counter()
+            try:
+                _, entry["anomalies"] = backend.analyze_scan(captured)
+            except Exception as e:
+                entry["error"] = str(e)
+            entry["ms"]["analyze"] = (time.perf_counter() - t) * 1000
+        if "error" not in entry and entry["seen"] != room:
+            entry["error"] = f"camera shows {entry['seen'] or 'no known room'}"
+        self.results[room] = entry
+        if self.on_room is not None:
+            self.on_room(entry["seen"] or room, entry["anomalies"])
+
+    def _analyze_loop(self, frames):
+        while True:
+            item = frames.get()
+            if item is None:
+                return
+            self._analyze(item)
+
+    def report(self):
+        """
+        {"rooms": {room: {"seen", "anomalies", "attempts", "ms", ["error"]}},
+         "seconds", "sequential_seconds", "pipelined"}. "sequential_seconds"
+        is the sum of every room's switch, settle, capture and analysis time,
+        i.e. what the same scans take back to back.
+        """
+        rooms = {}
+        for room in self.rooms:
+            e = self.results.get(room)
+            if e is None:
+                continue
+            rooms[room] = {
+                "seen": e["seen"],
+                "anomalies": [{k: a.get(k) for k in ("class_name", "box", "pixel_count", "heatmap_path")}
+                              for a in e["anomalies"]],
+                "attempts": e["attempts"],
+                "ms": {k: round(v, 1) for k, v in e["ms"].items()},
+                **({"error": e["error"]} if "error" in e else {}),
+            }
+        sequential = sum(sum(r["ms"].values()) for r in rooms.values()) / 1000
+        return {"rooms": rooms, "seconds": round(self.seconds or 0, 3),
+                "sequential_seconds": round(sequential, 3), "pipelined": self.pipelined}
+
+def format_report(rep):
+    lines = []
+    for room, r in rep["rooms"].items():
+        if "error" in r:
+            lines.append(f"{room:<10} ERROR {r['error']}")
+        elif r["anomalies"]:
+            lines.append(f"{room:<10} {len(r['anomalies'])} anomalies: " +
+                         ", ".join(f"{a['class_name']}({a['pixel_count']})" for a in r["anomalies"]))
+        else:
+            lines.append(f"{room:<10} no anomalies")
+    seq = rep["sequential_seconds"]
+    lines.append(f"{len(rep['rooms'])} rooms in {rep['seconds']:.2f} s "
+                 f"({'pipelined' if rep['pipelined'] else 'sequential'}); back to back {seq:.2f} s"
+                 + (f", {seq / rep['seconds']:.2f}x" if rep["seconds"] else ""))
+    return "\n".join(lines)
+
+def parse_keys(pairs):
+    out = {}
+    for p in pairs:
+        room, _, key = p.partition("=")
+        if not key:
+            raise SystemExit(f"--keys takes ROOM=KEY, got {p!r}")
+        out[room] = key
+    return out
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rooms", nargs="+", default=None, help="default: ROOMS, in order")
+    ap.add_argument("--keys", nargs="+", default=[], metavar="ROOM=KEY",
+                    help="camera keys, added to SWITCH_KEYS")
+    mode = ap.add_mutually_exclusive_group()
+    mode.add_argument("--sequential", action="store_true", help="one room at a time, no overlap")
+    mode.add_argument("--compare", action="store_true", help="also run a sequential sweep and compare")
+    ap.add_argument("--no-ocr", action="store_true", help="never fall back to EasyOCR")
+    ap.add_argument("-o", "--out", default=None, help="write the report as JSON")
+    args = ap.parse_args()
+
+    SWITCH_KEYS.update(parse_keys(args.keys))
+    backend.OCR_FALLBACK = not args.no_ocr
+    backend.get_room_classifier()
+    for room in args.rooms or backend.ROOMS:
+        backend.get_diff_model(room)
+    rep = Sweep(args.rooms, pipelined=not args.sequential).run()
+    print(format_report(rep))
+    if args.compare:
+        seq = Sweep(args.rooms, pipelined=False).run()
+        print(f"sequential sweep: {seq['seconds']:.2f} s; pipelined {rep['seconds']:.2f} s "
+              f"({seq['seconds'] / max(rep['seconds'], 1e-9):.2f}x)")
+        rep["sequential_sweep_seconds"] = seq["seconds"]
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(rep, f, indent=1)
+    sys.exit(1 if any("error" in r for r in rep["rooms"].values()) else 0)
@@ -0,0 +1,113 @@
+import cv2
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+PERSIST_FRAMES = 3    # consecutive flagged frames before an anomaly is confirmed
+SIG_CELL       = 8    # signature cell size in template pixels
+SIG_TOL        = 3    # max per-cell change (0-255) still treated as "unchanged"
+# ────────────────────────────────────────────────────────────────────
+
+def _coverage(shape, x1, y1, x2, y2):
+    """Number of boxes covering each cell of a shape-sized grid."""
+    h, w = shape
+    d = np.zeros((h + 1, w + 1), np.int32)
+    np.add.at(d, (y1, x1), 1)
+    np.add.at(d, (y1, x2), -1)
+    np.add.at(d, (y2, x1), -1)
+    np.add.at(d, (y2, x2), 1)
+    return d.cumsum(axis=0).cumsum(axis=1)[:h, :w]
+
+class RoomState:
+    """Per-room history for TemporalFilter: last signature, counts and a flag ring."""
+
+    def __init__(self, n, persist):
+        self.sig = None                                  # union-area signature each cell was last diffed on
+        self.counts = np.zeros(n, np.int64)              # last pixel counts per region
+        self.ring = np.zeros((persist, n), np.bool_)     # flagged? per frame, per region
+        self.pos = 0
+        self.confirmed = np.zeros(n, np.bool_)
+        self.anomalies = [None] * n                      # last reported anomaly per region
+
+class TemporalFilter:
+    """
+    Stateful layer over RoomDiffModel for continuous monitoring.
+
+    changed() compares a 1/SIG_CELL-size signature of the room's region area
+    with the one each region was last diffed on, so regions whose pixels
+    haven't moved since skip the full diff and keep that diff's count. A
+    slow drift is still re-diffed once it adds up to more than SIG_TOL. confirm() pushes this scan's flags
+    into a PERSIST_FRAMES-deep ring buffer and only confirms regions flagged
+    in every slot, so single-frame flicker never becomes an anomaly (or a
+    heatmap).
+    """
+
+    def __init__(self, persist=PERSIST_FRAMES):
+        self.persist = max(int(persist), 1)
+        self.rooms = {}
+        self.regions_skipped = 0
+        self.regions_diffed = 0
+
+    def state(self, room, n):
+        st = self.rooms.get(room)
+        if st is None or len(st.counts) != n or st.ring.shape[0] != self.persist:
+            st = self.rooms[room] = RoomState(n, self.persist)
+        return st
+
+    def changed(self, room, model, union_crop):
+        """
+        union_crop: live pixels covering model.union (BGR/BGRA), already aligned.
+        Returns a bool array, True for regions that need a fresh diff.
+        """
+        n = len(model.regions)
+        st = self.state(room, n)
+        h, w = union_crop.shape[:2]
+        sig = cv2.resize(union_crop, (max(w // SIG_CELL, 1), max(h // SIG_CELL, 1)),
+                         interpolation=cv2.INTER_AREA)
+        # region boxes in signature cells, widened to whole cells
+        sh, sw = sig.shape[:2]
+        r = model.rel
+        x1 = np.minimum(r[:, 0] // SIG_CELL, sw)
+        y1 = np.minimum(r[:, 1] // SIG_CELL, sh)
+        x2 = np.minimum(-(-r[:, 2] // SIG_CELL), sw)
+        y2 = np.minimum(-(-r[:, 3] // SIG_CELL), sh)
+        if st.sig is None or st.sig.shape != sig.shape:
+            mask = np.ones(n, np.bool_)
+            st.sig = sig
+        else:
+            moved = cv2.absdiff(sig, st.sig)
+            if moved.ndim == 3:
+                moved = moved.max(axis=2)
+            moved = (moved > SIG_TOL).astype(np.uint8)
+            ii = cv2.integral(moved, sdepth=cv2.CV_32S)
+            mask = (ii[y2, x2] - ii[y1, x2] - ii[y2, x1] + ii[y1, x1]) > 0
+            # a cell's reference only moves on once every region over it has been
+            # re-diffed, so a skipped region keeps comparing against its own last diff
+            cover = _coverage((sh, sw), x1, y1, x2, y2)
+            done = _coverage((sh, sw), x1[mask], y1[mask], x2[mask], y2[mask])
+            update = cover == done
+            st.sig[update] = sig[update]
+        self.regions_diffed += int(mask.sum())
+        self.regions_skipped += int(n - mask.sum())
+        return mask
+
+    def merge_counts(self, room, mask, fresh):
+        """Fresh counts where mask is set, last scan's counts elsewhere."""
+        st = self.rooms[room]
+        st.counts = np.where(mask, fresh, st.counts)
+        return st.counts
+
+    def confirm(self, room, flagged):
+        """
+        Record this scan's flags. Returns (confirmed, new) bool arrays: regions
+        flagged for PERSIST_FRAMES scans in a row, and those confirmed just now.
+        """
+        st = self.rooms[room]
+        st.ring[st.pos] = flagged
+        st.pos = (st.pos + 1) % self.persist
+        confirmed = st.ring.all(axis=0)
+        new = confirmed & ~st.confirmed
+        st.confirmed = confirmed
+        return confirmed, new
+
+    def stats(self):
+        return {"regions_diffed": self.regions_diffed, "regions_skipped": self.regions_skipped}
@@ -0,0 +1,74 @@
+import os
+import json
+import numpy as np
+
+# ───── CONFIG ──────────────────────────────────────────────────────
+THRESH_FILE    = "thresholds.json"   # per room, next to template.png
+CALIB_FRAMES   = 20                  # clean frames captured per room when calibrating
+NOISE_K        = 4.0                 # limit = mean + NOISE_K * std of the clean counts...
+MIN_FRACTION   = 0.01                # ...but never below this fraction of the region area
+MIN_PIXELS     = 16                  # ...or this many pixels
+# ────────────────────────────────────────────────────────────────────
+
+class Calibration:
+    """
+    Collects per-region changed-pixel counts from clean frames of one room
+    and turns their distribution into a pixel-count limit per region.
+    """
+
+    def __init__(self, regions):
+        self.regions = regions
+        self.samples = []
+
+    def add(self, counts):
+        self.samples.append(np.asarray(counts, np.int64))
+
+    def result(self, binary_thresh, k=NOISE_K, metric="absdiff"):
+        """The thresholds.json document for the collected frames."""
+        s = np.array(self.samples, np.float64).reshape(len(self.samples), len(self.regions))
+        out = {}
+        for i, region in enumerate(self.regions):
+            x1, y1, x2, y2 = map(int, region["box"])
+            area = max(x2 - x1, 0) * max(y2 - y1, 0)
+            col = s[:, i]
+            mean, std, peak = (float(col.mean()), float(col.std()), float(col.max())) if len(col) else (0.0, 0.0, 0.0)
+            limit = max(mean + k * std, peak, MIN_FRACTION * area, MIN_PIXELS)
+            out[region["class_name"]] = {
+                "box": region["box"],
+                "area": area,
+                "mean": round(mean, 2),
+                "std": round(std, 2),
+                "max": int(peak),
+                "limit": int(np.ceil(limit)),
+            }
+        return {"binary_thresh": binary_thresh, "metric": metric, "k": k, "frames": len(self.samples), "regions": out}
+
+def path_for(room_dir):
+    return os.path.join(room_dir, THRESH_FILE)
+
+def save(room_dir, doc):
+    tmp = path_for(room_dir) + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(doc, f, indent=1)
+    os.replace(tmp, path_for(room_dir))
+
+def load_limits(room_dir, regions, binary_thresh, default, metric="absdiff"):
+    """
+    Pixel-count limit per region (int64 array in `regions` order). Regions
+    without a calibrated entry for the same box, binary threshold and diff
+    metric get `default`.
+    """
+    limits = np.full(len(regions), default, np.int64)
+    try:
+        with open(path_for(room_dir)) as f:
+            doc = json.load(f)
+    except (OSError, ValueError):
+        return limits
+    if doc.get("binary_thresh") != binary_thresh or doc.get("metric", "absdiff") != metric:
+        return limits
+    table = doc.get("regions", {})
+    for i, region in enumerate(regions):
+        entry = table.get(region["class_name"])
+        if entry and list(map(float, entry.get("box", []))) == list(map(float, region["box"])):
+            limits[i] = int(entry["limit"])
+    return limits
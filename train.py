@@ -2,23 +2,25 @@ import os
 import tkinter as tk
 from tkinter import simpledialog, messagebox
 from PIL import Image, ImageTk
+import config
+import manifest
+import backend    # ROOMS and BASE_DIR are backend settings, read at use time
 
 # ───── CONFIG ──────────────────────────────────────────────────────
-ROOMS    = ["Living", "Kitchen", "Bedroom", "Bathroom", "Entryway", "Yard"]
-BASE_DIR = os.path.join(os.path.dirname(__file__), "LogCabin")
 # Maximum display size for the cropping window
 MAX_W, MAX_H = 1920, 1080
 # ────────────────────────────────────────────────────────────────────
+config.load_into("train", globals())
 
 def ensure_dirs():
-    for room in ROOMS:
-        d = os.path.join(BASE_DIR, room, "group_templates")
+    for room in backend.ROOMS:
+        d = os.path.join(backend.BASE_DIR, room, "group_templates")
         os.makedirs(d, exist_ok=True)
 
 class CropTool:
     def __init__(self, room):
         self.room = room
-        tpl_path = os.path.join(BASE_DIR, room, "template.png")
+        tpl_path = os.path.join(backend.BASE_DIR, room, "template.png")
         if not os.path.exists(tpl_path):
             raise FileNotFoundError(f"No template.png for {room}")
 
@@ -95,9 +97,11 @@ class CropTool:
         ox1, oy1 = int(x1 / self.scale), int(y1 / self.scale)
         crop = self.orig_img.crop((ox0, oy0, ox1, oy1))
 
-        out_dir = os.path.join(BASE_DIR, self.room, "group_templates")
+        out_dir = os.path.join(backend.BASE_DIR, self.room, "group_templates")
         out_path = os.path.join(out_dir, f"{name}.png")
         crop.save(out_path)
+        # the exact box, so backend never has to search the template for it
+        manifest.record(os.path.join(backend.BASE_DIR, self.room), name, (ox0, oy0, ox1, oy1))
         messagebox.showinfo("Saved", f"Saved to:\n{out_path}")
 
         # Clear rectangle
@@ -116,7 +120,7 @@ class CropTool:
 
 if __name__ == "__main__":
     ensure_dirs()
-    for room in ROOMS:
+    for room in backend.ROOMS:
         try:
             CropTool(room)
         except FileNotFoundError: